@@ -25,7 +25,31 @@ if (-not (Get-Command psql -ErrorAction SilentlyContinue)) {
 $migrations = @(
     @{ File = "001_mvp_core.sql";                Description = "Core schema (runs, tasks, results, market data)" },
     @{ File = "002_portfolio_data_services.sql";  Description = "Portfolio, positions, instruments, reference data" },
-    @{ File = "003_regulatory_analytics.sql";     Description = "CECL, Basel, audit trail, regulatory reports" }
+    @{ File = "003_regulatory_analytics.sql";     Description = "CECL, Basel, audit trail, regulatory reports" },
+    @{ File = "004_portfolio_path.sql";           Description = "Materialized ancestor path for portfolio hierarchy" },
+    @{ File = "005_portfolio_node_uuidv7.sql";    Description = "Time-ordered UUIDv7 default for portfolio IDs" },
+    @{ File = "006_portfolio_root_index.sql";     Description = "Covering index for root portfolio listing" },
+    @{ File = "007_portfolio_tree_version.sql";   Description = "Hierarchy version counter for tree caching" },
+    @{ File = "008_position_keyset_index.sql";    Description = "Keyset pagination index for positions" },
+    @{ File = "009_rating_history_agency_index.sql"; Description = "Per-agency rating history index" },
+    @{ File = "010_valuation_result_position_index.sql"; Description = "Position index for valuation results" },
+    @{ File = "011_reference_data_search_trgm.sql"; Description = "Trigram index for reference data search" },
+    @{ File = "012_position_rollup.sql";          Description = "Position rollup for holdings summary" },
+    @{ File = "013_position_extended_statistics.sql"; Description = "Position extended statistics" },
+    @{ File = "014_tag_catalog.sql";              Description = "Tag catalog" },
+    @{ File = "015_tags_gin_index.sql";           Description = "Tags GIN indexes" },
+    @{ File = "016_snapshot_totals_columns.sql";  Description = "Stored snapshot totals columns" },
+    @{ File = "017_snapshot_as_of_brin.sql";      Description = "Snapshot as_of_date BRIN index" },
+    @{ File = "018_portfolio_snapshot_partitioning.sql"; Description = "Monthly portfolio_snapshot partitions" },
+    @{ File = "019_snapshot_diff_function.sql";   Description = "Server-side snapshot diff function" },
+    @{ File = "020_portfolio_snapshot_job.sql";   Description = "Snapshot job queue" },
+    @{ File = "021_fair_value_entry.sql";         Description = "Accounting fair value entries" },
+    @{ File = "022_audit_trail_accounting_indexes.sql"; Description = "Accounting audit partial indexes" },
+    @{ File = "023_alert_listing_indexes.sql";    Description = "Alert listing recency indexes" },
+    @{ File = "024_audit_trail_metadata_gin.sql"; Description = "Audit trail metadata GIN index" },
+    @{ File = "025_audit_trail_keyset_index.sql"; Description = "Audit trail keyset pagination index" },
+    @{ File = "026_regulatory_metrics_rwa_breakdown.sql"; Description = "RWA breakdown columns on regulatory_metrics" },
+    @{ File = "027_audit_trail_run_type_time_index.sql"; Description = "Latest audit row per run and type index" }
 )
 
 foreach ($mig in $migrations) {
@@ -27,6 +27,30 @@ migrations=(
     "001_mvp_core.sql|Core schema (runs, tasks, results, market data)"
     "002_portfolio_data_services.sql|Portfolio, positions, instruments, reference data"
     "003_regulatory_analytics.sql|CECL, Basel, audit trail, regulatory reports"
+    "004_portfolio_path.sql|Materialized ancestor path for portfolio hierarchy"
+    "005_portfolio_node_uuidv7.sql|Time-ordered UUIDv7 default for portfolio IDs"
+    "006_portfolio_root_index.sql|Covering index for root portfolio listing"
+    "007_portfolio_tree_version.sql|Hierarchy version counter for tree caching"
+    "008_position_keyset_index.sql|Keyset pagination index for positions"
+    "009_rating_history_agency_index.sql|Per-agency rating history index"
+    "010_valuation_result_position_index.sql|Position index for valuation results"
+    "011_reference_data_search_trgm.sql|Trigram index for reference data search"
+    "012_position_rollup.sql|Position rollup for holdings summary"
+    "013_position_extended_statistics.sql|Position extended statistics"
+    "014_tag_catalog.sql|Tag catalog"
+    "015_tags_gin_index.sql|Tags GIN indexes"
+    "016_snapshot_totals_columns.sql|Stored snapshot totals columns"
+    "017_snapshot_as_of_brin.sql|Snapshot as_of_date BRIN index"
+    "018_portfolio_snapshot_partitioning.sql|Monthly portfolio_snapshot partitions"
+    "019_snapshot_diff_function.sql|Server-side snapshot diff function"
+    "020_portfolio_snapshot_job.sql|Snapshot job queue"
+    "021_fair_value_entry.sql|Accounting fair value entries"
+    "022_audit_trail_accounting_indexes.sql|Accounting audit partial indexes"
+    "023_alert_listing_indexes.sql|Alert listing recency indexes"
+    "024_audit_trail_metadata_gin.sql|Audit trail metadata GIN index"
+    "025_audit_trail_keyset_index.sql|Audit trail keyset pagination index"
+    "026_regulatory_metrics_rwa_breakdown.sql|RWA breakdown columns on regulatory_metrics"
+    "027_audit_trail_run_type_time_index.sql|Latest audit row per run and type index"
 )
 
 for entry in "${migrations[@]}"; do
@@ -5,6 +5,12 @@ Usage (inside ECS container):
 
 Reads DATABASE_URL from environment. Executes migration files in order,
 skipping any that have already been applied (tracked via a migrations table).
+
+Each file runs inside a single transaction, so index migrations cannot use
+CREATE INDEX CONCURRENTLY and hold a write lock on their table while they
+build. On a large live table, create the index by hand with CREATE INDEX
+CONCURRENTLY before deploying; the migrations use IF NOT EXISTS, so applying
+the file afterwards is a no-op.
 """
 
 import os
@@ -24,6 +30,30 @@ MIGRATION_FILES = [
     "001_mvp_core.sql",
     "002_portfolio_data_services.sql",
     "003_regulatory_analytics.sql",
+    "004_portfolio_path.sql",
+    "005_portfolio_node_uuidv7.sql",
+    "006_portfolio_root_index.sql",
+    "007_portfolio_tree_version.sql",
+    "008_position_keyset_index.sql",
+    "009_rating_history_agency_index.sql",
+    "010_valuation_result_position_index.sql",
+    "011_reference_data_search_trgm.sql",
+    "012_position_rollup.sql",
+    "013_position_extended_statistics.sql",
+    "014_tag_catalog.sql",
+    "015_tags_gin_index.sql",
+    "016_snapshot_totals_columns.sql",
+    "017_snapshot_as_of_brin.sql",
+    "018_portfolio_snapshot_partitioning.sql",
+    "019_snapshot_diff_function.sql",
+    "020_portfolio_snapshot_job.sql",
+    "021_fair_value_entry.sql",
+    "022_audit_trail_accounting_indexes.sql",
+    "023_alert_listing_indexes.sql",
+    "024_audit_trail_metadata_gin.sql",
+    "025_audit_trail_keyset_index.sql",
+    "026_regulatory_metrics_rwa_breakdown.sql",
+    "027_audit_trail_run_type_time_index.sql",
 ]
 
 TRACKING_DDL = """
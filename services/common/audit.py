@@ -1,13 +1,53 @@
 """Shared audit trail logging for regulatory calculations."""
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, List
 from uuid import uuid4
 from datetime import datetime, timezone
 
-from services.common.db import db_conn
+from services.common.db import async_db_conn, db_conn
 from psycopg.types.json import Json
 
+INSERT_AUDIT_ENTRY_SQL = """
+    INSERT INTO audit_trail
+      (audit_id, audit_type, calculation_run_id, entity_type, entity_id,
+       calculation_method, input_snapshot_id, input_version, assumptions_json,
+       results_json, metadata_json, computed_at)
+    VALUES (%(aid)s, %(at)s, %(crid)s, %(et)s, %(eid)s,
+            %(cm)s, %(snap)s, %(ver)s, %(assum)s,
+            %(res)s, %(meta)s, now())
+"""
+
+
+def _audit_entry_params(
+    audit_id: str,
+    audit_type: str,
+    calculation_run_id: str,
+    entity_type: str,
+    entity_id: str,
+    calculation_method: str,
+    input_snapshot_id: str,
+    assumptions: Dict[str, Any],
+    results: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Bind parameters for INSERT_AUDIT_ENTRY_SQL."""
+    return {
+        'aid': audit_id,
+        'at': audit_type,
+        'crid': calculation_run_id,
+        'et': entity_type,
+        'eid': entity_id,
+        'cm': calculation_method,
+        'snap': input_snapshot_id,
+        'ver': 'v1.0.0',
+        'assum': Json(assumptions),
+        'res': Json(results),
+        'meta': Json({
+            'computed_by': 'regulatory_svc',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        })
+    }
+
 
 def log_audit_entry(
     audit_type: str,
@@ -37,29 +77,54 @@ def log_audit_entry(
     audit_id = str(uuid4())
 
     with db_conn() as conn:
-        conn.execute("""
-            INSERT INTO audit_trail
-              (audit_id, audit_type, calculation_run_id, entity_type, entity_id,
-               calculation_method, input_snapshot_id, input_version, assumptions_json,
-               results_json, metadata_json, computed_at)
-            VALUES (%(aid)s, %(at)s, %(crid)s, %(et)s, %(eid)s,
-                    %(cm)s, %(snap)s, %(ver)s, %(assum)s,
-                    %(res)s, %(meta)s, now())
-        """, {
-            'aid': audit_id,
-            'at': audit_type,
-            'crid': calculation_run_id,
-            'et': entity_type,
-            'eid': entity_id,
-            'cm': calculation_method,
-            'snap': input_snapshot_id,
-            'ver': 'v1.0.0',
-            'assum': Json(assumptions),
-            'res': Json(results),
-            'meta': Json({
-                'computed_by': 'regulatory_svc',
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-            })
-        })
+        conn.execute(INSERT_AUDIT_ENTRY_SQL, _audit_entry_params(
+            audit_id, audit_type, calculation_run_id, entity_type, entity_id,
+            calculation_method, input_snapshot_id, assumptions, results,
+        ))
+
+    return audit_id
+
+
+async def async_log_audit_entry(
+    audit_type: str,
+    calculation_run_id: str,
+    entity_type: str,
+    entity_id: str,
+    calculation_method: str,
+    input_snapshot_id: str,
+    assumptions: Dict[str, Any],
+    results: Dict[str, Any],
+) -> str:
+    """Async counterpart of log_audit_entry for ``async def`` routes.
+
+    Takes the same arguments and returns the audit_id; the entry is written
+    through the async pool.
+    """
+    audit_id = str(uuid4())
+
+    async with async_db_conn() as conn:
+        await conn.execute(INSERT_AUDIT_ENTRY_SQL, _audit_entry_params(
+            audit_id, audit_type, calculation_run_id, entity_type, entity_id,
+            calculation_method, input_snapshot_id, assumptions, results,
+        ))
 
     return audit_id
+
+
+async def async_log_audit_entries(entries: List[Dict[str, Any]]) -> List[str]:
+    """Log several audit entries in one batch. Returns their audit_ids in order.
+
+    Each entry holds the keyword arguments of log_audit_entry. The inserts
+    go out through executemany, which psycopg pipelines, so a batch costs one
+    round-trip instead of one per entry, and they commit together.
+    """
+    audit_ids = [str(uuid4()) for _ in entries]
+
+    async with async_db_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.executemany(INSERT_AUDIT_ENTRY_SQL, [
+                _audit_entry_params(audit_id, **entry)
+                for audit_id, entry in zip(audit_ids, entries)
+            ])
+
+    return audit_ids
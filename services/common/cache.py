@@ -0,0 +1,91 @@
+"""Thread-safe in-process TTL cache for hot read endpoints."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after being set.
+
+    Routes run in FastAPI's threadpool, so every operation takes a lock. The
+    cache is per process: with several uvicorn workers each keeps its own copy,
+    which is why writers invalidate explicitly and ``ttl`` bounds staleness.
+
+    By default ``maxsize`` counts entries. With ``sizeof`` it bounds the sum
+    of ``sizeof(value)`` instead, for caches of values whose sizes vary
+    widely (e.g. encoded response bodies with ``sizeof=len``). A value larger
+    than ``maxsize`` on its own is not cached.
+
+    Usage:
+        SUMMARY_CACHE = TTLCache(maxsize=4096, ttl=30)
+        cached = SUMMARY_CACHE.get(key)
+        if cached is None:
+            cached = compute()
+            SUMMARY_CACHE.set(key, cached)
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        timer: Callable[[], float] = time.monotonic,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value, size = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self._size -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entry if full."""
+        size = self._sizeof(value) if self._sizeof else 1
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            if size > self.maxsize:
+                return
+            self._data[key] = (self._timer() + self.ttl, value, size)
+            self._size += size
+            while self._size > self.maxsize:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._size -= evicted
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove key and return its value (expired or not), or default."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return default
+            self._size -= entry[2]
+            return entry[1]
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
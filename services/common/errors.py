@@ -1,11 +1,16 @@
 """Standard error response models and exception handlers."""
 from __future__ import annotations
 
+import logging
+
+import psycopg
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 
 class ErrorResponse(BaseModel):
     """Standard error response body."""
@@ -43,3 +48,13 @@ def add_error_handlers(app: FastAPI) -> None:
             status_code=409,
             content={"error": "conflict", "detail": str(exc), "status_code": 409},
         )
+
+    @app.exception_handler(psycopg.Error)
+    async def database_error_handler(request: Request, exc: psycopg.Error):
+        # Routes let driver errors propagate instead of wrapping every handler
+        # in try/except; log the detail here and return a generic 500
+        logger.error("Database error on %s %s", request.method, request.url.path, exc_info=exc)
+        return JSONResponse(
+            status_code=500,
+            content={"error": "database_error", "detail": "Database error", "status_code": 500},
+        )
@@ -1,5 +1,18 @@
+import hashlib
+import json
+
+# Canonical JSON for content hashes. Stored hashes (market data snapshots, feeds)
+# depend on these exact bytes, so the encoding must not change: keys sorted,
+# compact separators, ASCII-escaped. Built once instead of per call, which is
+# what json.dumps does whenever it is given non-default options.
+_CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
 
-import json, hashlib
 def sha256_json(obj):
-    raw = json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    """Return "sha256:<hex>" over the canonical JSON encoding of obj.
+
+    hashlib.sha256 is OpenSSL's implementation, which already uses the CPU's
+    SHA extensions where available; the encoding is the larger cost.
+    """
+    raw = _CANONICAL_ENCODER.encode(obj).encode("utf-8")
     return "sha256:" + hashlib.sha256(raw).hexdigest()
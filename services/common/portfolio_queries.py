@@ -53,10 +53,10 @@ def build_issuer_aggregation_query(
       LEFT JOIN instrument_version iv ON instr.instrument_id = iv.instrument_id AND iv.status = 'APPROVED'
       LEFT JOIN reference_data ref ON (iv.terms_json ->> 'issuer_id') = ref.entity_id
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -106,10 +106,10 @@ def build_sector_aggregation_query(
       LEFT JOIN instrument_version iv ON instr.instrument_id = iv.instrument_id AND iv.status = 'APPROVED'
       LEFT JOIN reference_data ref ON (iv.terms_json ->> 'issuer_id') = ref.entity_id
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -167,10 +167,10 @@ def build_rating_aggregation_query(
       LEFT JOIN reference_data ref ON (iv.terms_json ->> 'issuer_id') = ref.entity_id
       LEFT JOIN latest_ratings lr ON ref.entity_id = lr.entity_id AND lr.agency = 'SP'
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -219,10 +219,10 @@ def build_geography_aggregation_query(
       LEFT JOIN instrument_version iv ON instr.instrument_id = iv.instrument_id AND iv.status = 'APPROVED'
       LEFT JOIN reference_data ref ON (iv.terms_json ->> 'issuer_id') = ref.entity_id
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -267,10 +267,10 @@ def build_currency_aggregation_query(
         COALESCE(fx.spot_rate, 1.0) AS fx_rate
       FROM position pos
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -318,10 +318,10 @@ def build_product_type_aggregation_query(
       FROM position pos
       LEFT JOIN instrument instr ON pos.instrument_id = instr.instrument_id
       LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-        AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+        AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
         AND vr.scenario_id = 'BASE'
       LEFT JOIN fx_spot fx ON fx.pair = pos.base_ccy || '/USD'
-        AND (%(sid)s IS NULL OR fx.snapshot_id = %(sid)s)
+        AND (%(sid)s::text IS NULL OR fx.snapshot_id = %(sid)s)
       WHERE pos.portfolio_node_id = %(port_id)s AND pos.status = 'ACTIVE'
     )
     SELECT
@@ -346,10 +346,10 @@ def build_product_type_aggregation_query(
 
 def build_hierarchy_tree_query(portfolio_id: str, run_id: str | None = None) -> tuple[str, dict]:
     """
-    Build recursive CTE query to fetch portfolio hierarchy tree.
+    Build query to fetch the portfolio hierarchy tree via the materialized path.
 
     Returns entire tree rooted at portfolio_id with:
-    - All descendant nodes (recursive)
+    - All descendant nodes (GIN-indexed path containment, no recursion)
     - Position count per node
     - PV sum per node (if run_id provided)
 
@@ -373,25 +373,20 @@ def build_hierarchy_tree_query(portfolio_id: str, run_id: str | None = None) ->
         }
     """
     query = """
-        WITH RECURSIVE hierarchy AS (
-          -- Base case: start with the root node
-          SELECT portfolio_node_id, name, parent_id, node_type,
-                 tags_json, metadata_json, created_at,
-                 1 AS depth,
-                 CAST(portfolio_node_id AS text) AS tree_path
+        WITH root AS (
+          SELECT cardinality(path) AS root_level
           FROM portfolio_node
           WHERE portfolio_node_id = %(pid)s
-
-          UNION ALL
-
-          -- Recursive case: find children
+        ),
+        hierarchy AS (
           SELECT pn.portfolio_node_id, pn.name, pn.parent_id, pn.node_type,
                  pn.tags_json, pn.metadata_json, pn.created_at,
-                 h.depth + 1,
-                 h.tree_path || '/' || pn.portfolio_node_id
+                 cardinality(pn.path) - r.root_level + 1 AS depth,
+                 array_to_string(pn.path[r.root_level:], '/') AS tree_path
           FROM portfolio_node pn
-          INNER JOIN hierarchy h ON pn.parent_id = h.portfolio_node_id
-          WHERE h.depth < 10  -- Prevent runaway recursion
+          CROSS JOIN root r
+          WHERE pn.path @> ARRAY[%(pid)s::text]
+            AND cardinality(pn.path) - r.root_level < 10  -- Same depth cap as before
         )
         SELECT h.*,
                COUNT(DISTINCT pos.position_id) AS position_count,
@@ -400,7 +395,7 @@ def build_hierarchy_tree_query(portfolio_id: str, run_id: str | None = None) ->
         LEFT JOIN position pos ON h.portfolio_node_id = pos.portfolio_node_id
           AND pos.status = 'ACTIVE'
         LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-          AND (%(rid)s IS NULL OR vr.run_id = %(rid)s)
+          AND (%(rid)s::text IS NULL OR vr.run_id = %(rid)s)
           AND vr.scenario_id = 'BASE'
         GROUP BY h.portfolio_node_id, h.name, h.parent_id, h.node_type,
                  h.tags_json, h.metadata_json, h.created_at, h.depth, h.tree_path
@@ -417,7 +412,10 @@ def build_hierarchy_tree_query(portfolio_id: str, run_id: str | None = None) ->
 
 def build_tree_structure(rows: list[dict]) -> dict | None:
     """
-    Convert flat CTE result rows into nested tree structure.
+    Convert flat hierarchy rows into nested tree structure in a single pass.
+
+    Rows must be ordered by tree_path (as build_hierarchy_tree_query returns
+    them), so the root comes first and every parent precedes its children.
 
     Args:
         rows: List of dicts from build_hierarchy_tree_query result
@@ -441,22 +439,17 @@ def build_tree_structure(rows: list[dict]) -> dict | None:
     if not rows:
         return None
 
-    # Build node lookup
+    root = None
     nodes = {}
     for row in rows:
         node = dict(row)
         node['children'] = []
         nodes[node['portfolio_node_id']] = node
 
-    # Link children to parents
-    root = None
-    for row in rows:
-        node = nodes[row['portfolio_node_id']]
-        if row['parent_id'] is None:
+        parent = nodes.get(row['parent_id'])
+        if parent is not None:
+            parent['children'].append(node)
+        elif root is None:
             root = node
-        else:
-            parent = nodes.get(row['parent_id'])
-            if parent:
-                parent['children'].append(node)
 
     return root
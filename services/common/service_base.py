@@ -1,9 +1,13 @@
 """Factory for creating FastAPI applications with common middleware and configuration."""
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from services.common.db import close_async_db, warm_db
 from services.common.health import add_health_endpoint
 from services.common.errors import add_error_handlers
 
@@ -15,11 +19,26 @@ def create_service_app(
 ) -> FastAPI:
     """Create a FastAPI app with standard middleware, health endpoint, and error handlers.
 
+    Responses are serialized with orjson (ORJSONResponse) rather than stdlib json,
+    and the database connection path is warmed at startup.
+
     Usage in each service's main.py:
         from services.common.service_base import create_service_app
         app = create_service_app(title="instrument-svc")
     """
-    app = FastAPI(title=title, version=version, description=description)
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        warm_db()
+        yield
+        await close_async_db()
+
+    app = FastAPI(
+        title=title,
+        version=version,
+        description=description,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
+    )
 
     # CORS
     app.add_middleware(
@@ -4,7 +4,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # ---------------------------------------------------------------------------
@@ -13,7 +13,11 @@ from pydantic import BaseModel, Field
 
 class PortfolioCreate(BaseModel):
     """Request body to create a new portfolio node."""
-    portfolio_id: str = Field(..., description="Unique portfolio identifier")
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    portfolio_id: Optional[str] = Field(
+        None, description="Unique portfolio identifier (server-generated, time-ordered, if omitted)"
+    )
     name: str
     parent_id: Optional[str] = Field(None, description="Parent portfolio node for hierarchy")
     portfolio_type: Literal["FUND", "SLEEVE", "STRATEGY", "BOOK", "DESK"] = "FUND"
@@ -35,11 +39,14 @@ class PortfolioOut(BaseModel):
 
 
 class PortfolioUpdate(BaseModel):
-    """Partial update for a portfolio."""
+    """Partial update for a portfolio.
+
+    Only name and metadata can be changed; any other field is rejected with
+    422 rather than silently ignored.
+    """
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     name: Optional[str] = None
-    parent_id: Optional[str] = None
-    portfolio_type: Optional[str] = None
-    currency: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
 
 
@@ -94,6 +101,18 @@ class PositionUpdate(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class PositionBatchDelete(BaseModel):
+    """Request body to soft-delete several positions at once."""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    ids: List[str] = Field(..., description="Position IDs to delete")
+
+
+class PositionBatchDeleteResponse(BaseModel):
+    """Positions actually deleted by a batch delete (already-deleted or unknown IDs are omitted)."""
+    deleted: List[str] = Field(default_factory=list)
+
+
 # ---------------------------------------------------------------------------
 # Aggregation
 # ---------------------------------------------------------------------------
@@ -155,6 +174,26 @@ class SnapshotCreate(BaseModel):
     include_hierarchy: bool = Field(False, description="Include child portfolios recursively")
 
 
+class SnapshotBatchCreate(BaseModel):
+    """Request body for snapshotting several portfolios as of one date."""
+    portfolio_node_ids: List[str]
+    as_of_date: datetime
+    include_hierarchy: bool = Field(False, description="Include child portfolios recursively")
+
+
+class SnapshotJobOut(BaseModel):
+    """Status of a snapshot queued for background creation."""
+    job_id: str
+    portfolio_node_id: str
+    as_of_date: datetime
+    include_hierarchy: bool = False
+    status: str
+    snapshot_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
 class SnapshotOut(BaseModel):
     """Response model for a portfolio snapshot."""
     snapshot_id: str
@@ -84,43 +84,39 @@ def create_instrument(req: InstrumentCreate):
     # Generate instrument ID
     instrument_id = f"{req.instrument_type.lower()}-{uuid4()}"
 
-    try:
-        with db_conn() as conn:
-            # Insert into instrument table
-            conn.execute(
-                """
-                INSERT INTO instrument (instrument_id, instrument_type, created_at)
-                VALUES (%(iid)s, %(itype)s, now())
-                """,
-                {"iid": instrument_id, "itype": req.instrument_type}
-            )
-
-            # Create initial version
-            conn.execute(
-                """
-                INSERT INTO instrument_version
-                  (instrument_id, version, terms_json, status, created_at, updated_at)
-                VALUES (%(iid)s, 1, %(terms)s::jsonb, 'APPROVED', now(), now())
-                """,
-                {"iid": instrument_id, "terms": req.terms_json}
-            )
+    with db_conn() as conn:
+        # Insert into instrument table
+        conn.execute(
+            """
+            INSERT INTO instrument (instrument_id, instrument_type, created_at)
+            VALUES (%(iid)s, %(itype)s, now())
+            """,
+            {"iid": instrument_id, "itype": req.instrument_type}
+        )
 
-            # Fetch created instrument
-            result = conn.execute(
-                """
-                SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
-                       iv.status, i.created_at
-                FROM instrument i
-                INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
-                WHERE i.instrument_id = %(iid)s AND iv.version = 1
-                """,
-                {"iid": instrument_id}
-            ).fetchone()
+        # Create initial version
+        conn.execute(
+            """
+            INSERT INTO instrument_version
+              (instrument_id, version, terms_json, status, created_at, updated_at)
+            VALUES (%(iid)s, 1, %(terms)s::jsonb, 'APPROVED', now(), now())
+            """,
+            {"iid": instrument_id, "terms": req.terms_json}
+        )
 
-            return InstrumentOut(**result)
+        # Fetch created instrument
+        result = conn.execute(
+            """
+            SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
+                   iv.status, i.created_at
+            FROM instrument i
+            INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
+            WHERE i.instrument_id = %(iid)s AND iv.version = 1
+            """,
+            {"iid": instrument_id}
+        ).fetchone()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return InstrumentOut(**result)
 
 
 @router.get("", response_model=List[InstrumentOut])
@@ -131,147 +127,125 @@ def list_instruments(
     offset: int = Query(0, description="Result offset", ge=0),
 ):
     """List instruments with filtering."""
-    try:
-        with db_conn() as conn:
-            # Build dynamic WHERE clause
-            where_parts = ["iv.status = 'APPROVED'"]
-            params = {"lim": limit, "off": offset}
-
-            if instrument_type:
-                where_parts.append("i.instrument_type = %(itype)s")
-                params["itype"] = instrument_type
-
-            if search:
-                where_parts.append(
-                    "(i.instrument_id ILIKE %(search)s OR iv.terms_json ->> 'issuer_id' ILIKE %(search)s)"
-                )
-                params["search"] = f"%{search}%"
-
-            where_clause = " AND ".join(where_parts)
-
-            query = f"""
-                SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
-                       iv.status, i.created_at
-                FROM instrument i
-                INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
-                WHERE {where_clause}
-                ORDER BY i.created_at DESC
-                LIMIT %(lim)s OFFSET %(off)s
-            """
+    with db_conn() as conn:
+        # Build dynamic WHERE clause
+        where_parts = ["iv.status = 'APPROVED'"]
+        params = {"lim": limit, "off": offset}
+
+        if instrument_type:
+            where_parts.append("i.instrument_type = %(itype)s")
+            params["itype"] = instrument_type
+
+        if search:
+            where_parts.append(
+                "(i.instrument_id ILIKE %(search)s OR iv.terms_json ->> 'issuer_id' ILIKE %(search)s)"
+            )
+            params["search"] = f"%{search}%"
 
-            rows = conn.execute(query, params).fetchall()
-            return [InstrumentOut(**row) for row in rows]
+        where_clause = " AND ".join(where_parts)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        query = f"""
+            SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
+                   iv.status, i.created_at
+            FROM instrument i
+            INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
+            WHERE {where_clause}
+            ORDER BY i.created_at DESC
+            LIMIT %(lim)s OFFSET %(off)s
+        """
+
+        rows = conn.execute(query, params).fetchall()
+        return [InstrumentOut(**row) for row in rows]
 
 
 @router.get("/{instrument_id}", response_model=InstrumentOut)
 def get_instrument(instrument_id: str):
     """Get a single instrument by ID."""
-    try:
-        with db_conn() as conn:
-            result = conn.execute(
-                """
-                SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
-                       iv.status, i.created_at
-                FROM instrument i
-                INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
-                WHERE i.instrument_id = %(iid)s AND iv.status = 'APPROVED'
-                ORDER BY iv.version DESC
-                LIMIT 1
-                """,
-                {"iid": instrument_id}
-            ).fetchone()
-
-            if not result:
-                raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
-
-            return InstrumentOut(**result)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    with db_conn() as conn:
+        result = conn.execute(
+            """
+            SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
+                   iv.status, i.created_at
+            FROM instrument i
+            INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
+            WHERE i.instrument_id = %(iid)s AND iv.status = 'APPROVED'
+            ORDER BY iv.version DESC
+            LIMIT 1
+            """,
+            {"iid": instrument_id}
+        ).fetchone()
+
+        if not result:
+            raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
+
+        return InstrumentOut(**result)
 
 
 @router.patch("/{instrument_id}", response_model=InstrumentOut)
 def update_instrument(instrument_id: str, req: InstrumentUpdate):
     """Update instrument by creating a new version."""
-    try:
-        with db_conn() as conn:
-            # Check if instrument exists
-            check = conn.execute(
-                "SELECT 1 FROM instrument WHERE instrument_id = %(iid)s",
-                {"iid": instrument_id}
-            ).fetchone()
-
-            if not check:
-                raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
-
-            # Create new version
-            conn.execute(
-                """
-                INSERT INTO instrument_version
-                  (instrument_id, version, terms_json, status, created_at, updated_at)
-                SELECT instrument_id, MAX(version) + 1,
-                       %(new_terms)s::jsonb, 'APPROVED', now(), now()
-                FROM instrument_version
-                WHERE instrument_id = %(iid)s
-                GROUP BY instrument_id
-                """,
-                {"iid": instrument_id, "new_terms": req.terms_json}
-            )
+    with db_conn() as conn:
+        # Check if instrument exists
+        check = conn.execute(
+            "SELECT 1 FROM instrument WHERE instrument_id = %(iid)s",
+            {"iid": instrument_id}
+        ).fetchone()
+
+        if not check:
+            raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
+
+        # Create new version
+        conn.execute(
+            """
+            INSERT INTO instrument_version
+              (instrument_id, version, terms_json, status, created_at, updated_at)
+            SELECT instrument_id, MAX(version) + 1,
+                   %(new_terms)s::jsonb, 'APPROVED', now(), now()
+            FROM instrument_version
+            WHERE instrument_id = %(iid)s
+            GROUP BY instrument_id
+            """,
+            {"iid": instrument_id, "new_terms": req.terms_json}
+        )
 
-            # Fetch updated instrument
-            result = conn.execute(
-                """
-                SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
-                       iv.status, i.created_at
-                FROM instrument i
-                INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
-                WHERE i.instrument_id = %(iid)s
-                ORDER BY iv.version DESC
-                LIMIT 1
-                """,
-                {"iid": instrument_id}
-            ).fetchone()
-
-            return InstrumentOut(**result)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        # Fetch updated instrument
+        result = conn.execute(
+            """
+            SELECT i.instrument_id, i.instrument_type, iv.version, iv.terms_json,
+                   iv.status, i.created_at
+            FROM instrument i
+            INNER JOIN instrument_version iv ON i.instrument_id = iv.instrument_id
+            WHERE i.instrument_id = %(iid)s
+            ORDER BY iv.version DESC
+            LIMIT 1
+            """,
+            {"iid": instrument_id}
+        ).fetchone()
+
+        return InstrumentOut(**result)
 
 
 @router.delete("/{instrument_id}", status_code=204)
 def delete_instrument(instrument_id: str):
     """Retire an instrument (soft delete)."""
-    try:
-        with db_conn() as conn:
-            # Check for active positions
-            position_count = conn.execute(
-                "SELECT count(*) as cnt FROM position WHERE instrument_id = %(iid)s AND status='ACTIVE'",
-                {"iid": instrument_id}
-            ).fetchone()
-
-            if position_count and position_count['cnt'] > 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Cannot delete instrument with active positions. Retire instead."
-                )
-
-            # Mark all versions as RETIRED
-            conn.execute(
-                "UPDATE instrument_version SET status='RETIRED' WHERE instrument_id = %(iid)s",
-                {"iid": instrument_id}
+    with db_conn() as conn:
+        # Check for active positions
+        position_count = conn.execute(
+            "SELECT count(*) as cnt FROM position WHERE instrument_id = %(iid)s AND status='ACTIVE'",
+            {"iid": instrument_id}
+        ).fetchone()
+
+        if position_count and position_count['cnt'] > 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot delete instrument with active positions. Retire instead."
             )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        # Mark all versions as RETIRED
+        conn.execute(
+            "UPDATE instrument_version SET status='RETIRED' WHERE instrument_id = %(iid)s",
+            {"iid": instrument_id}
+        )
 
 
 @router.post("/bulk-create", response_model=BulkCreateResult)
@@ -330,24 +304,18 @@ def bulk_create_instruments(req: BulkInstrumentCreate):
 @router.get("/{instrument_id}/versions", response_model=List[InstrumentVersionOut])
 def get_instrument_versions(instrument_id: str):
     """Get version history for an instrument."""
-    try:
-        with db_conn() as conn:
-            rows = conn.execute(
-                """
-                SELECT instrument_id, version, terms_json, status, created_at, updated_at
-                FROM instrument_version
-                WHERE instrument_id = %(iid)s
-                ORDER BY version DESC
-                """,
-                {"iid": instrument_id}
-            ).fetchall()
-
-            if not rows:
-                raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
-
-            return [InstrumentVersionOut(**row) for row in rows]
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    with db_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT instrument_id, version, terms_json, status, created_at, updated_at
+            FROM instrument_version
+            WHERE instrument_id = %(iid)s
+            ORDER BY version DESC
+            """,
+            {"iid": instrument_id}
+        ).fetchall()
+
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Instrument not found: {instrument_id}")
+
+        return [InstrumentVersionOut(**row) for row in rows]
@@ -1,11 +1,16 @@
 """Portfolio CRUD and hierarchy endpoints."""
 from __future__ import annotations
 
-from typing import List, Optional
-from uuid import uuid4
+import hashlib
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
+import orjson
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from psycopg.errors import ForeignKeyViolation
+from psycopg.types.json import Json
+from pydantic import BaseModel, ConfigDict
 
 from services.portfolio_svc.app.models import (
     PortfolioCreate,
@@ -13,218 +18,392 @@ from services.portfolio_svc.app.models import (
     PortfolioTreeNode,
     PortfolioUpdate,
 )
+from services.common.cache import TTLCache
 from services.common.db import db_conn
 from services.common.portfolio_queries import build_hierarchy_tree_query, build_tree_structure
 
 router = APIRouter()
 
+# Rows pulled per round-trip from the server-side cursor when streaming children
+CHILDREN_FETCH_SIZE = 256
+
+# Encoded /tree responses keyed by (portfolio_id, run_id, hierarchy version).
+# Writes bump the version (sql/007_portfolio_tree_version.sql), so stale
+# entries are simply never hit again and age out.
+TREE_CACHE = TTLCache(maxsize=1024, ttl=60)
+
+# Upper bound on nodes per POST /bulk request (one unnest() INSERT)
+BULK_CREATE_MAX_ITEMS = 1000
+
+
+def _portfolio_row_to_dict(row: dict) -> dict:
+    """Map a portfolio_node row onto the PortfolioOut wire shape.
+
+    Read endpoints return these dicts through _json_response directly; the rows
+    come straight from the database, so re-validating them through PortfolioOut
+    only adds per-row overhead. response_model is kept on the routes for the
+    OpenAPI schema.
+    """
+    return {
+        "portfolio_id": row['portfolio_node_id'],
+        "name": row['name'],
+        "parent_id": row['parent_id'],
+        "portfolio_type": row['node_type'],
+        "currency": 'USD',  # Default for now
+        "inception_date": None,
+        "metadata": row['metadata_json'],
+        "created_at": row['created_at'],
+    }
+
+
+def _json_response(content: Any, status_code: int = 200) -> Response:
+    """Encode content with orjson, UTC datetimes as ``...Z`` like pydantic does."""
+    return Response(
+        orjson.dumps(content, option=orjson.OPT_UTC_Z),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def _portfolio_body(row: dict) -> tuple[bytes, str]:
+    """Encode a portfolio_node row as a PortfolioOut body, with its strong ETag.
+
+    The ETag is a digest of the body itself, so it changes exactly when what
+    a client would see changes.
+    """
+    body = orjson.dumps(_portfolio_row_to_dict(row), option=orjson.OPT_UTC_Z)
+    return body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def _etag_matches(etag: str, header: str) -> bool:
+    """Whether an If-Match / If-None-Match header value lists etag (or is ``*``)."""
+    return header.strip() == "*" or etag in {tag.strip() for tag in header.split(",")}
+
+
+# Statement texts are kept at module level so every call sends byte-identical
+# SQL, letting psycopg's per-connection prepared-statement cache reuse the
+# server-side plan (see DB_PREPARE_THRESHOLD in services.common.db).
+# metadata_json is COALESCEd to '{}' in SQL: psycopg never runs a loader for
+# NULL, so this is the one place the default can be applied.
+LIST_ROOTS_SQL = """
+SELECT portfolio_node_id, name, parent_id, node_type,
+       tags_json, COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+FROM portfolio_node
+WHERE parent_id IS NULL
+ORDER BY created_at DESC
+"""
+
+PORTFOLIO_EXISTS_SQL = """
+SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s
+"""
+
+INSERT_PORTFOLIO_SQL = """
+INSERT INTO portfolio_node
+  (portfolio_node_id, parent_id, name, node_type, tags_json, metadata_json, created_at)
+VALUES (%(pid)s, %(parent)s, %(name)s, %(ntype)s, %(tags)s::jsonb, %(meta)s::jsonb, now())
+RETURNING portfolio_node_id, name, parent_id, node_type,
+          COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+"""
+
+# portfolio_node_id omitted: the column default assigns a time-ordered
+# 'port-<uuidv7>' ID (sql/005_portfolio_node_uuidv7.sql)
+INSERT_PORTFOLIO_DEFAULT_ID_SQL = """
+INSERT INTO portfolio_node
+  (parent_id, name, node_type, tags_json, metadata_json, created_at)
+VALUES (%(parent)s, %(name)s, %(ntype)s, %(tags)s::jsonb, %(meta)s::jsonb, now())
+RETURNING portfolio_node_id, name, parent_id, node_type,
+          COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+"""
+
+PORTFOLIOS_EXISTING_SQL = """
+SELECT portfolio_node_id FROM portfolio_node WHERE portfolio_node_id = ANY(%(pids)s)
+"""
+
+# One INSERT for a whole batch; rows are inserted in request order so the
+# path trigger sees parents created earlier in the same batch
+BULK_INSERT_PORTFOLIOS_SQL = """
+INSERT INTO portfolio_node
+  (portfolio_node_id, parent_id, name, node_type, tags_json, metadata_json, created_at)
+SELECT COALESCE(b.pid, 'port-' || uuid_generate_v7()::text), b.parent, b.name, b.ntype,
+       '{}'::jsonb, b.meta::jsonb, now()
+FROM unnest(%(pids)s::text[], %(parents)s::text[], %(names)s::text[],
+            %(ntypes)s::text[], %(metas)s::text[])
+     WITH ORDINALITY AS b(pid, parent, name, ntype, meta, ord)
+ORDER BY b.ord
+RETURNING portfolio_node_id, name, parent_id, node_type,
+          COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+"""
+
+GET_PORTFOLIO_SQL = """
+SELECT portfolio_node_id, name, parent_id, node_type,
+       COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+FROM portfolio_node
+WHERE portfolio_node_id = %(pid)s
+"""
+
+# PATCH with If-Match: the row is locked while its ETag is checked, so no
+# other write can land between the check and the UPDATE
+LOCK_PORTFOLIO_SQL = GET_PORTFOLIO_SQL + "FOR UPDATE\n"
+
+# PATCH statements for each combination of updatable fields, selected by a
+# bitmask (bit 0: name, bit 1: metadata) so no SQL is formatted per request
+_PORTFOLIO_RETURNING = (
+    "RETURNING portfolio_node_id, name, parent_id, node_type,"
+    " COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at"
+)
+UPDATE_PORTFOLIO_SQL = {
+    0b01: f"UPDATE portfolio_node SET name = %(name)s WHERE portfolio_node_id = %(pid)s {_PORTFOLIO_RETURNING}",
+    0b10: f"UPDATE portfolio_node SET metadata_json = %(meta)s::jsonb WHERE portfolio_node_id = %(pid)s {_PORTFOLIO_RETURNING}",
+    0b11: (
+        "UPDATE portfolio_node SET name = %(name)s, metadata_json = %(meta)s::jsonb"
+        f" WHERE portfolio_node_id = %(pid)s {_PORTFOLIO_RETURNING}"
+    ),
+}
+
+PORTFOLIO_DEPENDENTS_SQL = """
+SELECT EXISTS(SELECT 1 FROM portfolio_node WHERE parent_id = %(pid)s) AS has_children,
+       EXISTS(SELECT 1 FROM position WHERE portfolio_node_id = %(pid)s) AS has_positions
+"""
+
+DELETE_PORTFOLIO_SQL = """
+DELETE FROM portfolio_node WHERE portfolio_node_id = %(pid)s
+"""
+
+GET_CHILDREN_SQL = """
+SELECT portfolio_node_id, name, parent_id, node_type,
+       COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+FROM portfolio_node
+WHERE parent_id = %(pid)s
+ORDER BY created_at ASC
+"""
+
+GET_CHILDREN_BATCH_SQL = """
+SELECT portfolio_node_id, name, parent_id, node_type,
+       COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+FROM portfolio_node
+WHERE parent_id = ANY(%(pids)s)
+ORDER BY parent_id, created_at ASC
+"""
+
+HIERARCHY_VERSION_SQL = """
+SELECT last_value AS version FROM portfolio_hierarchy_version_seq
+"""
+
+REPARENT_CHECKS_SQL = """
+SELECT
+  EXISTS(SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s) AS portfolio_exists,
+  %(new_pid)s::text IS NULL
+    OR EXISTS(SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(new_pid)s) AS parent_exists,
+  EXISTS(
+    SELECT 1 FROM portfolio_node
+    WHERE portfolio_node_id = %(new_pid)s AND path @> ARRAY[%(pid)s::text]
+  ) AS creates_cycle
+"""
+
+REPARENT_SQL = """
+UPDATE portfolio_node SET parent_id = %(new_pid)s WHERE portfolio_node_id = %(pid)s
+RETURNING portfolio_node_id, name, parent_id, node_type,
+          COALESCE(metadata_json, '{}'::jsonb) AS metadata_json, created_at
+"""
+
 
 class ReparentRequest(BaseModel):
     """Request body for reparenting a portfolio."""
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     new_parent_id: Optional[str] = None
 
 
 @router.get("", response_model=List[PortfolioOut])
 def list_portfolios():
     """List all root portfolios (no parent)."""
-    try:
-        with db_conn() as conn:
-            rows = conn.execute(
-                """
-                SELECT portfolio_node_id, name, parent_id, node_type,
-                       tags_json, metadata_json, created_at
-                FROM portfolio_node
-                WHERE parent_id IS NULL
-                ORDER BY created_at DESC
-                """
-            ).fetchall()
+    with db_conn() as conn:
+        rows = conn.execute(LIST_ROOTS_SQL).fetchall()
+        return _json_response([_portfolio_row_to_dict(row) for row in rows])
 
-            # Convert to PortfolioOut model format
-            portfolios = []
-            for row in rows:
-                portfolios.append(PortfolioOut(
-                    portfolio_id=row['portfolio_node_id'],
-                    name=row['name'],
-                    parent_id=row['parent_id'],
-                    portfolio_type=row['node_type'],
-                    currency='USD',  # Default for now
-                    metadata=row['metadata_json'] or {},
-                    created_at=row['created_at']
-                ))
 
-            return portfolios
+@router.get("/children", response_model=Dict[str, List[PortfolioOut]])
+def get_children_batch(
+    ids: List[str] = Query(..., description="Parent portfolio IDs whose direct children to load"),
+):
+    """Get direct children for many portfolio nodes in one round-trip.
+
+    Clients expanding several tree nodes at once should use this instead of
+    calling /{portfolio_id}/children per node. Every requested ID appears in
+    the result; unknown IDs or leaves map to an empty list.
+    """
+    with db_conn() as conn:
+        rows = conn.execute(GET_CHILDREN_BATCH_SQL, {"pids": ids}).fetchall()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    children: Dict[str, list] = {pid: [] for pid in ids}
+    for row in rows:
+        children[row['parent_id']].append(_portfolio_row_to_dict(row))
+    return _json_response(children)
 
 
 @router.post("", response_model=PortfolioOut, status_code=201)
 def create_portfolio(req: PortfolioCreate):
     """Create a new portfolio node."""
-    try:
-        with db_conn() as conn:
-            # Validate parent exists if provided
-            if req.parent_id:
-                parent = conn.execute(
-                    "SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                    {"pid": req.parent_id}
-                ).fetchone()
-                if not parent:
-                    raise HTTPException(status_code=404, detail=f"Parent portfolio not found: {req.parent_id}")
-
-            # Generate portfolio ID
-            portfolio_id = req.portfolio_id if hasattr(req, 'portfolio_id') and req.portfolio_id else f"port-{uuid4()}"
-
-            # Insert portfolio node
-            conn.execute(
-                """
-                INSERT INTO portfolio_node
-                  (portfolio_node_id, parent_id, name, node_type, tags_json, metadata_json, created_at)
-                VALUES (%(pid)s, %(parent)s, %(name)s, %(ntype)s, %(tags)s::jsonb, %(meta)s::jsonb, now())
-                """,
+    with db_conn() as conn:
+        # Insert portfolio node; the database assigns the ID when none is given.
+        # A missing parent is caught by the parent_id foreign key rather than
+        # an up-front existence probe, saving a round-trip on the happy path.
+        try:
+            result = conn.execute(
+                INSERT_PORTFOLIO_SQL if req.portfolio_id else INSERT_PORTFOLIO_DEFAULT_ID_SQL,
                 {
-                    "pid": portfolio_id,
+                    "pid": req.portfolio_id,
                     "parent": req.parent_id,
                     "name": req.name,
                     "ntype": req.portfolio_type,
-                    "tags": {},
-                    "meta": req.metadata or {}
+                    "tags": Json({}),
+                    "meta": Json(req.metadata or {})
                 }
-            )
-
-            # Fetch created portfolio
-            result = conn.execute(
-                """
-                SELECT portfolio_node_id, name, parent_id, node_type, metadata_json, created_at
-                FROM portfolio_node
-                WHERE portfolio_node_id = %(pid)s
-                """,
-                {"pid": portfolio_id}
             ).fetchone()
+        except ForeignKeyViolation:
+            raise HTTPException(status_code=404, detail=f"Parent portfolio not found: {req.parent_id}")
+
+        return _json_response(_portfolio_row_to_dict(result), status_code=201)
+
+
+@router.post("/bulk", response_model=List[PortfolioOut], status_code=201)
+def create_portfolios_bulk(items: List[PortfolioCreate]):
+    """Create many portfolio nodes in a single INSERT.
+
+    A node's parent must either already exist or appear earlier in the batch,
+    so a whole hierarchy can be imported in one call.
+    """
+    if len(items) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many portfolios in one request (max {BULK_CREATE_MAX_ITEMS})"
+        )
+    if not items:
+        return _json_response([], status_code=201)
+
+    # Parents not created earlier in this batch must already be in the database
+    batch_ids = set()
+    external_parents = set()
+    for item in items:
+        if item.parent_id and item.parent_id not in batch_ids:
+            external_parents.add(item.parent_id)
+        if item.portfolio_id:
+            batch_ids.add(item.portfolio_id)
+
+    with db_conn() as conn:
+        if external_parents:
+            found = conn.execute(
+                PORTFOLIOS_EXISTING_SQL, {"pids": list(external_parents)}
+            ).fetchall()
+            missing = external_parents - {row['portfolio_node_id'] for row in found}
+            if missing:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Parent portfolio not found: {', '.join(sorted(missing))}"
+                )
 
-            return PortfolioOut(
-                portfolio_id=result['portfolio_node_id'],
-                name=result['name'],
-                parent_id=result['parent_id'],
-                portfolio_type=result['node_type'],
-                currency='USD',
-                metadata=result['metadata_json'] or {},
-                created_at=result['created_at']
-            )
+        rows = conn.execute(
+            BULK_INSERT_PORTFOLIOS_SQL,
+            {
+                "pids": [item.portfolio_id for item in items],
+                "parents": [item.parent_id for item in items],
+                "names": [item.name for item in items],
+                "ntypes": [item.portfolio_type for item in items],
+                "metas": [orjson.dumps(item.metadata or {}).decode() for item in items],
+            }
+        ).fetchall()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return _json_response([_portfolio_row_to_dict(row) for row in rows], status_code=201)
 
 
 @router.get("/{portfolio_id}", response_model=PortfolioOut)
-def get_portfolio(portfolio_id: str):
-    """Get a single portfolio by ID."""
-    try:
-        with db_conn() as conn:
-            result = conn.execute(
-                """
-                SELECT portfolio_node_id, name, parent_id, node_type, metadata_json, created_at
-                FROM portfolio_node
-                WHERE portfolio_node_id = %(pid)s
-                """,
-                {"pid": portfolio_id}
-            ).fetchone()
+def get_portfolio(
+    portfolio_id: str,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Get a single portfolio by ID.
 
-            if not result:
-                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+    The response carries an ETag; a request whose If-None-Match lists it is
+    answered with 304 Not Modified and no body.
+    """
+    with db_conn() as conn:
+        result = conn.execute(GET_PORTFOLIO_SQL, {"pid": portfolio_id}).fetchone()
 
-            return PortfolioOut(
-                portfolio_id=result['portfolio_node_id'],
-                name=result['name'],
-                parent_id=result['parent_id'],
-                portfolio_type=result['node_type'],
-                currency='USD',
-                metadata=result['metadata_json'] or {},
-                created_at=result['created_at']
-            )
+    if not result:
+        raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    body, etag = _portfolio_body(result)
+    if if_none_match is not None and _etag_matches(etag, if_none_match):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.patch("/{portfolio_id}", response_model=PortfolioOut)
-def update_portfolio(portfolio_id: str, req: PortfolioUpdate):
-    """Partially update a portfolio."""
-    try:
-        with db_conn() as conn:
-            # Build dynamic update
-            updates = []
-            params = {"pid": portfolio_id}
-
-            if req.name is not None:
-                updates.append("name = %(name)s")
-                params["name"] = req.name
-
-            if req.metadata is not None:
-                updates.append("metadata_json = %(meta)s::jsonb")
-                params["meta"] = req.metadata
-
-            if not updates:
-                # Nothing to update, just return current
-                return get_portfolio(portfolio_id)
-
-            # Execute update
-            conn.execute(
-                f"UPDATE portfolio_node SET {', '.join(updates)} WHERE portfolio_node_id = %(pid)s",
-                params
-            )
+def update_portfolio(
+    portfolio_id: str,
+    req: PortfolioUpdate,
+    if_match: Optional[str] = Header(None),
+):
+    """Partially update a portfolio.
+
+    With If-Match, the update only applies if the portfolio still has one of
+    the listed ETags (from GET or an earlier PATCH), otherwise 412. A body
+    that sets no field changes nothing and returns the current portfolio.
+    The response carries the portfolio's new ETag.
+    """
+    flag = (req.name is not None) | ((req.metadata is not None) << 1)
+    params = {
+        "pid": portfolio_id,
+        "name": req.name,
+        "meta": Json(req.metadata) if req.metadata is not None else None,
+    }
+
+    with db_conn() as conn:
+        if if_match is not None:
+            current = conn.execute(LOCK_PORTFOLIO_SQL, params).fetchone()
+            if not current:
+                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+            if not _etag_matches(_portfolio_body(current)[1], if_match):
+                raise HTTPException(status_code=412, detail="Portfolio has changed since it was read")
 
-            return get_portfolio(portfolio_id)
+        # Update and read back the fresh row in the same statement; an empty
+        # body just reads the row (the lock above already has it for If-Match)
+        if flag:
+            result = conn.execute(UPDATE_PORTFOLIO_SQL[flag], params).fetchone()
+        elif if_match is not None:
+            result = current
+        else:
+            result = conn.execute(GET_PORTFOLIO_SQL, params).fetchone()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if not result:
+        raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+
+    body, etag = _portfolio_body(result)
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.delete("/{portfolio_id}", status_code=204)
 def delete_portfolio(portfolio_id: str):
     """Delete a portfolio node."""
-    try:
-        with db_conn() as conn:
-            # Check for children
-            children = conn.execute(
-                "SELECT count(*) as cnt FROM portfolio_node WHERE parent_id = %(pid)s",
-                {"pid": portfolio_id}
-            ).fetchone()
-
-            if children and children['cnt'] > 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Cannot delete portfolio with children"
-                )
-
-            # Check for positions
-            positions = conn.execute(
-                "SELECT count(*) as cnt FROM position WHERE portfolio_node_id = %(pid)s",
-                {"pid": portfolio_id}
-            ).fetchone()
-
-            if positions and positions['cnt'] > 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Cannot delete portfolio with positions"
-                )
+    with db_conn() as conn:
+        # Check for children and positions in one round-trip; EXISTS stops
+        # at the first matching row instead of counting them all
+        deps = conn.execute(PORTFOLIO_DEPENDENTS_SQL, {"pid": portfolio_id}).fetchone()
+
+        if deps['has_children']:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot delete portfolio with children"
+            )
 
-            # Delete portfolio
-            conn.execute(
-                "DELETE FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                {"pid": portfolio_id}
+        if deps['has_positions']:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot delete portfolio with positions"
             )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        # Delete portfolio
+        conn.execute(DELETE_PORTFOLIO_SQL, {"pid": portfolio_id})
 
 
 @router.get("/{portfolio_id}/tree", response_model=PortfolioTreeNode)
@@ -233,138 +412,105 @@ def get_portfolio_tree(
     run_id: Optional[str] = Query(None, description="Run ID for PV aggregation")
 ):
     """Get the full hierarchy tree rooted at the given portfolio."""
-    try:
-        with db_conn() as conn:
-            # Build and execute hierarchy query
-            query, params = build_hierarchy_tree_query(portfolio_id, run_id)
-            rows = conn.execute(query, params).fetchall()
-
-            if not rows:
-                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
-
-            # Convert flat rows to tree structure
-            tree = build_tree_structure(rows)
-
-            if not tree:
-                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
-
-            # Convert to PortfolioTreeNode (simplified - just ID, name, type, children)
-            def convert_to_tree_node(node):
-                return PortfolioTreeNode(
-                    portfolio_id=node['portfolio_node_id'],
-                    name=node['name'],
-                    portfolio_type=node['node_type'],
-                    children=[convert_to_tree_node(child) for child in node.get('children', [])]
-                )
-
-            return convert_to_tree_node(tree)
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    with db_conn() as conn:
+        # Serve the encoded tree from cache while the hierarchy is unchanged
+        version = conn.execute(HIERARCHY_VERSION_SQL).fetchone()['version']
+        cache_key = (portfolio_id, run_id, version)
+        cached = TREE_CACHE.get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        # Build and execute hierarchy query
+        query, params = build_hierarchy_tree_query(portfolio_id, run_id)
+        rows = conn.execute(query, params).fetchall()
+
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+
+        # Convert flat rows to tree structure
+        tree = build_tree_structure(rows)
+
+        if not tree:
+            raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+
+        # Convert to PortfolioTreeNode shape (simplified - just ID, name, type, children)
+        # as plain dicts; the nodes come from our own query, so per-node model
+        # validation would only add overhead on large trees
+        def convert_to_tree_node(node):
+            return {
+                "portfolio_id": node['portfolio_node_id'],
+                "name": node['name'],
+                "portfolio_type": node['node_type'],
+                "children": [convert_to_tree_node(child) for child in node.get('children', [])],
+            }
+
+        body = orjson.dumps(convert_to_tree_node(tree), option=orjson.OPT_UTC_Z)
+        TREE_CACHE.set(cache_key, body)
+        return Response(content=body, media_type="application/json")
 
 
 @router.get("/{portfolio_id}/children", response_model=List[PortfolioOut])
 def get_portfolio_children(portfolio_id: str):
     """Get direct children of a portfolio node."""
-    try:
-        with db_conn() as conn:
-            # Check parent exists
-            parent = conn.execute(
-                "SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                {"pid": portfolio_id}
-            ).fetchone()
+    chunks = _stream_children_json(portfolio_id)
+    # Advance to the first chunk here so the existence check (and any
+    # connection error) surfaces as a proper status before streaming starts
+    first = next(chunks)
 
-            if not parent:
-                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+    return StreamingResponse(chain([first], chunks), media_type="application/json")
 
-            # Get children
-            rows = conn.execute(
-                """
-                SELECT portfolio_node_id, name, parent_id, node_type, metadata_json, created_at
-                FROM portfolio_node
-                WHERE parent_id = %(pid)s
-                ORDER BY created_at ASC
-                """,
-                {"pid": portfolio_id}
-            ).fetchall()
 
-            portfolios = []
-            for row in rows:
-                portfolios.append(PortfolioOut(
-                    portfolio_id=row['portfolio_node_id'],
-                    name=row['name'],
-                    parent_id=row['parent_id'],
-                    portfolio_type=row['node_type'],
-                    currency='USD',
-                    metadata=row['metadata_json'] or {},
-                    created_at=row['created_at']
-                ))
+def _stream_children_json(portfolio_id: str) -> Iterator[bytes]:
+    """Yield the children of a portfolio as a JSON array, a batch at a time.
 
-            return portfolios
+    Reads through a server-side cursor so peak memory is bounded by
+    CHILDREN_FETCH_SIZE rows rather than the full child list.
+    """
+    with db_conn() as conn:
+        # Check parent exists
+        parent = conn.execute(PORTFOLIO_EXISTS_SQL, {"pid": portfolio_id}).fetchone()
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        if not parent:
+            raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+
+        yield b"["
+        with conn.cursor(name="portfolio_children") as cur:
+            cur.execute(GET_CHILDREN_SQL, {"pid": portfolio_id})
+            separator = b""
+            while rows := cur.fetchmany(CHILDREN_FETCH_SIZE):
+                for row in rows:
+                    yield separator + orjson.dumps(_portfolio_row_to_dict(row), option=orjson.OPT_UTC_Z)
+                    separator = b","
+        yield b"]"
 
 
 @router.post("/{portfolio_id}/reparent", response_model=PortfolioOut)
 def reparent_portfolio(portfolio_id: str, req: ReparentRequest):
     """Move a portfolio under a different parent node."""
-    try:
-        with db_conn() as conn:
-            # Validate portfolio exists
-            portfolio = conn.execute(
-                "SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                {"pid": portfolio_id}
-            ).fetchone()
-
-            if not portfolio:
-                raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
-
-            # Validate new parent exists (if provided)
-            if req.new_parent_id:
-                new_parent = conn.execute(
-                    "SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                    {"pid": req.new_parent_id}
-                ).fetchone()
-
-                if not new_parent:
-                    raise HTTPException(status_code=404, detail=f"New parent portfolio not found: {req.new_parent_id}")
-
-                # Check if new parent is a descendant (would create cycle)
-                # Use recursive query to find all descendants
-                descendants = conn.execute(
-                    """
-                    WITH RECURSIVE descendants AS (
-                      SELECT portfolio_node_id FROM portfolio_node WHERE portfolio_node_id = %(pid)s
-                      UNION ALL
-                      SELECT pn.portfolio_node_id
-                      FROM portfolio_node pn
-                      INNER JOIN descendants d ON pn.parent_id = d.portfolio_node_id
-                    )
-                    SELECT 1 FROM descendants WHERE portfolio_node_id = %(new_pid)s
-                    """,
-                    {"pid": portfolio_id, "new_pid": req.new_parent_id}
-                ).fetchone()
-
-                if descendants:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="Cannot reparent: new parent is a descendant (would create cycle)"
-                    )
-
-            # Update parent
-            conn.execute(
-                "UPDATE portfolio_node SET parent_id = %(new_pid)s WHERE portfolio_node_id = %(pid)s",
-                {"pid": portfolio_id, "new_pid": req.new_parent_id}
+    with db_conn() as conn:
+        # Validate portfolio, new parent and cycle-freedom in one round-trip.
+        # The new parent is a descendant iff its materialized path contains us.
+        checks = conn.execute(
+            REPARENT_CHECKS_SQL,
+            {"pid": portfolio_id, "new_pid": req.new_parent_id}
+        ).fetchone()
+
+        if not checks['portfolio_exists']:
+            raise HTTPException(status_code=404, detail=f"Portfolio not found: {portfolio_id}")
+
+        if not checks['parent_exists']:
+            raise HTTPException(status_code=404, detail=f"New parent portfolio not found: {req.new_parent_id}")
+
+        if checks['creates_cycle']:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot reparent: new parent is a descendant (would create cycle)"
             )
 
-            return get_portfolio(portfolio_id)
+        # Update parent
+        result = conn.execute(
+            REPARENT_SQL, {"pid": portfolio_id, "new_pid": req.new_parent_id}
+        ).fetchone()
+
+        return _json_response(_portfolio_row_to_dict(result))
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -1,260 +1,514 @@
 """Position tracking and holdings endpoints."""
 from __future__ import annotations
 
-from typing import List, Optional
+import base64
+import os
+from datetime import datetime
+from itertools import chain
+from typing import Iterator, List, Optional, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from psycopg.errors import UniqueViolation
+from psycopg.types.json import Json
+from pydantic import TypeAdapter
 
 from services.portfolio_svc.app.models import (
+    PositionBatchDelete,
+    PositionBatchDeleteResponse,
     PositionCreate,
     PositionOut,
     PositionUpdate,
 )
-from services.common.db import db_conn
+from services.common.cache import TTLCache
+from services.common.db import async_db_conn, db_conn
 
 router = APIRouter()
 
+# List endpoints alias their columns to PositionOut field names and validate
+# the whole result in one call instead of building each model by hand
+_POSITIONS_ADAPTER = TypeAdapter(List[PositionOut])
+
+# Set HOLDINGS_RECURSIVE_CTE=1 to resolve include_children holdings with the
+# recursive CTE instead of the materialized path
+HOLDINGS_RECURSIVE_CTE = os.getenv("HOLDINGS_RECURSIVE_CTE", "0") == "1"
+
+# Upper bound on positions per bulk create (one unnest() INSERT) or batch delete
+BULK_MAX_ITEMS = 1000
+
+# get_holdings_summary results keyed by portfolio ID. Position writes evict
+# their portfolio's entry once committed; the TTL bounds staleness from writes
+# made through other workers or outside this service.
+SUMMARY_CACHE = TTLCache(maxsize=4096, ttl=30)
+
+# get_position results keyed by position ID, for valuation pipelines that look
+# up the same positions repeatedly. Updates write the new row through; deletes
+# evict. The TTL bounds staleness as above.
+POSITION_CACHE = TTLCache(maxsize=16384, ttl=30)
+
+# Rows pulled per round-trip from the server-side cursor when streaming holdings
+HOLDINGS_FETCH_SIZE = 1000
+
+# Position columns joined with instrument (alias i): every PositionOut field,
+# named, typed and ordered as the model. Numerics are cast to float8 and NULL
+# tags defaulted in SQL, so rows feed the models (or orjson, when streamed)
+# as-is with no per-row Python coercion.
+_HOLDINGS_COLUMNS = """
+SELECT p.position_id, p.portfolio_node_id AS portfolio_id, p.instrument_id,
+       COALESCE(i.instrument_type, 'UNKNOWN') AS product_type,
+       p.quantity::float8 AS quantity, p.cost_basis::float8 AS cost_basis,
+       p.base_ccy AS currency,
+       NULL::timestamptz AS trade_date, NULL::timestamptz AS settlement_date,
+       NULL::text AS counterparty,
+       COALESCE(p.tags_json, '{}'::jsonb) AS metadata, p.created_at
+"""
+
+GET_POSITION_SQL = _HOLDINGS_COLUMNS + """
+FROM position p
+LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
+WHERE p.position_id = %(pid)s
+"""
+
+HOLDINGS_SQL = _HOLDINGS_COLUMNS + """
+FROM position p
+LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
+WHERE p.portfolio_node_id = %(pid)s AND p.status = 'ACTIVE'
+ORDER BY p.created_at DESC
+"""
+
+# Positions of a portfolio and all its descendants: one GIN index probe on the
+# materialized ancestor path (sql/004_portfolio_path.sql), no recursion
+HOLDINGS_WITH_CHILDREN_SQL = _HOLDINGS_COLUMNS + """
+FROM portfolio_node pn
+JOIN position p ON p.portfolio_node_id = pn.portfolio_node_id
+LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
+WHERE pn.path @> ARRAY[%(pid)s::text] AND p.status = 'ACTIVE'
+ORDER BY p.created_at DESC
+"""
+
+# Recursive-walk equivalent of HOLDINGS_WITH_CHILDREN_SQL, kept for checking
+# results against the path-based query (HOLDINGS_RECURSIVE_CTE=1)
+HOLDINGS_WITH_CHILDREN_CTE_SQL = """
+WITH RECURSIVE descendants AS (
+  SELECT portfolio_node_id FROM portfolio_node WHERE portfolio_node_id = %(pid)s
+  UNION ALL
+  SELECT pn.portfolio_node_id
+  FROM portfolio_node pn
+  INNER JOIN descendants d ON pn.parent_id = d.portfolio_node_id
+)""" + _HOLDINGS_COLUMNS + """
+FROM position p
+LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
+INNER JOIN descendants d ON p.portfolio_node_id = d.portfolio_node_id
+WHERE p.status = 'ACTIVE'
+ORDER BY p.created_at DESC
+"""
+
+# The position's BASE results come from valuation_result_position_idx
+# (sql/010_valuation_result_position_index.sql); each one then looks up its
+# run's as_of_time by primary key, so only that position's runs are touched
+LATEST_VALUATION_SQL = """
+SELECT vr.*, r.as_of_time
+FROM valuation_result vr
+JOIN LATERAL (SELECT as_of_time FROM run WHERE run_id = vr.run_id) r ON true
+WHERE vr.position_id = %(pid)s
+  AND vr.scenario_id = 'BASE'
+ORDER BY r.as_of_time DESC
+LIMIT 1
+"""
+
+POSITION_REFS_EXIST_SQL = """
+SELECT EXISTS(SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s) AS portfolio_exists,
+       EXISTS(SELECT 1 FROM instrument WHERE instrument_id = %(iid)s) AS instrument_exists
+"""
+
+INSERT_POSITION_SQL = """
+INSERT INTO position
+  (position_id, portfolio_node_id, instrument_id, quantity, base_ccy,
+   cost_basis, book_value, tags_json, status, created_at, updated_at)
+VALUES (%(pid)s, %(port_id)s, %(inst_id)s, %(qty)s, %(ccy)s,
+        %(cost)s, %(book)s, %(tags)s::jsonb, 'ACTIVE', now(), now())
+RETURNING position_id, portfolio_node_id AS portfolio_id, instrument_id,
+          quantity::float8 AS quantity, cost_basis::float8 AS cost_basis,
+          base_ccy AS currency, COALESCE(tags_json, '{}'::jsonb) AS metadata, created_at
+"""
+
+POSITION_REFS_EXISTING_SQL = """
+SELECT ARRAY(SELECT portfolio_node_id FROM portfolio_node
+             WHERE portfolio_node_id = ANY(%(pids)s)) AS portfolios,
+       ARRAY(SELECT instrument_id FROM instrument
+             WHERE instrument_id = ANY(%(iids)s)) AS instruments
+"""
+
+# One INSERT for a whole batch, planned once however many rows it carries
+BULK_INSERT_POSITIONS_SQL = """
+INSERT INTO position
+  (position_id, portfolio_node_id, instrument_id, quantity, base_ccy,
+   cost_basis, book_value, tags_json, status, created_at, updated_at)
+SELECT b.pid, b.port_id, b.inst_id, b.qty, b.ccy, b.cost, b.cost, b.tags::jsonb, 'ACTIVE', now(), now()
+FROM unnest(%(pids)s::text[], %(port_ids)s::text[], %(inst_ids)s::text[],
+            %(qtys)s::numeric[], %(ccys)s::text[], %(costs)s::numeric[], %(tags)s::text[])
+     WITH ORDINALITY AS b(pid, port_id, inst_id, qty, ccy, cost, tags, ord)
+ORDER BY b.ord
+RETURNING position_id, portfolio_node_id AS portfolio_id, instrument_id,
+          quantity::float8 AS quantity, cost_basis::float8 AS cost_basis,
+          base_ccy AS currency, COALESCE(tags_json, '{}'::jsonb) AS metadata, created_at
+"""
+
+# Soft delete for one or many positions; rows already DELETED are skipped so
+# only positions this call actually removed are returned
+DELETE_POSITIONS_SQL = """
+UPDATE position SET status = 'DELETED', updated_at = now()
+WHERE position_id = ANY(%(ids)s) AND status <> 'DELETED'
+RETURNING position_id, portfolio_node_id
+"""
+
+def _list_positions_sql(flags: int) -> str:
+    """Build the list_positions statement for one combination of filters.
+
+    Bit 0: portfolio, bit 1: instrument, bit 2: explicit status (otherwise
+    ACTIVE only), bit 3: keyset cursor.
+    """
+    # Predicates are emitted most selective first: instrument, portfolio, then
+    # status. The planner does its own costing (helped by position_filter_stats,
+    # sql/013_position_extended_statistics.sql), but keep this order when adding
+    # filters so the statement text stays stable and reads in selectivity order.
+    where_parts = []
+    if flags & 0b0010:
+        where_parts.append("instrument_id = %(inst_id)s")
+    if flags & 0b0001:
+        where_parts.append("portfolio_node_id = %(port_id)s")
+    if flags & 0b0100:
+        where_parts.append("status = %(status)s")
+    else:
+        # Default to ACTIVE only
+        where_parts.append("status = 'ACTIVE'")
+    if flags & 0b1000:
+        where_parts.append("(created_at, position_id) < (%(after_ts)s, %(after_id)s)")
+
+    return f"""
+SELECT position_id, portfolio_node_id AS portfolio_id, instrument_id,
+       'UNKNOWN' AS product_type,  -- Would need to join to instrument table
+       quantity::float8 AS quantity, cost_basis::float8 AS cost_basis,
+       base_ccy AS currency,
+       NULL::timestamptz AS trade_date, NULL::timestamptz AS settlement_date,
+       NULL::text AS counterparty,
+       COALESCE(tags_json, '{{}}'::jsonb) AS metadata, created_at
+FROM position
+WHERE {" AND ".join(where_parts)}
+ORDER BY created_at DESC, position_id DESC
+LIMIT %(lim)s
+"""
+
+
+# Every filter combination is rendered once at import, so each request sends
+# one of a fixed set of byte-identical statements and psycopg's prepared
+# statement cache stays warm (see portfolios.UPDATE_PORTFOLIO_SQL)
+LIST_POSITIONS_SQL = {flags: _list_positions_sql(flags) for flags in range(16)}
+
+# Shared by the position UPDATEs (table aliased as p): returns the row named as
+# PositionOut fields, instrument type included, straight from the write itself
+_POSITION_RETURNING = """
+RETURNING p.position_id, p.portfolio_node_id AS portfolio_id, p.instrument_id,
+          COALESCE((SELECT instrument_type FROM instrument i
+                    WHERE i.instrument_id = p.instrument_id), 'UNKNOWN') AS product_type,
+          p.quantity::float8 AS quantity, p.cost_basis::float8 AS cost_basis,
+          p.base_ccy AS currency, COALESCE(p.tags_json, '{}'::jsonb) AS metadata, p.created_at
+"""
+
+
+def _update_position_sql(flag: int) -> str:
+    """Build the PATCH statement for one combination of updated fields.
+
+    Bit 0: quantity, bit 1: cost_basis, bit 2: metadata.
+    """
+    updates = []
+    if flag & 0b001:
+        updates.append("quantity = %(qty)s")
+    if flag & 0b010:
+        updates.append("cost_basis = %(cost)s")
+    if flag & 0b100:
+        updates.append("tags_json = %(tags)s::jsonb")
+    updates.append("updated_at = now()")
+    return f"UPDATE position p SET {', '.join(updates)} WHERE position_id = %(pid)s {_POSITION_RETURNING}"
+
+
+UPDATE_POSITION_SQL = {flag: _update_position_sql(flag) for flag in range(1, 8)}
+
+
+def _encode_cursor(created_at: datetime, position_id: str) -> str:
+    """Encode a list_positions keyset cursor."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{position_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a list_positions keyset cursor into (created_at, position_id)."""
+    try:
+        created_at, position_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), position_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("", response_model=List[PositionOut])
-def list_positions(
+async def list_positions(
     portfolio_id: Optional[str] = Query(None, description="Filter by portfolio"),
     instrument_id: Optional[str] = Query(None, description="Filter by instrument"),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: int = Query(100, description="Max results", le=1000),
-    offset: int = Query(0, description="Result offset", ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
 ):
-    """List positions with optional filters."""
-    try:
-        with db_conn() as conn:
-            # Build dynamic WHERE clause
-            where_parts = []
-            params = {"lim": limit, "off": offset}
-
-            if portfolio_id:
-                where_parts.append("portfolio_node_id = %(port_id)s")
-                params["port_id"] = portfolio_id
-
-            if instrument_id:
-                where_parts.append("instrument_id = %(inst_id)s")
-                params["inst_id"] = instrument_id
-
-            if status:
-                where_parts.append("status = %(status)s")
-                params["status"] = status
-            else:
-                # Default to ACTIVE only
-                where_parts.append("status = 'ACTIVE'")
-
-            where_clause = " AND ".join(where_parts) if where_parts else "1=1"
-
-            query = f"""
-                SELECT position_id, portfolio_node_id, instrument_id, quantity,
-                       base_ccy, cost_basis, book_value, tags_json, status,
-                       created_at, updated_at
-                FROM position
-                WHERE {where_clause}
-                ORDER BY created_at DESC
-                LIMIT %(lim)s OFFSET %(off)s
-            """
+    """List positions with optional filters, newest first.
+
+    Pages are keyset-paginated on (created_at, position_id): when a page is
+    full, the X-Next-Cursor response header carries the cursor for the next
+    one. Each page costs an index seek regardless of depth. Rows carry every
+    PositionOut field already, so they are encoded with orjson directly
+    rather than validated into models first.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+
+    async with async_db_conn() as conn:
+        flags = (
+            bool(portfolio_id)
+            | bool(instrument_id) << 1
+            | bool(status) << 2
+            | bool(after) << 3
+        )
+        params = {
+            "lim": limit,
+            "port_id": portfolio_id,
+            "inst_id": instrument_id,
+            "status": status,
+            "after_ts": after[0] if after else None,
+            "after_id": after[1] if after else None,
+        }
+        query = LIST_POSITIONS_SQL[flags]
+
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
+
+        response = Response(
+            orjson.dumps(rows, option=orjson.OPT_UTC_Z),
+            media_type="application/json",
+        )
+        if len(rows) == limit:
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(last['created_at'], last['position_id'])
+
+        return response
 
-            rows = conn.execute(query, params).fetchall()
 
-            positions = []
-            for row in rows:
-                positions.append(PositionOut(
-                    position_id=row['position_id'],
-                    portfolio_id=row['portfolio_node_id'],
-                    instrument_id=row['instrument_id'],
-                    product_type='UNKNOWN',  # Would need to join to instrument table
-                    quantity=float(row['quantity']),
-                    cost_basis=float(row['cost_basis']) if row['cost_basis'] else None,
-                    currency=row['base_ccy'],
-                    metadata=row['tags_json'] or {},
-                    created_at=row['created_at']
-                ))
+@router.post("", response_model=PositionOut, status_code=201)
+async def create_position(req: PositionCreate):
+    """Add a new position to a portfolio."""
+    async with async_db_conn() as conn:
+        # Validate portfolio and instrument in one round-trip
+        cur = await conn.execute(
+            POSITION_REFS_EXIST_SQL,
+            {"pid": req.portfolio_id, "iid": req.instrument_id}
+        )
+        refs = await cur.fetchone()
+
+        if not refs['portfolio_exists']:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Portfolio not found: {req.portfolio_id}"
+            )
 
-            return positions
+        if not refs['instrument_exists']:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Instrument not found: {req.instrument_id}"
+            )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        # Generate position ID
+        position_id = req.position_id if hasattr(req, 'position_id') and req.position_id else f"pos-{uuid4()}"
+
+        # Insert position and read it back in the same statement
+        cur = await conn.execute(
+            INSERT_POSITION_SQL,
+            {
+                "pid": position_id,
+                "port_id": req.portfolio_id,
+                "inst_id": req.instrument_id,
+                "qty": req.quantity,
+                "ccy": req.currency,
+                "cost": req.cost_basis,
+                "book": req.cost_basis,  # Default book_value to cost_basis
+                "tags": Json(req.metadata or {})
+            }
+        )
+        result = await cur.fetchone()
+
+    SUMMARY_CACHE.pop(req.portfolio_id)
+
+    # product_type is not stored on position; echo the request's
+    return PositionOut(**result, product_type=req.product_type)
+
+
+@router.post("/bulk", response_model=List[PositionOut], status_code=201)
+async def create_positions_bulk(items: List[PositionCreate]):
+    """Add many positions in a single INSERT.
+
+    All referenced portfolios and instruments are validated up front in one
+    query; the batch is inserted atomically.
+    """
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many positions in one request (max {BULK_MAX_ITEMS})"
+        )
+    if not items:
+        return ORJSONResponse([], status_code=201)
+
+    portfolio_ids = {item.portfolio_id for item in items}
+    instrument_ids = {item.instrument_id for item in items}
+
+    async with async_db_conn() as conn:
+        cur = await conn.execute(
+            POSITION_REFS_EXISTING_SQL,
+            {"pids": list(portfolio_ids), "iids": list(instrument_ids)}
+        )
+        refs = await cur.fetchone()
+
+        missing = portfolio_ids - set(refs['portfolios'])
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Portfolio not found: {', '.join(sorted(missing))}"
+            )
 
+        missing = instrument_ids - set(refs['instruments'])
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Instrument not found: {', '.join(sorted(missing))}"
+            )
 
-@router.post("", response_model=PositionOut, status_code=201)
-def create_position(req: PositionCreate):
-    """Add a new position to a portfolio."""
-    try:
-        with db_conn() as conn:
-            # Validate portfolio exists
-            portfolio = conn.execute(
-                "SELECT 1 FROM portfolio_node WHERE portfolio_node_id = %(pid)s",
-                {"pid": req.portfolio_id}
-            ).fetchone()
-
-            if not portfolio:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Portfolio not found: {req.portfolio_id}"
-                )
-
-            # Validate instrument exists
-            instrument = conn.execute(
-                "SELECT 1 FROM instrument WHERE instrument_id = %(iid)s",
-                {"iid": req.instrument_id}
-            ).fetchone()
-
-            if not instrument:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"Instrument not found: {req.instrument_id}"
-                )
-
-            # Generate position ID
-            position_id = req.position_id if hasattr(req, 'position_id') and req.position_id else f"pos-{uuid4()}"
-
-            # Insert position
-            conn.execute(
-                """
-                INSERT INTO position
-                  (position_id, portfolio_node_id, instrument_id, quantity, base_ccy,
-                   cost_basis, book_value, tags_json, status, created_at, updated_at)
-                VALUES (%(pid)s, %(port_id)s, %(inst_id)s, %(qty)s, %(ccy)s,
-                        %(cost)s, %(book)s, %(tags)s::jsonb, 'ACTIVE', now(), now())
-                """,
+        try:
+            cur = await conn.execute(
+                BULK_INSERT_POSITIONS_SQL,
                 {
-                    "pid": position_id,
-                    "port_id": req.portfolio_id,
-                    "inst_id": req.instrument_id,
-                    "qty": req.quantity,
-                    "ccy": req.currency,
-                    "cost": req.cost_basis,
-                    "book": req.cost_basis,  # Default book_value to cost_basis
-                    "tags": req.metadata or {}
+                    "pids": [item.position_id for item in items],
+                    "port_ids": [item.portfolio_id for item in items],
+                    "inst_ids": [item.instrument_id for item in items],
+                    "qtys": [item.quantity for item in items],
+                    "ccys": [item.currency for item in items],
+                    "costs": [item.cost_basis for item in items],
+                    "tags": [orjson.dumps(item.metadata or {}).decode() for item in items],
                 }
             )
+            rows = await cur.fetchall()
+        except UniqueViolation:
+            raise HTTPException(status_code=409, detail="Duplicate position ID in request or database")
 
-            # Fetch created position
-            result = conn.execute(
-                """
-                SELECT position_id, portfolio_node_id, instrument_id, quantity,
-                       base_ccy, cost_basis, book_value, tags_json, status, created_at
-                FROM position
-                WHERE position_id = %(pid)s
-                """,
-                {"pid": position_id}
-            ).fetchone()
-
-            return PositionOut(
-                position_id=result['position_id'],
-                portfolio_id=result['portfolio_node_id'],
-                instrument_id=result['instrument_id'],
-                product_type=req.product_type,
-                quantity=float(result['quantity']),
-                cost_basis=float(result['cost_basis']) if result['cost_basis'] else None,
-                currency=result['base_ccy'],
-                metadata=result['tags_json'] or {},
-                created_at=result['created_at']
-            )
+    for pid in portfolio_ids:
+        SUMMARY_CACHE.pop(pid)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    # product_type is not stored on position; echo the request's, as create_position does
+    product_types = {item.position_id: item.product_type for item in items}
+    for row in rows:
+        row['product_type'] = product_types[row['position_id']]
+
+    return _POSITIONS_ADAPTER.validate_python(rows)
 
 
 @router.get("/{position_id}", response_model=PositionOut)
-def get_position(position_id: str):
+async def get_position(position_id: str):
     """Get a single position by ID."""
-    try:
-        with db_conn() as conn:
-            result = conn.execute(
-                """
-                SELECT p.position_id, p.portfolio_node_id, p.instrument_id, p.quantity,
-                       p.base_ccy, p.cost_basis, p.book_value, p.tags_json, p.status,
-                       p.created_at, i.instrument_type
-                FROM position p
-                LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
-                WHERE p.position_id = %(pid)s
-                """,
-                {"pid": position_id}
-            ).fetchone()
-
-            if not result:
-                raise HTTPException(status_code=404, detail=f"Position not found: {position_id}")
-
-            return PositionOut(
-                position_id=result['position_id'],
-                portfolio_id=result['portfolio_node_id'],
-                instrument_id=result['instrument_id'],
-                product_type=result['instrument_type'] or 'UNKNOWN',
-                quantity=float(result['quantity']),
-                cost_basis=float(result['cost_basis']) if result['cost_basis'] else None,
-                currency=result['base_ccy'],
-                metadata=result['tags_json'] or {},
-                created_at=result['created_at']
-            )
+    cached = POSITION_CACHE.get(position_id)
+    if cached is not None:
+        return cached
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    async with async_db_conn() as conn:
+        cur = await conn.execute(GET_POSITION_SQL, {"pid": position_id})
+        result = await cur.fetchone()
+
+        if not result:
+            raise HTTPException(status_code=404, detail=f"Position not found: {position_id}")
+
+    position = PositionOut(**result)
+    POSITION_CACHE.set(position_id, position)
+    return position
 
 
 @router.patch("/{position_id}", response_model=PositionOut)
-def update_position(position_id: str, req: PositionUpdate):
+async def update_position(position_id: str, req: PositionUpdate):
     """Partially update a position (e.g. adjust quantity)."""
-    try:
-        with db_conn() as conn:
-            # Build dynamic update
-            updates = []
-            params = {"pid": position_id}
-
-            if req.quantity is not None:
-                updates.append("quantity = %(qty)s")
-                params["qty"] = req.quantity
-
-            if req.cost_basis is not None:
-                updates.append("cost_basis = %(cost)s")
-                params["cost"] = req.cost_basis
-
-            if req.metadata is not None:
-                updates.append("tags_json = %(tags)s::jsonb")
-                params["tags"] = req.metadata
-
-            if not updates:
-                # Nothing to update, just return current
-                return get_position(position_id)
-
-            # Add updated_at
-            updates.append("updated_at = now()")
-
-            # Execute update
-            conn.execute(
-                f"UPDATE position SET {', '.join(updates)} WHERE position_id = %(pid)s",
-                params
-            )
+    flag = (
+        (req.quantity is not None)
+        | (req.cost_basis is not None) << 1
+        | (req.metadata is not None) << 2
+    )
+
+    if not flag:
+        # Nothing to update, just return current
+        return await get_position(position_id)
 
-            return get_position(position_id)
+    params = {
+        "pid": position_id,
+        "qty": req.quantity,
+        "cost": req.cost_basis,
+        "tags": Json(req.metadata) if req.metadata is not None else None,
+    }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    async with async_db_conn() as conn:
+        # One round-trip: the UPDATE hands back the response row,
+        # instrument type included
+        cur = await conn.execute(UPDATE_POSITION_SQL[flag], params)
+        result = await cur.fetchone()
+
+        if not result:
+            raise HTTPException(status_code=404, detail=f"Position not found: {position_id}")
+
+    SUMMARY_CACHE.pop(result['portfolio_id'])
+    # Write through, so the next get_position is served the updated row
+    position = PositionOut(**result)
+    POSITION_CACHE.set(position_id, position)
+
+    return position
+
+
+@router.delete("", response_model=PositionBatchDeleteResponse)
+async def delete_positions(req: PositionBatchDelete):
+    """Soft-delete many positions in one statement.
+
+    Returns the IDs that were deleted by this call; unknown or already
+    deleted IDs are left out.
+    """
+    if len(req.ids) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many positions in one request (max {BULK_MAX_ITEMS})"
+        )
+
+    deleted = await _soft_delete_positions(req.ids)
+    return {"deleted": deleted}
 
 
 @router.delete("/{position_id}", status_code=204)
-def delete_position(position_id: str):
+async def delete_position(position_id: str):
     """Remove a position from the portfolio (soft delete)."""
-    try:
-        with db_conn() as conn:
-            # Soft delete - set status to DELETED
-            conn.execute(
-                "UPDATE position SET status = 'DELETED', updated_at = now() WHERE position_id = %(pid)s",
-                {"pid": position_id}
-            )
+    await _soft_delete_positions([position_id])
+
+
+async def _soft_delete_positions(position_ids: List[str]) -> List[str]:
+    """Soft-delete positions and evict their cached entries and summaries."""
+    if not position_ids:
+        return []
+
+    async with async_db_conn() as conn:
+        cur = await conn.execute(DELETE_POSITIONS_SQL, {"ids": position_ids})
+        rows = await cur.fetchall()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    for pid in {row['portfolio_node_id'] for row in rows}:
+        SUMMARY_CACHE.pop(pid)
+    for row in rows:
+        POSITION_CACHE.pop(row['position_id'])
+
+    return [row['position_id'] for row in rows]
 
 
 @router.get("/portfolio/{portfolio_id}/holdings", response_model=List[PositionOut])
@@ -263,164 +517,107 @@ def get_portfolio_holdings(
     include_children: bool = Query(False, description="Include positions from child portfolios"),
 ):
     """Get all holdings for a portfolio, optionally including child portfolios."""
-    try:
-        with db_conn() as conn:
-            if include_children:
-                # Use recursive query to get all descendants
-                query = """
-                    WITH RECURSIVE descendants AS (
-                      SELECT portfolio_node_id FROM portfolio_node WHERE portfolio_node_id = %(pid)s
-                      UNION ALL
-                      SELECT pn.portfolio_node_id
-                      FROM portfolio_node pn
-                      INNER JOIN descendants d ON pn.parent_id = d.portfolio_node_id
-                    )
-                    SELECT p.position_id, p.portfolio_node_id, p.instrument_id, p.quantity,
-                           p.base_ccy, p.cost_basis, p.book_value, p.tags_json, p.status,
-                           p.created_at, i.instrument_type
-                    FROM position p
-                    LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
-                    INNER JOIN descendants d ON p.portfolio_node_id = d.portfolio_node_id
-                    WHERE p.status = 'ACTIVE'
-                    ORDER BY p.created_at DESC
-                """
-            else:
-                # Just direct positions
-                query = """
-                    SELECT p.position_id, p.portfolio_node_id, p.instrument_id, p.quantity,
-                           p.base_ccy, p.cost_basis, p.book_value, p.tags_json, p.status,
-                           p.created_at, i.instrument_type
-                    FROM position p
-                    LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
-                    WHERE p.portfolio_node_id = %(pid)s AND p.status = 'ACTIVE'
-                    ORDER BY p.created_at DESC
-                """
-
-            rows = conn.execute(query, {"pid": portfolio_id}).fetchall()
-
-            positions = []
-            for row in rows:
-                positions.append(PositionOut(
-                    position_id=row['position_id'],
-                    portfolio_id=row['portfolio_node_id'],
-                    instrument_id=row['instrument_id'],
-                    product_type=row['instrument_type'] or 'UNKNOWN',
-                    quantity=float(row['quantity']),
-                    cost_basis=float(row['cost_basis']) if row['cost_basis'] else None,
-                    currency=row['base_ccy'],
-                    metadata=row['tags_json'] or {},
-                    created_at=row['created_at']
-                ))
-
-            return positions
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    # Positions of the whole subtree, or just direct positions
+    if not include_children:
+        query = HOLDINGS_SQL
+    elif HOLDINGS_RECURSIVE_CTE:
+        query = HOLDINGS_WITH_CHILDREN_CTE_SQL
+    else:
+        query = HOLDINGS_WITH_CHILDREN_SQL
+
+    return _streaming_positions_response(query, {"pid": portfolio_id})
 
 
 @router.get("/portfolio/{portfolio_id}/summary")
-def get_holdings_summary(portfolio_id: str):
-    """Get summary statistics for portfolio holdings (count, total notional, etc.)."""
-    try:
-        with db_conn() as conn:
-            result = conn.execute(
-                """
-                SELECT
-                  COUNT(*) as position_count,
-                  COUNT(DISTINCT instrument_id) as instrument_count,
-                  SUM(quantity) as total_quantity,
-                  SUM(cost_basis) as total_cost_basis,
-                  SUM(book_value) as total_book_value
-                FROM position
-                WHERE portfolio_node_id = %(pid)s AND status = 'ACTIVE'
-                """,
-                {"pid": portfolio_id}
-            ).fetchone()
-
-            return {
-                "portfolio_id": portfolio_id,
-                "position_count": result['position_count'],
-                "instrument_count": result['instrument_count'],
-                "total_quantity": float(result['total_quantity']) if result['total_quantity'] else 0.0,
-                "total_cost_basis": float(result['total_cost_basis']) if result['total_cost_basis'] else 0.0,
-                "total_book_value": float(result['total_book_value']) if result['total_book_value'] else 0.0,
-            }
+async def get_holdings_summary(portfolio_id: str):
+    """Get summary statistics for portfolio holdings (count, total notional, etc.).
+
+    Reads the trigger-maintained position_rollup (migration 012), one row per
+    instrument held, rather than aggregating every ACTIVE position. Served from
+    SUMMARY_CACHE for up to its TTL; position writes through this service evict
+    the portfolio's entry.
+    """
+    cached = SUMMARY_CACHE.get(portfolio_id)
+    if cached is not None:
+        return cached
+
+    async with async_db_conn() as conn:
+        cur = await conn.execute(
+            """
+            SELECT
+              COALESCE(SUM(position_count), 0)::int8 as position_count,
+              COUNT(*) FILTER (WHERE position_count > 0) as instrument_count,
+              COALESCE(SUM(total_quantity), 0)::float8 as total_quantity,
+              COALESCE(SUM(total_cost_basis), 0)::float8 as total_cost_basis,
+              COALESCE(SUM(total_book_value), 0)::float8 as total_book_value
+            FROM position_rollup
+            WHERE portfolio_node_id = %(pid)s
+            """,
+            {"pid": portfolio_id}
+        )
+        result = await cur.fetchone()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        summary = {"portfolio_id": portfolio_id, **result}
+
+    SUMMARY_CACHE.set(portfolio_id, summary)
+    return summary
 
 
 @router.get("/{position_id}/valuation")
-def get_position_valuation(position_id: str):
+async def get_position_valuation(position_id: str):
     """Get latest valuation for position."""
-    try:
-        with db_conn() as conn:
-            result = conn.execute(
-                """
-                SELECT vr.*, r.as_of_time
-                FROM valuation_result vr
-                INNER JOIN run r ON vr.run_id = r.run_id
-                WHERE vr.position_id = %(pid)s
-                  AND vr.scenario_id = 'BASE'
-                ORDER BY r.as_of_time DESC
-                LIMIT 1
-                """,
-                {"pid": position_id}
-            ).fetchone()
-
-            if not result:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"No valuation found for position: {position_id}"
-                )
-
-            return {
-                "position_id": result['position_id'],
-                "run_id": result['run_id'],
-                "scenario_id": result['scenario_id'],
-                "measures": result['measures_json'],
-                "as_of_time": result['as_of_time']
-            }
+    async with async_db_conn() as conn:
+        cur = await conn.execute(LATEST_VALUATION_SQL, {"pid": position_id})
+        result = await cur.fetchone()
+
+        if not result:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No valuation found for position: {position_id}"
+            )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+        return {
+            "position_id": result['position_id'],
+            "run_id": result['run_id'],
+            "scenario_id": result['scenario_id'],
+            "measures": result['measures_json'],
+            "as_of_time": result['as_of_time']
+        }
 
 
 @router.get("/by-portfolio/{portfolio_node_id}", response_model=List[PositionOut])
 def list_positions_by_portfolio(portfolio_node_id: str):
     """List positions for portfolio with instrument details."""
-    try:
-        with db_conn() as conn:
-            rows = conn.execute(
-                """
-                SELECT p.position_id, p.portfolio_node_id, p.instrument_id, p.quantity,
-                       p.base_ccy, p.cost_basis, p.book_value, p.tags_json, p.status,
-                       p.created_at, i.instrument_type
-                FROM position p
-                LEFT JOIN instrument i ON p.instrument_id = i.instrument_id
-                WHERE p.portfolio_node_id = %(pid)s AND p.status = 'ACTIVE'
-                ORDER BY p.created_at DESC
-                """,
-                {"pid": portfolio_node_id}
-            ).fetchall()
-
-            positions = []
-            for row in rows:
-                positions.append(PositionOut(
-                    position_id=row['position_id'],
-                    portfolio_id=row['portfolio_node_id'],
-                    instrument_id=row['instrument_id'],
-                    product_type=row['instrument_type'] or 'UNKNOWN',
-                    quantity=float(row['quantity']),
-                    cost_basis=float(row['cost_basis']) if row['cost_basis'] else None,
-                    currency=row['base_ccy'],
-                    metadata=row['tags_json'] or {},
-                    created_at=row['created_at']
-                ))
-
-            return positions
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return _streaming_positions_response(HOLDINGS_SQL, {"pid": portfolio_node_id})
+
+
+def _streaming_positions_response(query: str, params: dict) -> StreamingResponse:
+    """Stream the rows of a holdings query as a JSON array of PositionOut."""
+    chunks = _stream_positions_json(query, params)
+    # Advance to the first chunk here so query (and connection) errors surface
+    # as a proper status before streaming starts
+    first = next(chunks)
+
+    return StreamingResponse(chain([first], chunks), media_type="application/json")
+
+
+def _stream_positions_json(query: str, params: dict) -> Iterator[bytes]:
+    """Yield holdings rows as a JSON array, a batch at a time.
+
+    Reads through a server-side cursor so peak memory is bounded by
+    HOLDINGS_FETCH_SIZE rows rather than the whole portfolio. The holdings
+    queries already return every PositionOut field, named, typed and in
+    field order, so rows are encoded directly without building models.
+    Stays on the sync pool: StreamingResponse drives a sync iterator from
+    the threadpool, one batch at a time.
+    """
+    with db_conn() as conn:
+        with conn.cursor(name="positions_stream") as cur:
+            cur.execute(query, params)
+            yield b"["
+            separator = b""
+            while rows := cur.fetchmany(HOLDINGS_FETCH_SIZE):
+                for row in rows:
+                    yield separator + orjson.dumps(row, option=orjson.OPT_UTC_Z)
+                    separator = b","
+        yield b"]"
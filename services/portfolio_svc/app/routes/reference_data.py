@@ -5,13 +5,96 @@ from datetime import datetime
 from typing import Dict, List, Literal, Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, HTTPException, Query
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
+from psycopg.types.json import Json
 from pydantic import BaseModel, Field
 
+from services.common.cache import TTLCache
 from services.common.db import db_conn
 
 router = APIRouter()
 
+# get_current_ratings results keyed by entity ID; add_rating evicts the
+# entity's entry and the TTL bounds staleness across workers
+CURRENT_RATINGS_CACHE = TTLCache(maxsize=4096, ttl=30)
+
+# get_reference_data results keyed by entity ID. Reference data is read far
+# more often than written; update_reference_data evicts the entity's entry.
+REFERENCE_DATA_CACHE = TTLCache(maxsize=4096, ttl=300)
+
+# Searchable text for list_reference_data. Must stay identical to the
+# expression indexed by refdata_trgm (sql/011_reference_data_search_trgm.sql)
+# for the trigram index to serve ILIKE '%term%'.
+SEARCH_TEXT_EXPR = "(COALESCE(name, '') || ' ' || COALESCE(ticker, '') || ' ' || COALESCE(cusip, ''))"
+
+
+# Existence check and insert in one statement
+INSERT_RATING_SQL = """
+INSERT INTO rating_history (
+    rating_id, entity_id, agency, rating, outlook,
+    as_of_date, effective_date, metadata_json
+)
+SELECT %(rating_id)s, %(entity_id)s, %(agency)s, %(rating)s, %(outlook)s,
+       %(as_of_date)s, %(effective_date)s, %(metadata_json)s
+WHERE EXISTS (SELECT 1 FROM reference_data WHERE entity_id = %(entity_id)s)
+RETURNING *
+"""
+
+# Columns in ReferenceDataOut field order. Named rather than SELECT * so the
+# row shape is fixed by the model, not by whatever columns the table gains.
+REFERENCE_DATA_COLUMNS = """
+entity_id, entity_type, name, ticker, cusip, isin, sector, geography,
+currency, parent_entity_id, COALESCE(metadata_json, '{}'::jsonb) AS metadata_json,
+created_at, updated_at
+"""
+
+GET_REFERENCE_DATA_SQL = f"""
+SELECT {REFERENCE_DATA_COLUMNS}
+FROM reference_data
+WHERE entity_id = %(entity_id)s
+"""
+
+# Columns in RatingHistoryOut field order, NULL metadata defaulted as the
+# model's default_factory would
+RATING_HISTORY_SQL = """
+SELECT rating_id, entity_id, agency, rating, outlook, as_of_date,
+       effective_date, COALESCE(metadata_json, '{}'::jsonb) AS metadata_json,
+       created_at
+FROM rating_history
+WHERE entity_id = %(entity_id)s
+ORDER BY as_of_date DESC
+"""
+
+
+def _list_reference_data_sql(flags: int) -> str:
+    """Build the list_reference_data statement for one combination of filters.
+
+    Bit 0: entity_type, bit 1: sector, bit 2: geography, bit 3: search.
+    """
+    conditions = []
+    if flags & 0b0001:
+        conditions.append("entity_type = %(entity_type)s")
+    if flags & 0b0010:
+        conditions.append("sector = %(sector)s")
+    if flags & 0b0100:
+        conditions.append("geography = %(geography)s")
+    if flags & 0b1000:
+        conditions.append(f"{SEARCH_TEXT_EXPR} ILIKE %(search)s")
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"""
+SELECT {REFERENCE_DATA_COLUMNS}
+FROM reference_data
+{where_clause}
+ORDER BY created_at DESC
+"""
+
+
+# One statement per filter combination, rendered once at import so requests
+# reuse byte-identical SQL (and psycopg's prepared statements)
+LIST_REFERENCE_DATA_SQL = {flags: _list_reference_data_sql(flags) for flags in range(16)}
+
 
 # ---------------------------------------------------------------------------
 # Pydantic Models
@@ -120,10 +203,7 @@ def create_reference_data(req: ReferenceDataCreate):
                 }
             )
 
-            row = conn.execute(
-                "SELECT * FROM reference_data WHERE entity_id = %(entity_id)s",
-                {"entity_id": entity_id}
-            ).fetchone()
+            row = conn.execute(GET_REFERENCE_DATA_SQL, {"entity_id": entity_id}).fetchone()
 
             return ReferenceDataOut(**row)
         except Exception as e:
@@ -140,36 +220,21 @@ def list_reference_data(
     search: Optional[str] = Query(None, description="Search name/ticker/cusip"),
 ):
     """List reference data with optional filtering."""
-    conditions = []
-    params = {}
-
-    if entity_type:
-        conditions.append("entity_type = %(entity_type)s")
-        params["entity_type"] = entity_type
-
-    if sector:
-        conditions.append("sector = %(sector)s")
-        params["sector"] = sector
-
-    if geography:
-        conditions.append("geography = %(geography)s")
-        params["geography"] = geography
-
-    if search:
-        conditions.append("(name ILIKE %(search)s OR ticker ILIKE %(search)s OR cusip ILIKE %(search)s)")
-        params["search"] = f"%{search}%"
-
-    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    flags = (
+        bool(entity_type)
+        | bool(sector) << 1
+        | bool(geography) << 2
+        | bool(search) << 3
+    )
+    params = {
+        "entity_type": entity_type,
+        "sector": sector,
+        "geography": geography,
+        "search": f"%{search}%" if search else None,
+    }
 
     with db_conn() as conn:
-        rows = conn.execute(
-            f"""
-            SELECT * FROM reference_data
-            {where_clause}
-            ORDER BY created_at DESC
-            """,
-            params
-        ).fetchall()
+        rows = conn.execute(LIST_REFERENCE_DATA_SQL[flags], params).fetchall()
 
         return [ReferenceDataOut(**row) for row in rows]
 
@@ -177,16 +242,19 @@ def list_reference_data(
 @router.get("/{entity_id}", response_model=ReferenceDataOut)
 def get_reference_data(entity_id: str):
     """Get a single reference data entity."""
+    cached = REFERENCE_DATA_CACHE.get(entity_id)
+    if cached is not None:
+        return cached
+
     with db_conn() as conn:
-        row = conn.execute(
-            "SELECT * FROM reference_data WHERE entity_id = %(entity_id)s",
-            {"entity_id": entity_id}
-        ).fetchone()
+        row = conn.execute(GET_REFERENCE_DATA_SQL, {"entity_id": entity_id}).fetchone()
 
-        if not row:
-            raise HTTPException(status_code=404, detail="Reference data not found")
+    if not row:
+        raise HTTPException(status_code=404, detail="Reference data not found")
 
-        return ReferenceDataOut(**row)
+    entity = ReferenceDataOut(**row)
+    REFERENCE_DATA_CACHE.set(entity_id, entity)
+    return entity
 
 
 @router.patch("/{entity_id}", response_model=ReferenceDataOut)
@@ -218,12 +286,12 @@ def update_reference_data(entity_id: str, req: ReferenceDataUpdate):
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Reference data not found")
 
-        row = conn.execute(
-            "SELECT * FROM reference_data WHERE entity_id = %(entity_id)s",
-            {"entity_id": entity_id}
-        ).fetchone()
+        row = conn.execute(GET_REFERENCE_DATA_SQL, {"entity_id": entity_id}).fetchone()
 
-        return ReferenceDataOut(**row)
+    # Write through once committed, so the next read is served the new row
+    entity = ReferenceDataOut(**row)
+    REFERENCE_DATA_CACHE.set(entity_id, entity)
+    return entity
 
 
 @router.post("/{entity_id}/rating", response_model=RatingHistoryOut, status_code=201)
@@ -232,25 +300,9 @@ def add_rating(entity_id: str, req: RatingHistoryCreate):
     rating_id = f"rating-{uuid4()}"
 
     with db_conn() as conn:
-        # Verify entity exists
-        entity = conn.execute(
-            "SELECT entity_id FROM reference_data WHERE entity_id = %(entity_id)s",
-            {"entity_id": entity_id}
-        ).fetchone()
-
-        if not entity:
-            raise HTTPException(status_code=404, detail="Reference data entity not found")
-
-        conn.execute(
-            """
-            INSERT INTO rating_history (
-                rating_id, entity_id, agency, rating, outlook,
-                as_of_date, effective_date, metadata_json
-            ) VALUES (
-                %(rating_id)s, %(entity_id)s, %(agency)s, %(rating)s, %(outlook)s,
-                %(as_of_date)s, %(effective_date)s, %(metadata_json)s
-            )
-            """,
+        # Insert only if the entity exists; no row back means it does not
+        row = conn.execute(
+            INSERT_RATING_SQL,
             {
                 "rating_id": rating_id,
                 "entity_id": entity_id,
@@ -259,38 +311,41 @@ def add_rating(entity_id: str, req: RatingHistoryCreate):
                 "outlook": req.outlook,
                 "as_of_date": req.as_of_date,
                 "effective_date": req.effective_date,
-                "metadata_json": req.metadata_json,
+                "metadata_json": Json(req.metadata_json) if req.metadata_json is not None else None,
             }
-        )
-
-        row = conn.execute(
-            "SELECT * FROM rating_history WHERE rating_id = %(rating_id)s",
-            {"rating_id": rating_id}
         ).fetchone()
 
-        return RatingHistoryOut(**row)
+        if not row:
+            raise HTTPException(status_code=404, detail="Reference data entity not found")
+
+    CURRENT_RATINGS_CACHE.pop(entity_id)
+
+    return RatingHistoryOut(**row)
 
 
 @router.get("/{entity_id}/ratings", response_model=List[RatingHistoryOut])
 def get_rating_history(entity_id: str):
     """Get rating history for an entity (all agencies, sorted by date)."""
     with db_conn() as conn:
-        rows = conn.execute(
-            """
-            SELECT * FROM rating_history
-            WHERE entity_id = %(entity_id)s
-            ORDER BY as_of_date DESC
-            """,
-            {"entity_id": entity_id}
-        ).fetchall()
+        rows = conn.execute(RATING_HISTORY_SQL, {"entity_id": entity_id}).fetchall()
 
-        return [RatingHistoryOut(**row) for row in rows]
+    # Rows are already in RatingHistoryOut shape; encode them directly
+    return Response(
+        orjson.dumps(rows, option=orjson.OPT_UTC_Z),
+        media_type="application/json",
+    )
 
 
 @router.get("/{entity_id}/current-rating", response_model=Dict[str, RatingHistoryOut])
 def get_current_ratings(entity_id: str):
     """Get latest rating per agency for an entity."""
+    cached = CURRENT_RATINGS_CACHE.get(entity_id)
+    if cached is not None:
+        return cached
+
     with db_conn() as conn:
+        # Read in index order from rating_hist_entity_agency_date
+        # (sql/009_rating_history_agency_index.sql), so no sort is needed
         rows = conn.execute(
             """
             SELECT DISTINCT ON (agency) *
@@ -301,4 +356,6 @@ def get_current_ratings(entity_id: str):
             {"entity_id": entity_id}
         ).fetchall()
 
-        return {row["agency"]: RatingHistoryOut(**row) for row in rows}
+    ratings = {row["agency"]: RatingHistoryOut(**row) for row in rows}
+    CURRENT_RATINGS_CACHE.set(entity_id, ratings)
+    return ratings
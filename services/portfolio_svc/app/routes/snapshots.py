@@ -4,10 +4,13 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
 
 from services.portfolio_svc.app.models import (
+    SnapshotBatchCreate,
     SnapshotCreate,
+    SnapshotJobOut,
     SnapshotOut,
     SnapshotCompareRequest,
     SnapshotCompareResponse,
@@ -17,8 +20,8 @@ from services.portfolio_svc.app.models import (
     PortfolioSnapshotOut,
     TimeSeriesResponse,
 )
-from services.common.db import db_conn
-from services.common.hash import sha256_json
+from services.common.cache import TTLCache
+from services.common.db import async_db_conn
 
 router = APIRouter()
 
@@ -27,164 +30,375 @@ router = APIRouter()
 # New snapshot endpoints (Plan 03-05)
 # ---------------------------------------------------------------------------
 
-@router.post("", response_model=SnapshotOut, status_code=201)
-def create_snapshot(req: SnapshotCreate):
-    """Create a point-in-time portfolio snapshot with deduplication."""
-
-    # Build query to aggregate current positions
-    if req.include_hierarchy:
-        # Recursive query including child portfolios
-        positions_query = """
-        WITH RECURSIVE hierarchy AS (
-          SELECT portfolio_node_id FROM portfolio_node
-          WHERE portfolio_node_id = %(pid)s
-          UNION ALL
-          SELECT pn.portfolio_node_id
-          FROM portfolio_node pn
-          INNER JOIN hierarchy h ON pn.parent_id = h.portfolio_node_id
-        )
-        SELECT
-          instrument_id,
-          product_type,
-          base_ccy,
-          SUM(quantity) AS aggregated_quantity,
-          COUNT(DISTINCT position_id) AS position_count
-        FROM position
-        WHERE portfolio_node_id IN (SELECT portfolio_node_id FROM hierarchy)
-          AND status = 'ACTIVE'
-        GROUP BY instrument_id, product_type, base_ccy
-        ORDER BY instrument_id;
-        """
+def _create_snapshot_sql(include_hierarchy: bool) -> str:
+    """Build the statement that creates (or finds) one portfolio snapshot.
+
+    Everything happens server-side: current ACTIVE positions are aggregated
+    per instrument (product type from the instrument; position has none),
+    folded into the payload with jsonb_agg, hashed with sha256() over the
+    payload's jsonb text, and upserted. Only the stored row comes back.
+
+    The payload hash dedupes against UNIQUE (portfolio_node_id, payload_hash,
+    as_of_date); as_of_date is part of the hashed payload, so the partition key
+    in that constraint (sql/018) changes nothing. The no-op DO UPDATE makes an
+    existing snapshot come back from RETURNING.
+    jsonb's text form is canonical (sorted keys, fixed spacing), and the
+    jsonb_agg ORDER BY covers the whole group key, so equal holdings always
+    hash alike.
+    """
+    if include_hierarchy:
+        scope = """
+WITH RECURSIVE hierarchy AS (
+  SELECT portfolio_node_id FROM portfolio_node
+  WHERE portfolio_node_id = %(pid)s
+  UNION ALL
+  SELECT pn.portfolio_node_id
+  FROM portfolio_node pn
+  INNER JOIN hierarchy h ON pn.parent_id = h.portfolio_node_id
+),"""
+        where = "p.portfolio_node_id IN (SELECT portfolio_node_id FROM hierarchy)"
     else:
-        # Single portfolio query
-        positions_query = """
-        SELECT
-          instrument_id,
-          product_type,
-          base_ccy,
-          SUM(quantity) AS aggregated_quantity,
-          COUNT(DISTINCT position_id) AS position_count
-        FROM position
-        WHERE portfolio_node_id = %(pid)s AND status = 'ACTIVE'
-        GROUP BY instrument_id, product_type, base_ccy
-        ORDER BY instrument_id;
-        """
-
-    with db_conn() as conn:
-        # Get position aggregations
-        params = {"pid": req.portfolio_node_id}
-        rows = conn.execute(positions_query, params).fetchall()
-
-        # Build payload
-        positions = [
-            {
-                "instrument_id": row["instrument_id"],
-                "product_type": row["product_type"],
-                "base_ccy": row["base_ccy"],
-                "aggregated_quantity": float(row["aggregated_quantity"]),
-                "position_count": row["position_count"],
-            }
-            for row in rows
-        ]
+        scope = "\nWITH"
+        where = "p.portfolio_node_id = %(pid)s"
+
+    return f"""{scope}
+agg AS (
+  SELECT
+    p.instrument_id,
+    COALESCE(i.instrument_type, 'UNKNOWN') AS product_type,
+    p.base_ccy,
+    SUM(p.quantity)::float8 AS aggregated_quantity,
+    COUNT(DISTINCT p.position_id) AS position_count
+  FROM position p
+  LEFT JOIN instrument i ON i.instrument_id = p.instrument_id
+  WHERE {where} AND p.status = 'ACTIVE'
+  GROUP BY p.instrument_id, i.instrument_type, p.base_ccy
+), payload AS (
+  SELECT jsonb_build_object(
+    'portfolio_node_id', %(pid)s::text,
+    'as_of_date', %(aof_iso)s::text,
+    'include_hierarchy', %(hier)s::boolean,
+    'positions', COALESCE(
+      jsonb_agg(to_jsonb(agg) ORDER BY instrument_id, product_type, base_ccy),
+      '[]'::jsonb
+    ),
+    'total_positions', COALESCE(SUM(position_count), 0),
+    'total_instruments', COUNT(*)
+  ) AS payload_json
+  FROM agg
+), hashed AS (
+  SELECT payload_json,
+         'sha256:' || encode(sha256(convert_to(payload_json::text, 'UTF8')), 'hex') AS payload_hash
+  FROM payload
+)
+INSERT INTO portfolio_snapshot
+  (snapshot_id, portfolio_node_id, as_of_date, payload_json, payload_hash, created_at)
+SELECT
+  -- snap-{{portfolio_node_id}}-{{YYYYMMDD}}-{{short_hash}}
+  'snap-' || %(pid)s || '-' || %(date_str)s || '-' || substr(payload_hash, 8, 8),
+  %(pid)s, %(aof)s, payload_json, payload_hash, now()
+FROM hashed
+ON CONFLICT (portfolio_node_id, payload_hash, as_of_date) DO UPDATE SET
+  payload_hash = EXCLUDED.payload_hash
+RETURNING snapshot_id, created_at, payload_json
+"""
+
+
+# Keyed by include_hierarchy. Statement texts in this module are constants so
+# psycopg's per-connection prepared-statement cache can reuse their plans (see
+# DB_PREPARE_THRESHOLD in services.common.db).
+CREATE_SNAPSHOT_SQL = {hier: _create_snapshot_sql(hier) for hier in (False, True)}
+
+GET_SNAPSHOT_SQL = """
+SELECT snapshot_id, portfolio_node_id, as_of_date, created_at,
+       total_positions, total_instruments, payload_json
+FROM portfolio_snapshot
+WHERE snapshot_id = %(sid)s
+"""
+
+SNAPSHOT_POSITIONS_SQL = """
+SELECT (payload_json -> 'positions')::text AS positions
+FROM portfolio_snapshot
+WHERE snapshot_id = %(sid)s
+"""
+
+DELETE_SNAPSHOT_SQL = """
+DELETE FROM portfolio_snapshot WHERE snapshot_id = %(sid)s
+RETURNING portfolio_node_id,
+          payload_json ->> 'as_of_date' AS as_of_date,
+          (payload_json ->> 'include_hierarchy')::boolean AS include_hierarchy
+"""
+
+# Upper bound on portfolios per POST /batch request
+SNAPSHOT_BATCH_MAX_ITEMS = 1000
+
+# Created snapshots keyed by (portfolio_node_id, as_of_date ISO string,
+# include_hierarchy), each stored with the hierarchy version it was built at.
+# Any position or portfolio_node write bumps the version
+# (sql/007_portfolio_tree_version.sql), so a retried create with an unchanged
+# version is answered without re-aggregating. delete_snapshot pops its entry.
+SNAPSHOT_CACHE = TTLCache(maxsize=10_000, ttl=300)
+
+# Encoded GET /{snapshot_id}/positions bodies keyed by snapshot_id, bounded
+# by total bytes. A snapshot's payload never changes once written, so entries
+# only leave on eviction or delete_snapshot.
+SNAPSHOT_POSITIONS_CACHE = TTLCache(maxsize=256 * 1024 * 1024, ttl=3600, sizeof=len)
+
+HIERARCHY_VERSION_SQL = """
+SELECT last_value AS version FROM portfolio_hierarchy_version_seq
+"""
+
+# Creates covering more ACTIVE positions than this are queued for the snapshot
+# worker (services.portfolio_svc.app.snapshot_worker) and answered with 202
+SNAPSHOT_ASYNC_MIN_POSITIONS = 50_000
+
+# ACTIVE positions a snapshot would cover, read from position_rollup
+# (sql/012_position_rollup.sql) rather than counted. Keyed by include_hierarchy.
+ESTIMATE_SNAPSHOT_POSITIONS_SQL = {
+    False: """
+SELECT COALESCE(SUM(position_count), 0) AS positions
+FROM position_rollup
+WHERE portfolio_node_id = %(pid)s
+""",
+    True: """
+WITH RECURSIVE hierarchy AS (
+  SELECT portfolio_node_id FROM portfolio_node
+  WHERE portfolio_node_id = %(pid)s
+  UNION ALL
+  SELECT pn.portfolio_node_id
+  FROM portfolio_node pn
+  INNER JOIN hierarchy h ON pn.parent_id = h.portfolio_node_id
+)
+SELECT COALESCE(SUM(position_count), 0) AS positions
+FROM position_rollup
+WHERE portfolio_node_id IN (SELECT portfolio_node_id FROM hierarchy)
+""",
+}
+
+_SNAPSHOT_JOB_COLUMNS = """
+job_id, portfolio_node_id, as_of_date, include_hierarchy, status,
+snapshot_id, last_error, created_at, updated_at
+"""
+
+ENQUEUE_SNAPSHOT_JOB_SQL = f"""
+INSERT INTO portfolio_snapshot_job
+  (portfolio_node_id, as_of_date, as_of_iso, include_hierarchy)
+VALUES (%(pid)s, %(aof)s, %(aof_iso)s, %(hier)s)
+RETURNING {_SNAPSHOT_JOB_COLUMNS}
+"""
+
+GET_SNAPSHOT_JOB_SQL = f"""
+SELECT {_SNAPSHOT_JOB_COLUMNS}
+FROM portfolio_snapshot_job
+WHERE job_id = %(job_id)s
+"""
+
+
+def _create_snapshot_params(
+    portfolio_node_id: str, as_of_date: datetime, include_hierarchy: bool
+) -> dict:
+    """Parameters for CREATE_SNAPSHOT_SQL (and the job queue) for one snapshot."""
+    return {
+        "pid": portfolio_node_id,
+        "aof": as_of_date,
+        "aof_iso": as_of_date.isoformat(),
+        "date_str": as_of_date.strftime("%Y%m%d"),
+        "hier": include_hierarchy,
+    }
 
-        payload_json = {
-            "portfolio_node_id": req.portfolio_node_id,
-            "as_of_date": req.as_of_date.isoformat(),
-            "include_hierarchy": req.include_hierarchy,
-            "positions": positions,
-            "total_positions": sum(p["position_count"] for p in positions),
-            "total_instruments": len(positions),
-        }
 
-        # Compute content-addressable hash
-        payload_hash = sha256_json(payload_json)
-
-        # Check for existing snapshot with same hash (deduplication)
-        existing = conn.execute(
-            """SELECT snapshot_id, created_at FROM portfolio_snapshot
-               WHERE portfolio_node_id = %(pid)s AND payload_hash = %(ph)s""",
-            {"pid": req.portfolio_node_id, "ph": payload_hash}
-        ).fetchone()
-
-        if existing:
-            # Return existing snapshot (idempotent)
-            return SnapshotOut(
-                snapshot_id=existing["snapshot_id"],
-                portfolio_node_id=req.portfolio_node_id,
-                as_of_date=req.as_of_date,
-                total_positions=payload_json["total_positions"],
-                total_instruments=payload_json["total_instruments"],
-                payload_json=payload_json,
-                created_at=existing["created_at"],
+async def _create_snapshot(
+    conn,
+    portfolio_node_id: str,
+    as_of_date: datetime,
+    include_hierarchy: bool,
+    cache_entries: list,
+) -> SnapshotOut:
+    """Snapshot a portfolio's current positions, or return the identical existing one.
+
+    New snapshots are appended to cache_entries as (key, (version, snapshot))
+    rather than cached here: the caller sets them in SNAPSHOT_CACHE once the
+    transaction has committed, so a rolled-back insert is never cached.
+    """
+    params = _create_snapshot_params(portfolio_node_id, as_of_date, include_hierarchy)
+    cache_key = (portfolio_node_id, params["aof_iso"], include_hierarchy)
+    cur = await conn.execute(HIERARCHY_VERSION_SQL)
+    version = (await cur.fetchone())["version"]
+    cached = SNAPSHOT_CACHE.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    # The create statement is the costliest to plan here, so it is prepared
+    # on first use rather than after DB_PREPARE_THRESHOLD runs (still skipped
+    # when that threshold disables preparing)
+    cur = await conn.execute(CREATE_SNAPSHOT_SQL[include_hierarchy], params, prepare=True)
+    row = await cur.fetchone()
+
+    payload = row["payload_json"]
+    snapshot = SnapshotOut(
+        snapshot_id=row["snapshot_id"],
+        portfolio_node_id=portfolio_node_id,
+        as_of_date=as_of_date,
+        total_positions=payload["total_positions"],
+        total_instruments=payload["total_instruments"],
+        payload_json=payload,
+        created_at=row["created_at"],
+    )
+    cache_entries.append((cache_key, (version, snapshot)))
+    return snapshot
+
+
+@router.post(
+    "",
+    response_model=SnapshotOut,
+    status_code=201,
+    responses={202: {"model": SnapshotJobOut, "description": "Queued for background creation"}},
+)
+async def create_snapshot(req: SnapshotCreate, request: Request):
+    """Create a point-in-time portfolio snapshot with deduplication.
+
+    Snapshots covering more than SNAPSHOT_ASYNC_MIN_POSITIONS ACTIVE positions
+    are queued instead: the response is 202 with the job, and its Location
+    (GET /jobs/{job_id}) reports the snapshot_id once the worker is done.
+    """
+    cache_entries = []
+    async with async_db_conn() as conn:
+        cur = await conn.execute(
+            ESTIMATE_SNAPSHOT_POSITIONS_SQL[req.include_hierarchy],
+            {"pid": req.portfolio_node_id}
+        )
+        if (await cur.fetchone())["positions"] > SNAPSHOT_ASYNC_MIN_POSITIONS:
+            cur = await conn.execute(
+                ENQUEUE_SNAPSHOT_JOB_SQL,
+                _create_snapshot_params(
+                    req.portfolio_node_id, req.as_of_date, req.include_hierarchy
+                ),
+            )
+            job = await cur.fetchone()
+            return ORJSONResponse(
+                job,
+                status_code=202,
+                headers={"Location": str(request.url_for("get_snapshot_job", job_id=job["job_id"]))},
             )
 
-        # Create new snapshot
-        # snapshot_id = snap-{portfolio_node_id}-{YYYYMMDD}-{short_hash}
-        short_hash = payload_hash.split(":")[1][:8]
-        date_str = req.as_of_date.strftime("%Y%m%d")
-        snapshot_id = f"snap-{req.portfolio_node_id}-{date_str}-{short_hash}"
-
-        # Insert snapshot
-        conn.execute(
-            """INSERT INTO portfolio_snapshot
-               (snapshot_id, portfolio_node_id, as_of_date, payload_json, payload_hash, created_at)
-               VALUES (%(sid)s, %(pid)s, %(aof)s, %(pl)s::jsonb, %(ph)s, now())
-               ON CONFLICT (snapshot_id) DO UPDATE SET
-                 payload_json = EXCLUDED.payload_json,
-                 payload_hash = EXCLUDED.payload_hash""",
-            {
-                "sid": snapshot_id,
-                "pid": req.portfolio_node_id,
-                "aof": req.as_of_date,
-                "pl": payload_json,
-                "ph": payload_hash,
-            }
+        snapshot = await _create_snapshot(
+            conn, req.portfolio_node_id, req.as_of_date, req.include_hierarchy,
+            cache_entries,
         )
-        conn.commit()
 
-        # Fetch created snapshot
-        created = conn.execute(
-            "SELECT created_at FROM portfolio_snapshot WHERE snapshot_id = %(sid)s",
-            {"sid": snapshot_id}
-        ).fetchone()
+    for key, entry in cache_entries:
+        SNAPSHOT_CACHE.set(key, entry)
+    return snapshot
 
-        return SnapshotOut(
-            snapshot_id=snapshot_id,
-            portfolio_node_id=req.portfolio_node_id,
-            as_of_date=req.as_of_date,
-            total_positions=payload_json["total_positions"],
-            total_instruments=payload_json["total_instruments"],
-            payload_json=payload_json,
-            created_at=created["created_at"],
+
+@router.get("/jobs/{job_id}", response_model=SnapshotJobOut)
+async def get_snapshot_job(job_id: str):
+    """Report the status of a queued snapshot."""
+    async with async_db_conn() as conn:
+        cur = await conn.execute(GET_SNAPSHOT_JOB_SQL, {"job_id": job_id})
+        row = await cur.fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail=f"Snapshot job {job_id} not found")
+
+    return row
+
+
+@router.post("/batch", response_model=List[SnapshotOut], status_code=201)
+async def create_snapshots_batch(req: SnapshotBatchCreate):
+    """Snapshot several portfolios as of one date (e.g. the nightly run).
+
+    All snapshots are created on one connection in a single transaction;
+    each is deduplicated as in create_snapshot.
+    """
+    if len(req.portfolio_node_ids) > SNAPSHOT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many portfolios in one request (max {SNAPSHOT_BATCH_MAX_ITEMS})"
         )
 
+    cache_entries = []
+    async with async_db_conn() as conn:
+        snapshots = [
+            await _create_snapshot(
+                conn, pid, req.as_of_date, req.include_hierarchy, cache_entries
+            )
+            for pid in req.portfolio_node_ids
+        ]
+
+    for key, entry in cache_entries:
+        SNAPSHOT_CACHE.set(key, entry)
+    return snapshots
+
 
 @router.get("/{snapshot_id}", response_model=SnapshotOut)
-def get_snapshot(snapshot_id: str):
+async def get_snapshot(snapshot_id: str):
     """Get a single snapshot by ID with full payload."""
-    with db_conn() as conn:
-        row = conn.execute(
-            """SELECT * FROM portfolio_snapshot WHERE snapshot_id = %(sid)s""",
-            {"sid": snapshot_id}
-        ).fetchone()
+    async with async_db_conn() as conn:
+        cur = await conn.execute(GET_SNAPSHOT_SQL, {"sid": snapshot_id})
+        row = await cur.fetchone()
 
         if not row:
             raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
 
-        payload = row["payload_json"]
         return SnapshotOut(
             snapshot_id=row["snapshot_id"],
             portfolio_node_id=row["portfolio_node_id"],
             as_of_date=row["as_of_date"],
-            total_positions=payload.get("total_positions", 0),
-            total_instruments=payload.get("total_instruments", 0),
-            payload_json=payload,
+            total_positions=row["total_positions"],
+            total_instruments=row["total_instruments"],
+            payload_json=row["payload_json"],
             created_at=row["created_at"],
         )
 
 
+def _snapshot_date_filters(flags: int) -> str:
+    """Render the as_of_date range predicates for bit 0 (from) and bit 1 (to)."""
+    parts = []
+    if flags & 0b01:
+        parts.append("AND as_of_date >= %(from)s")
+    if flags & 0b10:
+        parts.append("AND as_of_date <= %(to)s")
+    return " ".join(parts)
+
+
+def _list_snapshots_sql(flags: int) -> str:
+    """Build the list_snapshots statement for one combination of filters.
+
+    Bits 0-1: date range (see _snapshot_date_filters), bit 2: portfolio.
+    Absent filters are left out of the statement rather than written as
+    ``%(x)s IS NULL OR ...``, which the planner cannot match to an index
+    (and which PostgreSQL cannot type when the parameter is NULL).
+    """
+    portfolio = "portfolio_node_id = %(pid)s" if flags & 0b100 else "TRUE"
+    return f"""
+SELECT snapshot_id, portfolio_node_id, as_of_date, created_at,
+       total_positions, total_instruments
+FROM portfolio_snapshot
+WHERE {portfolio} {_snapshot_date_filters(flags)}
+ORDER BY as_of_date DESC
+LIMIT %(lim)s OFFSET %(off)s
+"""
+
+
+LIST_SNAPSHOTS_SQL = {flags: _list_snapshots_sql(flags) for flags in range(8)}
+
+# Served by portfolio_snapshot_portfolio_date_idx (portfolio_node_id, as_of_date DESC)
+SNAPSHOT_TIMESERIES_SQL = {
+    flags: f"""
+SELECT snapshot_id, as_of_date,
+       total_positions AS position_count,
+       total_instruments AS instrument_count
+FROM portfolio_snapshot
+WHERE portfolio_node_id = %(pid)s {_snapshot_date_filters(flags)}
+ORDER BY as_of_date ASC
+"""
+    for flags in range(4)
+}
+
+
 @router.get("", response_model=List[SnapshotOut])
-def list_snapshots(
+async def list_snapshots(
     portfolio_node_id: Optional[str] = Query(None, description="Filter by portfolio"),
     date_from: Optional[datetime] = Query(None, description="From date"),
     date_to: Optional[datetime] = Query(None, description="To date"),
@@ -192,14 +406,12 @@ def list_snapshots(
     offset: int = Query(0, description="Offset for pagination"),
 ):
     """List portfolio snapshots with filtering and pagination."""
-    query = """
-    SELECT * FROM portfolio_snapshot
-    WHERE (%(pid)s IS NULL OR portfolio_node_id = %(pid)s)
-      AND (%(from)s IS NULL OR as_of_date >= %(from)s)
-      AND (%(to)s IS NULL OR as_of_date <= %(to)s)
-    ORDER BY as_of_date DESC
-    LIMIT %(lim)s OFFSET %(off)s
-    """
+    flags = (
+        (date_from is not None)
+        | (date_to is not None) << 1
+        | bool(portfolio_node_id) << 2
+    )
+    query = LIST_SNAPSHOTS_SQL[flags]
 
     params = {
         "pid": portfolio_node_id,
@@ -209,112 +421,110 @@ def list_snapshots(
         "off": offset,
     }
 
-    with db_conn() as conn:
-        rows = conn.execute(query, params).fetchall()
+    async with async_db_conn() as conn:
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
 
         return [
             SnapshotOut(
                 snapshot_id=row["snapshot_id"],
                 portfolio_node_id=row["portfolio_node_id"],
                 as_of_date=row["as_of_date"],
-                total_positions=row["payload_json"].get("total_positions", 0),
-                total_instruments=row["payload_json"].get("total_instruments", 0),
+                total_positions=row["total_positions"],
+                total_instruments=row["total_instruments"],
                 created_at=row["created_at"],
             )
             for row in rows
         ]
 
 
-@router.post("/compare", response_model=SnapshotCompareResponse)
-def compare_snapshots(req: SnapshotCompareRequest):
-    """Compare two snapshots and identify position changes."""
-    with db_conn() as conn:
-        # Load both snapshots
-        snap1 = conn.execute(
-            "SELECT payload_json FROM portfolio_snapshot WHERE snapshot_id = %(sid)s",
-            {"sid": req.snapshot_id_1}
-        ).fetchone()
-
-        snap2 = conn.execute(
-            "SELECT payload_json FROM portfolio_snapshot WHERE snapshot_id = %(sid)s",
-            {"sid": req.snapshot_id_2}
-        ).fetchone()
-
-        if not snap1:
-            raise HTTPException(status_code=404, detail=f"Snapshot {req.snapshot_id_1} not found")
-        if not snap2:
-            raise HTTPException(status_code=404, detail=f"Snapshot {req.snapshot_id_2} not found")
+# Positions held by each snapshot, for the existence check and summary counts
+SNAPSHOT_POSITION_COUNTS_SQL = """
+SELECT snapshot_id, jsonb_array_length(payload_json -> 'positions') AS position_count
+FROM portfolio_snapshot
+WHERE snapshot_id IN (%(s1)s, %(s2)s)
+"""
 
-        positions1 = {p["instrument_id"]: p for p in snap1["payload_json"]["positions"]}
-        positions2 = {p["instrument_id"]: p for p in snap2["payload_json"]["positions"]}
+# Positions that differ between two snapshots, computed in PostgreSQL by
+# snapshot_diff() (sql/019_snapshot_diff_function.sql); only the differing
+# entries leave the database, snapshot 1 order first
+SNAPSHOT_DIFF_SQL = """
+SELECT kind, instrument_id, old_quantity, new_quantity, old_position, new_position
+FROM snapshot_diff(%(s1)s, %(s2)s)
+"""
 
-        # Find new positions
-        new_positions = [
-            positions2[iid] for iid in positions2
-            if iid not in positions1
-        ]
 
-        # Find removed positions
-        removed_positions = [
-            positions1[iid] for iid in positions1
-            if iid not in positions2
-        ]
+@router.post("/compare", response_model=SnapshotCompareResponse)
+async def compare_snapshots(req: SnapshotCompareRequest):
+    """Compare two snapshots and identify position changes.
+
+    The diff runs in PostgreSQL over the stored payloads; only the differing
+    positions are returned to the service.
+    """
+    params = {"s1": req.snapshot_id_1, "s2": req.snapshot_id_2}
 
-        # Find quantity changes
-        quantity_changes = []
-        for iid in positions1:
-            if iid in positions2:
-                old_qty = positions1[iid]["aggregated_quantity"]
-                new_qty = positions2[iid]["aggregated_quantity"]
-                if old_qty != new_qty:
-                    quantity_changes.append(
-                        PositionChange(
-                            instrument_id=iid,
-                            product_type=positions2[iid]["product_type"],
-                            base_ccy=positions2[iid]["base_ccy"],
-                            old_quantity=old_qty,
-                            new_quantity=new_qty,
-                            quantity_change=new_qty - old_qty,
-                        )
-                    )
-
-        # Build summary
-        summary = {
-            "new_count": len(new_positions),
-            "removed_count": len(removed_positions),
-            "changed_count": len(quantity_changes),
-            "unchanged_count": len([iid for iid in positions1 if iid in positions2 and positions1[iid]["aggregated_quantity"] == positions2[iid]["aggregated_quantity"]]),
+    async with async_db_conn() as conn:
+        cur = await conn.execute(SNAPSHOT_POSITION_COUNTS_SQL, params)
+        counts = {
+            row["snapshot_id"]: row["position_count"]
+            for row in await cur.fetchall()
         }
 
-        return SnapshotCompareResponse(
-            snapshot_id_1=req.snapshot_id_1,
-            snapshot_id_2=req.snapshot_id_2,
-            new_positions=new_positions,
-            removed_positions=removed_positions,
-            quantity_changes=quantity_changes,
-            summary=summary,
-        )
+        if req.snapshot_id_1 not in counts:
+            raise HTTPException(status_code=404, detail=f"Snapshot {req.snapshot_id_1} not found")
+        if req.snapshot_id_2 not in counts:
+            raise HTTPException(status_code=404, detail=f"Snapshot {req.snapshot_id_2} not found")
+
+        cur = await conn.execute(SNAPSHOT_DIFF_SQL, params)
+        rows = await cur.fetchall()
+
+    new_positions = []
+    removed_positions = []
+    quantity_changes = []
+    for row in rows:
+        if row["kind"] == "new":
+            new_positions.append(row["new_position"])
+        elif row["kind"] == "removed":
+            removed_positions.append(row["old_position"])
+        else:
+            new_position = row["new_position"]
+            quantity_changes.append(
+                PositionChange(
+                    instrument_id=row["instrument_id"],
+                    product_type=new_position["product_type"],
+                    base_ccy=new_position["base_ccy"],
+                    old_quantity=row["old_quantity"],
+                    new_quantity=row["new_quantity"],
+                    quantity_change=row["new_quantity"] - row["old_quantity"],
+                )
+            )
+
+    # Build summary
+    summary = {
+        "new_count": len(new_positions),
+        "removed_count": len(removed_positions),
+        "changed_count": len(quantity_changes),
+        "unchanged_count": counts[req.snapshot_id_1] - len(removed_positions) - len(quantity_changes),
+    }
+
+    return SnapshotCompareResponse(
+        snapshot_id_1=req.snapshot_id_1,
+        snapshot_id_2=req.snapshot_id_2,
+        new_positions=new_positions,
+        removed_positions=removed_positions,
+        quantity_changes=quantity_changes,
+        summary=summary,
+    )
 
 
 @router.get("/{portfolio_id}/time-series", response_model=List[SnapshotTimeSeriesPoint])
-def get_snapshot_timeseries(
+async def get_snapshot_timeseries(
     portfolio_id: str,
     date_from: Optional[datetime] = Query(None, description="From date"),
     date_to: Optional[datetime] = Query(None, description="To date"),
 ):
     """Get time-series of snapshots for a portfolio."""
-    query = """
-    SELECT
-      snapshot_id,
-      as_of_date,
-      (payload_json ->> 'total_positions')::int AS position_count,
-      (payload_json ->> 'total_instruments')::int AS instrument_count
-    FROM portfolio_snapshot
-    WHERE portfolio_node_id = %(pid)s
-      AND (%(from)s IS NULL OR as_of_date >= %(from)s)
-      AND (%(to)s IS NULL OR as_of_date <= %(to)s)
-    ORDER BY as_of_date ASC
-    """
+    query = SNAPSHOT_TIMESERIES_SQL[(date_from is not None) | (date_to is not None) << 1]
 
     params = {
         "pid": portfolio_id,
@@ -322,8 +532,9 @@ def get_snapshot_timeseries(
         "to": date_to,
     }
 
-    with db_conn() as conn:
-        rows = conn.execute(query, params).fetchall()
+    async with async_db_conn() as conn:
+        cur = await conn.execute(query, params)
+        rows = await cur.fetchall()
 
         return [
             SnapshotTimeSeriesPoint(
@@ -336,18 +547,21 @@ def get_snapshot_timeseries(
 
 
 @router.delete("/{snapshot_id}", status_code=204)
-def delete_snapshot(snapshot_id: str):
+async def delete_snapshot(snapshot_id: str):
     """Delete a portfolio snapshot (hard delete for now)."""
-    with db_conn() as conn:
-        result = conn.execute(
-            "DELETE FROM portfolio_snapshot WHERE snapshot_id = %(sid)s",
-            {"sid": snapshot_id}
-        )
+    async with async_db_conn() as conn:
+        cur = await conn.execute(DELETE_SNAPSHOT_SQL, {"sid": snapshot_id})
+        row = await cur.fetchone()
 
-        if result.rowcount == 0:
+        if not row:
             raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
 
-        conn.commit()
+        await conn.commit()
+
+    SNAPSHOT_CACHE.pop(
+        (row["portfolio_node_id"], row["as_of_date"], row["include_hierarchy"])
+    )
+    SNAPSHOT_POSITIONS_CACHE.pop(snapshot_id)
 
     return None
 
@@ -357,7 +571,7 @@ def delete_snapshot(snapshot_id: str):
 # ---------------------------------------------------------------------------
 
 @router.get("/legacy", response_model=List[PortfolioSnapshotOut])
-def list_legacy_snapshots(
+async def list_legacy_snapshots(
     portfolio_id: Optional[str] = Query(None, description="Filter by portfolio"),
     snapshot_type: Optional[str] = Query(None, description="Filter by snapshot type"),
 ):
@@ -366,49 +580,71 @@ def list_legacy_snapshots(
 
 
 @router.get("/{snapshot_id}/positions")
-def get_snapshot_positions(snapshot_id: str):
-    """Get the frozen positions from a historical snapshot."""
-    with db_conn() as conn:
-        row = conn.execute(
-            "SELECT payload_json FROM portfolio_snapshot WHERE snapshot_id = %(sid)s",
-            {"sid": snapshot_id}
-        ).fetchone()
+async def get_snapshot_positions(snapshot_id: str):
+    """Get the frozen positions from a historical snapshot.
+
+    The positions array is fetched as jsonb text and spliced into the body
+    without being parsed in Python; bodies are cached per snapshot_id.
+    """
+    body = SNAPSHOT_POSITIONS_CACHE.get(snapshot_id)
+    if body is None:
+        async with async_db_conn() as conn:
+            cur = await conn.execute(SNAPSHOT_POSITIONS_SQL, {"sid": snapshot_id})
+            row = await cur.fetchone()
 
         if not row:
             raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
 
-        return {"positions": row["payload_json"]["positions"]}
+        body = b'{"positions":' + row["positions"].encode() + b"}"
+        SNAPSHOT_POSITIONS_CACHE.set(snapshot_id, body)
+
+    return Response(body, media_type="application/json")
+
+
+# Keyed by include_payload; the totals come from the stored columns
+# (sql/016_snapshot_totals_columns.sql), so the payload is only read on request
+LATEST_SNAPSHOT_SQL = {
+    include_payload: f"""
+SELECT snapshot_id, portfolio_node_id, as_of_date, created_at,
+       total_positions, total_instruments{", payload_json" if include_payload else ""}
+FROM portfolio_snapshot
+WHERE portfolio_node_id = %(pid)s
+ORDER BY as_of_date DESC
+LIMIT 1
+"""
+    for include_payload in (False, True)
+}
 
 
 @router.get("/portfolio/{portfolio_id}/latest", response_model=SnapshotOut)
-def get_latest_snapshot(portfolio_id: str):
+async def get_latest_snapshot(
+    portfolio_id: str,
+    include_payload: bool = Query(False, description="Include the full position payload"),
+):
     """Get the most recent snapshot for a portfolio."""
-    with db_conn() as conn:
-        row = conn.execute(
-            """SELECT * FROM portfolio_snapshot
-               WHERE portfolio_node_id = %(pid)s
-               ORDER BY as_of_date DESC
-               LIMIT 1""",
+    async with async_db_conn() as conn:
+        cur = await conn.execute(
+            LATEST_SNAPSHOT_SQL[include_payload],
             {"pid": portfolio_id}
-        ).fetchone()
+        )
+        row = await cur.fetchone()
 
         if not row:
             raise HTTPException(status_code=404, detail=f"No snapshots found for portfolio {portfolio_id}")
 
-        payload = row["payload_json"]
         return SnapshotOut(
             snapshot_id=row["snapshot_id"],
             portfolio_node_id=row["portfolio_node_id"],
             as_of_date=row["as_of_date"],
-            total_positions=payload.get("total_positions", 0),
-            total_instruments=payload.get("total_instruments", 0),
-            payload_json=payload,
+            total_positions=row["total_positions"],
+            total_instruments=row["total_instruments"],
+            payload_json=row.get("payload_json"),
             created_at=row["created_at"],
         )
 
 
 @router.get("/portfolio/{portfolio_id}/timeseries", response_model=TimeSeriesResponse)
-def get_timeseries(
+async def get_timeseries(
     portfolio_id: str,
     measure: str = Query("market_value", description="Measure to chart over time"),
     start_date: Optional[str] = Query(None, description="Start date (ISO format)"),
@@ -418,11 +654,48 @@ def get_timeseries(
     raise HTTPException(status_code=501, detail="Not implemented")
 
 
+# Snapshots of one portfolio among the two requested, for the diff's 404 check
+PORTFOLIO_SNAPSHOTS_SQL = """
+SELECT snapshot_id FROM portfolio_snapshot
+WHERE portfolio_node_id = %(pid)s AND snapshot_id IN (%(s1)s, %(s2)s)
+"""
+
+# Quantity-level diff rows, without the position objects
+SNAPSHOT_QUANTITY_DIFF_SQL = """
+SELECT kind, instrument_id, old_quantity, new_quantity
+FROM snapshot_diff(%(s1)s, %(s2)s)
+"""
+
+
 @router.post("/portfolio/{portfolio_id}/diff")
-def diff_snapshots(
+async def diff_snapshots(
     portfolio_id: str,
     snapshot_id_a: str = Query(..., description="First snapshot ID"),
     snapshot_id_b: str = Query(..., description="Second snapshot ID"),
 ):
-    """Compare two snapshots and return the difference in holdings."""
-    raise HTTPException(status_code=501, detail="Not implemented")
+    """Compare two snapshots and return the difference in holdings.
+
+    Each row is one instrument whose quantity differs: kind is new, removed
+    or changed, with the quantity in each snapshot (null where absent).
+    """
+    params = {"pid": portfolio_id, "s1": snapshot_id_a, "s2": snapshot_id_b}
+
+    async with async_db_conn() as conn:
+        cur = await conn.execute(PORTFOLIO_SNAPSHOTS_SQL, params)
+        found = {row["snapshot_id"] for row in await cur.fetchall()}
+        for sid in (snapshot_id_a, snapshot_id_b):
+            if sid not in found:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Snapshot {sid} not found for portfolio {portfolio_id}"
+                )
+
+        cur = await conn.execute(SNAPSHOT_QUANTITY_DIFF_SQL, params)
+        rows = await cur.fetchall()
+
+    return {
+        "portfolio_id": portfolio_id,
+        "snapshot_id_a": snapshot_id_a,
+        "snapshot_id_b": snapshot_id_b,
+        "changes": rows,
+    }
@@ -0,0 +1,118 @@
+"""Background worker for queued portfolio snapshots.
+
+create_snapshot queues snapshots too large to build inside a request in
+portfolio_snapshot_job (sql/020_portfolio_snapshot_job.sql). This process
+claims them one at a time under a lease, runs the same create statement as the
+synchronous path, and records the resulting snapshot_id on the job in the same
+transaction.
+
+Run with: python -m services.portfolio_svc.app.snapshot_worker
+"""
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime
+
+import psycopg
+from psycopg.rows import dict_row
+
+from services.common.db import DB_DSN
+from services.portfolio_svc.app.routes.snapshots import (
+    CREATE_SNAPSHOT_SQL,
+    _create_snapshot_params,
+)
+
+LEASE_SECONDS = int(os.getenv("SNAPSHOT_WORKER_LEASE_SECONDS", "300"))
+SLEEP_SECONDS = float(os.getenv("SNAPSHOT_WORKER_IDLE_SLEEP_SECONDS", "1.0"))
+WORKER_ID = os.getenv("WORKER_ID", "snapshot-worker-1")
+
+# Oldest queued job, or a running one whose lease ran out (its worker died)
+CLAIM_JOB_SQL = """
+WITH candidate AS (
+  SELECT job_id
+  FROM portfolio_snapshot_job
+  WHERE (status = 'QUEUED')
+     OR (status = 'RUNNING' AND leased_until < now())
+  ORDER BY created_at
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1
+)
+UPDATE portfolio_snapshot_job j
+SET status = 'RUNNING',
+    attempt = attempt + 1,
+    leased_until = now() + (%(lease_seconds)s || ' seconds')::interval,
+    updated_at = now()
+FROM candidate
+WHERE j.job_id = candidate.job_id
+RETURNING j.job_id, j.portfolio_node_id, j.as_of_iso, j.include_hierarchy, j.attempt;
+"""
+
+MARK_SUCCEEDED_SQL = """
+UPDATE portfolio_snapshot_job
+SET status = 'SUCCEEDED', snapshot_id = %(snapshot_id)s, leased_until = NULL,
+    last_error = NULL, updated_at = now()
+WHERE job_id = %(job_id)s;
+"""
+
+# Back to the queue until max_attempts, then DEAD
+MARK_FAILED_SQL = """
+UPDATE portfolio_snapshot_job
+SET status = CASE WHEN attempt >= max_attempts THEN 'DEAD' ELSE 'QUEUED' END,
+    leased_until = NULL,
+    last_error = %(err)s,
+    updated_at = now()
+WHERE job_id = %(job_id)s;
+"""
+
+
+def worker_main() -> None:
+    print(f"[snapshot-worker] starting {WORKER_ID}")
+
+    with psycopg.connect(DB_DSN, row_factory=dict_row) as conn:
+        conn.autocommit = False
+
+        while True:
+            job = None
+            try:
+                with conn.transaction():
+                    job = conn.execute(CLAIM_JOB_SQL, {"lease_seconds": LEASE_SECONDS}).fetchone()
+
+                if not job:
+                    time.sleep(SLEEP_SECONDS)
+                    continue
+
+                print(f"[snapshot-worker] claimed job={job['job_id']} attempt={job['attempt']}")
+
+                params = _create_snapshot_params(
+                    job["portfolio_node_id"],
+                    datetime.fromisoformat(job["as_of_iso"]),
+                    job["include_hierarchy"],
+                )
+                with conn.transaction():
+                    row = conn.execute(
+                        CREATE_SNAPSHOT_SQL[job["include_hierarchy"]], params
+                    ).fetchone()
+                    conn.execute(
+                        MARK_SUCCEEDED_SQL,
+                        {"job_id": job["job_id"], "snapshot_id": row["snapshot_id"]},
+                    )
+
+                print(f"[snapshot-worker] succeeded job={job['job_id']} snapshot={row['snapshot_id']}")
+
+            except Exception as e:
+                err = repr(e)
+                print(f"[snapshot-worker] error: {err}")
+
+                if job is not None:
+                    try:
+                        with conn.transaction():
+                            conn.execute(MARK_FAILED_SQL, {"job_id": job["job_id"], "err": err})
+                    except Exception as e2:
+                        print(f"[snapshot-worker] failed to mark job failed: {repr(e2)}")
+
+                time.sleep(0.2)
+
+
+if __name__ == "__main__":
+    worker_main()
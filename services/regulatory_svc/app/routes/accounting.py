@@ -1,12 +1,15 @@
 """GAAP / IFRS valuation and classification endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+import math
+from uuid import uuid4
+
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from services.regulatory_svc.app.models import (
     AccountingValuationRequest,
     AccountingValuationResult,
-    FairValueEntry,
 )
 from compute.regulatory.gaap_ifrs import (
     classify_gaap_category,
@@ -15,140 +18,277 @@ from compute.regulatory.gaap_ifrs import (
     compute_ifrs_valuation,
 )
 from services.common.db import db_conn
-from services.common.audit import log_audit_entry
+from services.common.audit import INSERT_AUDIT_ENTRY_SQL, _audit_entry_params
+from services.common.cache import TTLCache
 from psycopg.rows import dict_row
 
 router = APIRouter()
 
+POSITIONS_FETCH_SIZE = 10_000
+
+# GAAP / IFRS 9 category -> fair-value entry classification, with the fallback
+# for categories the mapping does not know
+GAAP_CLASSIFICATIONS = {
+    "HELD_TO_MATURITY": "HTM",
+    "AVAILABLE_FOR_SALE": "AFS",
+    "TRADING": "HFT",
+}
+GAAP_DEFAULT_CLASSIFICATION = "AFS"
+
+IFRS_CLASSIFICATIONS = {
+    "AMORTIZED_COST": "AMORTISED_COST",
+    "FVOCI": "FVOCI",
+    "FVTPL": "FVTPL",
+}
+IFRS_DEFAULT_CLASSIFICATION = "FVTPL"
+
+# Audit-backed read results keyed by ("valuation" | "hierarchy", run_id) or
+# ("unrealised_pnl", portfolio_node_id). A valuation evicts its run's and its
+# portfolio's entries once its audit row is written; the TTL bounds staleness
+# from runs written through other workers.
+AUDIT_CACHE = TTLCache(maxsize=2048, ttl=60)
+
+# Latest GAAP/IFRS audit row for a run, reduced to the fields the responses use
+VALUATION_AUDIT_SQL = """
+    SELECT
+      entity_id,
+      COALESCE(assumptions_json ->> 'standard', 'US_GAAP') AS standard,
+      COALESCE((results_json ->> 'total_carrying_value')::float8, 0) AS total_carrying_value,
+      COALESCE((results_json ->> 'total_fair_value')::float8, 0) AS total_fair_value,
+      COALESCE((results_json ->> 'total_unrealised_pnl')::float8, 0) AS total_unrealised_pnl,
+      computed_at
+    FROM audit_trail
+    WHERE calculation_run_id = %(rid)s AND audit_type IN ('GAAP', 'IFRS')
+    ORDER BY computed_at DESC LIMIT 1
+"""
+
+FAIR_VALUE_BY_CLASSIFICATION_SQL = """
+    SELECT classification, SUM(fair_value) AS fair_value
+    FROM fair_value_entry
+    WHERE run_id = %(rid)s
+    GROUP BY classification
+"""
+
+# Latest unrealised P&L for the portfolio a run valued
+RUN_UNREALISED_PNL_SQL = """
+    SELECT
+      entity_id,
+      assumptions_json ->> 'standard' AS standard,
+      (results_json ->> 'total_unrealised_pnl')::float8 AS total_unrealised_pnl
+    FROM audit_trail
+    WHERE entity_id = (
+        SELECT entity_id FROM audit_trail
+        WHERE calculation_run_id = %(rid)s AND audit_type IN ('GAAP', 'IFRS')
+        ORDER BY computed_at DESC LIMIT 1
+      )
+      AND audit_type IN ('GAAP', 'IFRS')
+    ORDER BY computed_at DESC LIMIT 1
+"""
+
 
 @router.post("/valuations", response_model=AccountingValuationResult, status_code=201)
-def compute_accounting_valuation(req: AccountingValuationRequest):
+def compute_accounting_valuation(
+    req: AccountingValuationRequest,
+    include_entries: bool = Query(True, description="Return the per-position entries, not just the totals"),
+):
     """Classify positions into fair-value hierarchy levels and compute carrying vs. fair values."""
 
     with db_conn() as conn:
         conn.row_factory = dict_row
 
-        positions = conn.execute("""
-            SELECT
-              pos.position_id,
-              pos.instrument_id,
-              COALESCE(pos.cost_basis, 0) AS book_value,
-              COALESCE((vr.measures_json ->> 'PV')::numeric, 0) AS market_value,
-              pos.metadata_json,
-              COALESCE(instr.product_type, '') AS product_type
-            FROM position pos
-            LEFT JOIN instrument instr ON pos.instrument_id = instr.instrument_id
-            LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-              AND vr.scenario_id = 'BASE'
-            WHERE pos.portfolio_node_id = %(pid)s
-        """, {'pid': req.portfolio_node_id}).fetchall()
-
-        if not positions:
-            raise HTTPException(status_code=404, detail="No positions found")
+        if req.standard == "US_GAAP":
+            valuate = compute_gaap_valuation
+            classifications, default_classification = GAAP_CLASSIFICATIONS, GAAP_DEFAULT_CLASSIFICATION
+        else:
+            valuate = compute_ifrs_valuation
+            classifications, default_classification = IFRS_CLASSIFICATIONS, IFRS_DEFAULT_CLASSIFICATION
 
-        entries = []
+        position_count = 0
         total_carrying = 0.0
         total_fair = 0.0
         total_unrealised = 0.0
+        entries = []
+
+        # Stream positions through a server-side cursor and persist each batch
+        # as it is valued, so the raw rows are never all held at once
+        with conn.cursor(name="accounting_positions") as positions, conn.cursor() as cur:
+            positions.execute("""
+                SELECT
+                  pos.position_id,
+                  pos.instrument_id,
+                  COALESCE(pos.cost_basis, 0) AS book_value,
+                  COALESCE((vr.measures_json ->> 'PV')::numeric, 0) AS market_value,
+                  COALESCE(pos.metadata_json ->> 'intent', '') AS intent,
+                  COALESCE(pos.metadata_json ->> 'business_model', '') AS business_model,
+                  COALESCE(instr.product_type, '') AS product_type
+                FROM position pos
+                LEFT JOIN instrument instr ON pos.instrument_id = instr.instrument_id
+                LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
+                  AND vr.scenario_id = 'BASE'
+                WHERE pos.portfolio_node_id = %(pid)s
+            """, {'pid': req.portfolio_node_id})
+
+            while batch := positions.fetchmany(POSITIONS_FETCH_SIZE):
+                fv_rows = []
+                for pos in batch:
+                    market_value = float(pos['market_value'] or 0)
+                    book_value = float(pos['book_value'] or 0)
+                    # The row carries the classification inputs (intent,
+                    # business_model, product_type) under the keys the
+                    # gaap_ifrs classifiers read
+                    result = valuate(
+                        position=pos,
+                        market_value=market_value,
+                        book_value=book_value,
+                    )
+                    fv_rows.append((
+                        req.run_id,
+                        pos['position_id'],
+                        pos['instrument_id'],
+                        classifications.get(result["category"], default_classification),
+                        result["carrying_value"],
+                        market_value,
+                        result.get("unrealized_gain_loss", 0.0),
+                    ))
+
+                position_count += len(fv_rows)
+                total_carrying += math.fsum(r[4] for r in fv_rows)
+                total_fair += math.fsum(r[5] for r in fv_rows)
+                total_unrealised += math.fsum(r[6] for r in fv_rows)
+
+                # Persisted so the hierarchy breakdown can aggregate in SQL
+                cur.executemany("""
+                    INSERT INTO fair_value_entry
+                      (run_id, position_id, instrument_id, classification,
+                       carrying_value, fair_value, unrealised_pnl)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (run_id, position_id) DO UPDATE
+                    SET instrument_id = EXCLUDED.instrument_id,
+                        classification = EXCLUDED.classification,
+                        carrying_value = EXCLUDED.carrying_value,
+                        fair_value = EXCLUDED.fair_value,
+                        unrealised_pnl = EXCLUDED.unrealised_pnl,
+                        created_at = now()
+                """, fv_rows)
+
+                if include_entries:
+                    entries.extend(
+                        {
+                            "position_id": r[1],
+                            "instrument_id": r[2],
+                            "classification": r[3],
+                            "carrying_value": r[4],
+                            "fair_value": r[5],
+                            "unrealised_pnl": r[6],
+                        }
+                        for r in fv_rows
+                    )
+
+        if not position_count:
+            raise HTTPException(status_code=404, detail="No positions found")
 
-        for pos in positions:
-            market_value = float(pos['market_value'] or 0)
-            book_value = float(pos['book_value'] or 0)
-            metadata = pos['metadata_json'] or {}
-            metadata['product_type'] = pos['product_type']
-
-            if req.standard == "US_GAAP":
-                result = compute_gaap_valuation(
-                    position=metadata,
-                    market_value=market_value,
-                    book_value=book_value,
-                )
-                classification = _gaap_to_classification(result["category"])
-            else:
-                result = compute_ifrs_valuation(
-                    position=metadata,
-                    market_value=market_value,
-                    book_value=book_value,
-                )
-                classification = _ifrs_to_classification(result["category"])
-
-            entries.append(FairValueEntry(
-                position_id=pos['position_id'],
-                instrument_id=pos['instrument_id'],
-                classification=classification,
-                carrying_value=result["carrying_value"],
-                fair_value=market_value,
-                unrealised_pnl=result.get("unrealized_gain_loss", 0.0),
-            ))
-
-            total_carrying += result["carrying_value"]
-            total_fair += market_value
-            total_unrealised += result.get("unrealized_gain_loss", 0.0)
-
-        # Log audit trail
-        log_audit_entry(
-            audit_type="GAAP" if req.standard == "US_GAAP" else "IFRS",
-            calculation_run_id=req.run_id,
-            entity_type="PORTFOLIO",
-            entity_id=req.portfolio_node_id,
-            calculation_method=req.standard,
-            input_snapshot_id="N/A",
-            assumptions={"standard": req.standard},
-            results={
+        # The audit entry commits with the fair_value_entry rows, so the
+        # valuation is readable through GET /valuations/{run_id} as soon as
+        # the 201 is sent
+        conn.execute(INSERT_AUDIT_ENTRY_SQL, _audit_entry_params(
+            str(uuid4()),
+            "GAAP" if req.standard == "US_GAAP" else "IFRS",
+            req.run_id, "PORTFOLIO", req.portfolio_node_id, req.standard, "N/A",
+            {"standard": req.standard},
+            {
                 "total_carrying_value": total_carrying,
                 "total_fair_value": total_fair,
                 "total_unrealised_pnl": total_unrealised,
-                "position_count": len(entries),
+                "position_count": position_count,
             },
-        )
-
-        return AccountingValuationResult(
-            run_id=req.run_id,
-            as_of_date=req.as_of_date,
-            standard=req.standard,
-            entries=entries,
-            total_carrying_value=total_carrying,
-            total_fair_value=total_fair,
-            total_unrealised_pnl=total_unrealised,
-        )
+        ))
+
+    AUDIT_CACHE.pop(("valuation", req.run_id))
+    AUDIT_CACHE.pop(("hierarchy", req.run_id))
+    AUDIT_CACHE.pop(("unrealised_pnl", req.portfolio_node_id))
+
+    # Entries come from our own classification tables, so encode the
+    # AccountingValuationResult body directly instead of validating it
+    result = {
+        "run_id": req.run_id,
+        "as_of_date": req.as_of_date,
+        "standard": req.standard,
+        "entries": entries,
+        "total_carrying_value": total_carrying,
+        "total_fair_value": total_fair,
+        "total_unrealised_pnl": total_unrealised,
+        "computed_at": None,
+    }
+    return Response(
+        orjson.dumps(result, option=orjson.OPT_UTC_Z),
+        status_code=201,
+        media_type="application/json",
+    )
 
 
 @router.get("/valuations/{run_id}", response_model=AccountingValuationResult)
 def get_accounting_valuation(run_id: str):
     """Retrieve a previously computed accounting valuation result."""
+    cached = AUDIT_CACHE.get(("valuation", run_id))
+    if cached is not None:
+        return cached
 
     with db_conn() as conn:
         conn.row_factory = dict_row
-        audit = conn.execute("""
-            SELECT entity_id, assumptions_json, results_json, computed_at
-            FROM audit_trail
-            WHERE calculation_run_id = %(rid)s AND audit_type IN ('GAAP', 'IFRS')
-            ORDER BY computed_at DESC LIMIT 1
-        """, {'rid': run_id}).fetchone()
+        audit = conn.execute(VALUATION_AUDIT_SQL, {'rid': run_id}).fetchone()
+
+    if not audit:
+        raise HTTPException(status_code=404, detail="Accounting result not found")
+
+    result = _valuation_from_audit(run_id, audit)
+    AUDIT_CACHE.set(("valuation", run_id), result)
+    return result
+
+
+@router.get("/valuations/{run_id}/bundle")
+def get_accounting_valuation_bundle(run_id: str):
+    """Return a run's valuation, fair-value breakdown and portfolio unrealised P&L together.
+
+    The three reads are sent in one pipeline, so a dashboard pays a single
+    round-trip instead of one per endpoint.
+    """
 
+    with db_conn() as conn:
+        conn.row_factory = dict_row
+        with conn.pipeline():
+            audit_cur = conn.execute(VALUATION_AUDIT_SQL, {'rid': run_id})
+            breakdown_cur = conn.execute(FAIR_VALUE_BY_CLASSIFICATION_SQL, {'rid': run_id})
+            pnl_cur = conn.execute(RUN_UNREALISED_PNL_SQL, {'rid': run_id})
+
+        audit = audit_cur.fetchone()
         if not audit:
             raise HTTPException(status_code=404, detail="Accounting result not found")
 
-        results = audit['results_json']
-        return AccountingValuationResult(
-            run_id=run_id,
-            as_of_date=audit['computed_at'],
-            standard=audit['assumptions_json'].get('standard', 'US_GAAP'),
-            total_carrying_value=results.get('total_carrying_value', 0.0),
-            total_fair_value=results.get('total_fair_value', 0.0),
-            total_unrealised_pnl=results.get('total_unrealised_pnl', 0.0),
-            computed_at=audit['computed_at'],
-        )
+        pnl = pnl_cur.fetchone()
+        return {
+            "run_id": run_id,
+            "valuation": _valuation_from_audit(run_id, audit),
+            "fair_value_hierarchy": _fair_value_hierarchy(
+                run_id,
+                audit['total_fair_value'],
+                breakdown_cur.fetchall(),
+            ),
+            "unrealised_pnl": _unrealised_pnl(pnl['entity_id'], pnl),
+        }
 
 
 @router.get("/fair-value-hierarchy/{run_id}")
 def get_fair_value_hierarchy(run_id: str):
     """Return the fair-value hierarchy (Level 1/2/3) breakdown for a run."""
+    cached = AUDIT_CACHE.get(("hierarchy", run_id))
+    if cached is not None:
+        return cached
 
     with db_conn() as conn:
         conn.row_factory = dict_row
         audit = conn.execute("""
-            SELECT results_json FROM audit_trail
+            SELECT (results_json ->> 'total_fair_value')::float8 AS total_fair_value
+            FROM audit_trail
             WHERE calculation_run_id = %(rid)s AND audit_type IN ('GAAP', 'IFRS')
             ORDER BY computed_at DESC LIMIT 1
         """, {'rid': run_id}).fetchone()
@@ -156,36 +296,39 @@ def get_fair_value_hierarchy(run_id: str):
         if not audit:
             raise HTTPException(status_code=404, detail="Valuation not found")
 
-        return {
-            "run_id": run_id,
-            "hierarchy": {
-                "LEVEL_1": audit['results_json'].get('total_fair_value', 0.0),
-                "LEVEL_2": 0.0,
-                "LEVEL_3": 0.0,
-            },
-        }
+        by_classification = conn.execute(
+            FAIR_VALUE_BY_CLASSIFICATION_SQL, {'rid': run_id}
+        ).fetchall()
+
+    hierarchy = _fair_value_hierarchy(run_id, audit['total_fair_value'], by_classification)
+    AUDIT_CACHE.set(("hierarchy", run_id), hierarchy)
+    return hierarchy
 
 
 @router.get("/unrealised-pnl/{portfolio_node_id}")
 def get_unrealised_pnl(portfolio_node_id: str):
     """Return aggregate unrealised P&L by classification bucket."""
+    cached = AUDIT_CACHE.get(("unrealised_pnl", portfolio_node_id))
+    if cached is not None:
+        return cached
 
     with db_conn() as conn:
         conn.row_factory = dict_row
         audit = conn.execute("""
-            SELECT results_json, assumptions_json FROM audit_trail
+            SELECT
+              assumptions_json ->> 'standard' AS standard,
+              (results_json ->> 'total_unrealised_pnl')::float8 AS total_unrealised_pnl
+            FROM audit_trail
             WHERE entity_id = %(pid)s AND audit_type IN ('GAAP', 'IFRS')
             ORDER BY computed_at DESC LIMIT 1
         """, {'pid': portfolio_node_id}).fetchone()
 
-        if not audit:
-            raise HTTPException(status_code=404, detail="No valuation found")
+    if not audit:
+        raise HTTPException(status_code=404, detail="No valuation found")
 
-        return {
-            "portfolio_node_id": portfolio_node_id,
-            "standard": audit['assumptions_json'].get('standard', 'US_GAAP'),
-            "total_unrealised_pnl": audit['results_json'].get('total_unrealised_pnl', 0.0),
-        }
+    pnl = _unrealised_pnl(portfolio_node_id, audit)
+    AUDIT_CACHE.set(("unrealised_pnl", portfolio_node_id), pnl)
+    return pnl
 
 
 @router.get("/hedge-effectiveness/{run_id}")
@@ -200,34 +343,34 @@ def get_impairment_assessment(portfolio_node_id: str):
 
     with db_conn() as conn:
         conn.row_factory = dict_row
-        positions = conn.execute("""
+        # Screen in SQL: only positions more than 10% below book come back
+        impaired = conn.execute("""
+            WITH valued AS (
+              SELECT
+                pos.position_id,
+                COALESCE(pos.cost_basis, 0)::float8 AS book_value,
+                COALESCE((vr.measures_json ->> 'PV')::float8, 0) AS market_value
+              FROM position pos
+              LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
+                AND vr.scenario_id = 'BASE'
+              WHERE pos.portfolio_node_id = %(pid)s
+            )
             SELECT
-              pos.position_id,
-              COALESCE(pos.cost_basis, 0) AS book_value,
-              COALESCE((vr.measures_json ->> 'PV')::numeric, 0) AS market_value,
-              pos.metadata_json
-            FROM position pos
-            LEFT JOIN valuation_result vr ON pos.position_id = vr.position_id
-              AND vr.scenario_id = 'BASE'
-            WHERE pos.portfolio_node_id = %(pid)s
+              position_id,
+              book_value,
+              market_value,
+              book_value - market_value AS impairment,
+              (1 - market_value / book_value) * 100 AS decline_pct
+            FROM valued
+            WHERE book_value > 0 AND market_value < book_value * 0.90
         """, {'pid': portfolio_node_id}).fetchall()
 
-        if not positions:
+        if not impaired and not conn.execute(
+            "SELECT 1 FROM position WHERE portfolio_node_id = %(pid)s LIMIT 1",
+            {'pid': portfolio_node_id},
+        ).fetchone():
             raise HTTPException(status_code=404, detail="No positions found")
 
-        impaired = []
-        for pos in positions:
-            bv = float(pos['book_value'] or 0)
-            mv = float(pos['market_value'] or 0)
-            if bv > 0 and mv < bv * 0.90:
-                impaired.append({
-                    "position_id": pos['position_id'],
-                    "book_value": bv,
-                    "market_value": mv,
-                    "impairment": bv - mv,
-                    "decline_pct": (1 - mv / bv) * 100,
-                })
-
         return {
             "portfolio_node_id": portfolio_node_id,
             "impaired_count": len(impaired),
@@ -236,21 +379,39 @@ def get_impairment_assessment(portfolio_node_id: str):
         }
 
 
-def _gaap_to_classification(category: str) -> str:
-    """Map GAAP category to model classification enum."""
-    mapping = {
-        "HELD_TO_MATURITY": "HTM",
-        "AVAILABLE_FOR_SALE": "AFS",
-        "TRADING": "HFT",
+def _valuation_from_audit(run_id: str, audit: dict) -> AccountingValuationResult:
+    """Build a totals-only valuation result from its audit row."""
+    return AccountingValuationResult(
+        run_id=run_id,
+        as_of_date=audit['computed_at'],
+        standard=audit['standard'],
+        total_carrying_value=audit['total_carrying_value'],
+        total_fair_value=audit['total_fair_value'],
+        total_unrealised_pnl=audit['total_unrealised_pnl'],
+        computed_at=audit['computed_at'],
+    )
+
+
+def _fair_value_hierarchy(run_id: str, total_fair_value, by_classification) -> dict:
+    """Shape the fair-value hierarchy response."""
+    return {
+        "run_id": run_id,
+        "hierarchy": {
+            "LEVEL_1": total_fair_value or 0.0,
+            "LEVEL_2": 0.0,
+            "LEVEL_3": 0.0,
+        },
+        "by_classification": {
+            r['classification']: r['fair_value'] for r in by_classification
+        },
     }
-    return mapping.get(category, "AFS")
 
 
-def _ifrs_to_classification(category: str) -> str:
-    """Map IFRS category to model classification enum."""
-    mapping = {
-        "AMORTIZED_COST": "AMORTISED_COST",
-        "FVOCI": "FVOCI",
-        "FVTPL": "FVTPL",
+def _unrealised_pnl(portfolio_node_id: str, audit: dict) -> dict:
+    """Shape the unrealised P&L response."""
+    return {
+        "portfolio_node_id": portfolio_node_id,
+        "standard": audit['standard'] or 'US_GAAP',
+        "total_unrealised_pnl": audit['total_unrealised_pnl'] or 0.0,
     }
-    return mapping.get(category, "FVTPL")
+
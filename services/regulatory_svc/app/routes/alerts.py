@@ -7,11 +7,72 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 
+from services.common.cache import TTLCache
 from services.common.db import db_conn
 from psycopg.rows import dict_row
 
 router = APIRouter()
 
+# Portfolios known to have no enabled alerts (their own or global), so
+# evaluate_alerts can answer without touching the database. Config writes
+# through this worker clear it; the TTL bounds staleness from writes made
+# through other workers.
+NO_ALERTS_CACHE = TTLCache(maxsize=16384, ttl=30)
+
+
+def _list_alert_configs_sql(flags: int) -> str:
+    """Render the alert_config listing for one filter combination.
+
+    Bit 0: portfolio, bit 1: enabled.
+    """
+    where_parts = []
+    if flags & 0b01:
+        where_parts.append("portfolio_node_id = %(pid)s")
+    if flags & 0b10:
+        where_parts.append("enabled = %(enabled)s")
+    where = f"WHERE {' AND '.join(where_parts)}" if where_parts else ""
+
+    return f"""
+SELECT alert_id, alert_type, portfolio_node_id, threshold_value,
+       threshold_operator, metric_name, notification_channels, enabled
+FROM alert_config
+{where}
+ORDER BY created_at DESC
+LIMIT %(limit)s
+"""
+
+
+def _list_alert_logs_sql(flags: int) -> str:
+    """Render the alert_log listing for one filter combination.
+
+    Bit 0: alert, bit 1: portfolio, bit 2: resolved.
+    """
+    where_parts = []
+    if flags & 0b001:
+        where_parts.append("alert_id = %(aid)s")
+    if flags & 0b010:
+        where_parts.append("portfolio_node_id = %(pid)s")
+    if flags & 0b100:
+        where_parts.append("resolved = %(resolved)s")
+    where = f"WHERE {' AND '.join(where_parts)}" if where_parts else ""
+
+    return f"""
+SELECT log_id, alert_id, triggered_at,
+       metric_value::float8 AS metric_value,
+       threshold_value::float8 AS threshold_value,
+       portfolio_node_id, position_id, notification_sent, resolved
+FROM alert_log
+{where}
+ORDER BY triggered_at DESC
+LIMIT %(limit)s
+"""
+
+
+# Every filter combination is rendered once at import, so each request sends
+# one of a fixed set of statements and can run them prepared
+LIST_ALERT_CONFIGS_SQL = {flags: _list_alert_configs_sql(flags) for flags in range(4)}
+LIST_ALERT_LOGS_SQL = {flags: _list_alert_logs_sql(flags) for flags in range(8)}
+
 
 class AlertConfigIn(BaseModel):
     alert_id: Optional[str] = None
@@ -78,6 +139,8 @@ def create_alert_config(config: AlertConfigIn) -> AlertConfigOut:
             'enabled': config.enabled,
         })
 
+    NO_ALERTS_CACHE.clear()
+
     return AlertConfigOut(
         alert_id=alert_id,
         alert_type=config.alert_type,
@@ -94,30 +157,16 @@ def create_alert_config(config: AlertConfigIn) -> AlertConfigOut:
 def list_alert_configs(
     portfolio_node_id: str = Query(None),
     enabled: bool = Query(None),
+    limit: int = Query(200, le=1000),
 ) -> List[AlertConfigOut]:
     """List alert configurations with optional filters."""
 
-    filters = []
-    params: dict = {}
-
-    if portfolio_node_id:
-        filters.append("portfolio_node_id = %(pid)s")
-        params['pid'] = portfolio_node_id
-    if enabled is not None:
-        filters.append("enabled = %(enabled)s")
-        params['enabled'] = enabled
-
-    where_clause = " AND ".join(filters) if filters else "TRUE"
+    flags = bool(portfolio_node_id) | (enabled is not None) << 1
+    params = {'limit': limit, 'pid': portfolio_node_id, 'enabled': enabled}
 
     with db_conn() as conn:
         conn.row_factory = dict_row
-        rows = conn.execute(f"""
-            SELECT alert_id, alert_type, portfolio_node_id, threshold_value,
-                   threshold_operator, metric_name, notification_channels, enabled
-            FROM alert_config
-            WHERE {where_clause}
-            ORDER BY created_at DESC
-        """, params).fetchall()
+        rows = conn.execute(LIST_ALERT_CONFIGS_SQL[flags], params, prepare=True).fetchall()
 
         return [AlertConfigOut(**dict(r)) for r in rows]
 
@@ -133,6 +182,8 @@ def delete_alert_config(alert_id: str):
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Alert config not found")
 
+    NO_ALERTS_CACHE.clear()
+
 
 @router.get("/log", response_model=List[AlertLogOut])
 def list_alert_logs(
@@ -143,39 +194,29 @@ def list_alert_logs(
 ) -> List[AlertLogOut]:
     """List alert trigger log with filters."""
 
-    filters = []
-    params: dict = {"limit": limit}
-
-    if alert_id:
-        filters.append("alert_id = %(aid)s")
-        params['aid'] = alert_id
-    if portfolio_node_id:
-        filters.append("portfolio_node_id = %(pid)s")
-        params['pid'] = portfolio_node_id
-    if resolved is not None:
-        filters.append("resolved = %(resolved)s")
-        params['resolved'] = resolved
-
-    where_clause = " AND ".join(filters) if filters else "TRUE"
+    flags = (
+        bool(alert_id)
+        | bool(portfolio_node_id) << 1
+        | (resolved is not None) << 2
+    )
+    params = {
+        'limit': limit,
+        'aid': alert_id,
+        'pid': portfolio_node_id,
+        'resolved': resolved,
+    }
 
     with db_conn() as conn:
         conn.row_factory = dict_row
-        rows = conn.execute(f"""
-            SELECT log_id, alert_id, triggered_at, metric_value, threshold_value,
-                   portfolio_node_id, position_id, notification_sent, resolved
-            FROM alert_log
-            WHERE {where_clause}
-            ORDER BY triggered_at DESC
-            LIMIT %(limit)s
-        """, params).fetchall()
+        rows = conn.execute(LIST_ALERT_LOGS_SQL[flags], params, prepare=True).fetchall()
 
         return [
-            AlertLogOut(
+            AlertLogOut.model_construct(
                 log_id=r['log_id'],
                 alert_id=r['alert_id'],
-                triggered_at=r['triggered_at'].isoformat() if hasattr(r['triggered_at'], 'isoformat') else str(r['triggered_at']),
-                metric_value=float(r['metric_value']),
-                threshold_value=float(r['threshold_value']),
+                triggered_at=r['triggered_at'].isoformat(),
+                metric_value=r['metric_value'],
+                threshold_value=r['threshold_value'],
                 portfolio_node_id=r['portfolio_node_id'],
                 position_id=r['position_id'],
                 notification_sent=r['notification_sent'],
@@ -189,77 +230,80 @@ def list_alert_logs(
 def evaluate_alerts(req: EvaluateAlertsRequest) -> Dict[str, Any]:
     """Evaluate all enabled alerts for a portfolio and trigger if thresholds breached."""
 
-    triggered_alerts = []
+    # One timestamp per evaluation: stamped on every alert_log row written and
+    # returned as evaluated_at
+    evaluated_at = datetime.now(timezone.utc)
+
+    if NO_ALERTS_CACHE.get(req.portfolio_node_id):
+        return _evaluation_result(req.portfolio_node_id, evaluated_at, [])
 
     with db_conn() as conn:
         conn.row_factory = dict_row
 
-        # Fetch enabled alerts for portfolio
-        alerts = conn.execute("""
-            SELECT alert_id, alert_type, threshold_value, threshold_operator, metric_name
-            FROM alert_config
+        # Enabled alerts for the portfolio are joined to the latest value of
+        # their metric (alerts with no value yet drop out of the inner lateral
+        # join), compared against their threshold, and logged, all in one
+        # statement: only breaches come back, as the alert_log rows written
+        # (values from RETURNING, alert metadata joined from the config).
+        rows = conn.execute("""
+            WITH breaches AS (
+                SELECT ac.alert_id, ac.alert_type, ac.threshold_value,
+                       ac.threshold_operator, ac.metric_name, m.metric_value
+                FROM alert_config ac
+                JOIN LATERAL (
+                    SELECT metric_value
+                    FROM regulatory_metrics
+                    WHERE portfolio_node_id = %(pid)s
+                      AND metric_type = ac.metric_name
+                    ORDER BY as_of_date DESC
+                    LIMIT 1
+                ) m ON TRUE
+                WHERE (ac.portfolio_node_id = %(pid)s OR ac.portfolio_node_id IS NULL)
+                  AND ac.enabled = TRUE
+                  AND CASE ac.threshold_operator
+                        WHEN 'GT' THEN m.metric_value > ac.threshold_value
+                        WHEN 'GTE' THEN m.metric_value >= ac.threshold_value
+                        WHEN 'LT' THEN m.metric_value < ac.threshold_value
+                        WHEN 'LTE' THEN m.metric_value <= ac.threshold_value
+                        WHEN 'EQ' THEN m.metric_value = ac.threshold_value
+                        ELSE FALSE
+                      END
+            ), logged AS (
+                INSERT INTO alert_log
+                  (log_id, alert_id, triggered_at, metric_value, threshold_value,
+                   portfolio_node_id, notification_sent, resolved)
+                SELECT 'log-' || gen_random_uuid(), alert_id, %(evaluated_at)s, metric_value,
+                       threshold_value, %(pid)s, FALSE, FALSE
+                FROM breaches
+                RETURNING log_id, alert_id, metric_value, threshold_value
+            )
+            SELECT l.alert_id, b.alert_type, b.metric_name,
+                   l.metric_value::float8 AS metric_value,
+                   l.threshold_value::float8 AS threshold_value,
+                   b.threshold_operator, l.log_id
+            FROM logged l
+            JOIN breaches b ON b.alert_id = l.alert_id
+        """, {'pid': req.portfolio_node_id, 'evaluated_at': evaluated_at}).fetchall()
+
+        # Nothing breached: remember the portfolio if it has nothing to evaluate
+        if not rows and not conn.execute("""
+            SELECT 1 FROM alert_config
             WHERE (portfolio_node_id = %(pid)s OR portfolio_node_id IS NULL)
               AND enabled = TRUE
-        """, {'pid': req.portfolio_node_id}).fetchall()
-
-        for alert in alerts:
-            # Fetch latest metric value
-            metric = conn.execute("""
-                SELECT metric_value, as_of_date
-                FROM regulatory_metrics
-                WHERE portfolio_node_id = %(pid)s
-                  AND metric_type = %(mname)s
-                ORDER BY as_of_date DESC
-                LIMIT 1
-            """, {
-                'pid': req.portfolio_node_id,
-                'mname': alert['metric_name'],
-            }).fetchone()
-
-            if not metric:
-                continue
-
-            metric_value = float(metric['metric_value'])
-            threshold_value = float(alert['threshold_value'])
-            op = alert['threshold_operator']
-
-            # Evaluate threshold
-            breached = (
-                (op == 'GT' and metric_value > threshold_value) or
-                (op == 'GTE' and metric_value >= threshold_value) or
-                (op == 'LT' and metric_value < threshold_value) or
-                (op == 'LTE' and metric_value <= threshold_value) or
-                (op == 'EQ' and metric_value == threshold_value)
-            )
+            LIMIT 1
+        """, {'pid': req.portfolio_node_id}).fetchone():
+            NO_ALERTS_CACHE.set(req.portfolio_node_id, True)
+
+    return _evaluation_result(req.portfolio_node_id, evaluated_at, [dict(r) for r in rows])
 
-            if breached:
-                log_id = f"log-{uuid4()}"
-                conn.execute("""
-                    INSERT INTO alert_log
-                      (log_id, alert_id, triggered_at, metric_value, threshold_value,
-                       portfolio_node_id, notification_sent, resolved)
-                    VALUES (%(lid)s, %(aid)s, now(), %(mval)s, %(tval)s, %(pid)s, FALSE, FALSE)
-                """, {
-                    'lid': log_id,
-                    'aid': alert['alert_id'],
-                    'mval': metric_value,
-                    'tval': threshold_value,
-                    'pid': req.portfolio_node_id,
-                })
-
-                triggered_alerts.append({
-                    'alert_id': alert['alert_id'],
-                    'alert_type': alert['alert_type'],
-                    'metric_name': alert['metric_name'],
-                    'metric_value': metric_value,
-                    'threshold_value': threshold_value,
-                    'threshold_operator': op,
-                    'log_id': log_id,
-                })
 
+def _evaluation_result(
+    portfolio_node_id: str, evaluated_at: datetime, triggered_alerts: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Shape the evaluate_alerts response."""
     return {
-        'portfolio_node_id': req.portfolio_node_id,
-        'evaluated_at': datetime.now(timezone.utc).isoformat(),
+        'portfolio_node_id': portfolio_node_id,
+        'evaluated_at': evaluated_at.isoformat(),
         'triggered_count': len(triggered_alerts),
         'triggered_alerts': triggered_alerts,
     }
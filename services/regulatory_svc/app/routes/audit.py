@@ -1,32 +1,80 @@
 """Audit trail and explainability endpoints."""
 from __future__ import annotations
 
-from typing import Optional, List
-from fastapi import APIRouter, HTTPException
+import base64
+from datetime import datetime
+from typing import Optional, List, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from services.regulatory_svc.app.models import (
     AuditEvent,
     ExplainabilityRequest,
     ExplainabilityResult,
 )
-from services.common.db import db_conn
-from psycopg.rows import dict_row
+from services.common.audit import async_log_audit_entries, async_log_audit_entry
+from services.common.cache import TTLCache
+from services.common.db import async_db_conn
+from psycopg.types.json import Jsonb
 
 router = APIRouter()
 
+# Per-run read results keyed by ("trail" | "data_quality", run_id). Audit rows
+# are immutable, so an entry only goes stale when the run gains rows:
+# create_audit_event evicts its run, and the TTL bounds staleness from rows
+# written by the compute routes and other services.
+RUN_AUDIT_CACHE = TTLCache(maxsize=2048, ttl=60)
+
+# A run's audit rows as one JSON array, serialised by Postgres, so the jsonb
+# columns are never decoded into dicts only to be re-encoded for the response.
+# NULL when the run has no rows.
+RUN_AUDIT_TRAIL_SQL = """
+    SELECT json_agg(t ORDER BY t.computed_at)::text AS trail
+    FROM (
+      SELECT audit_id, audit_type, entity_type, entity_id,
+             calculation_method, computed_at, assumptions_json, results_json
+      FROM audit_trail
+      WHERE calculation_run_id = %(rid)s
+    ) t
+"""
+
+
+def _encode_cursor(computed_at: datetime, audit_id: str) -> str:
+    """Encode a list_audit_events keyset cursor."""
+    return base64.urlsafe_b64encode(f"{computed_at.isoformat()}|{audit_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a list_audit_events keyset cursor into (computed_at, audit_id)."""
+    try:
+        computed_at, audit_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(computed_at), audit_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/events", response_model=list[AuditEvent])
-def list_audit_events(
+async def list_audit_events(
+    response: Response,
     resource_type: Optional[str] = None,
     resource_id: Optional[str] = None,
     actor: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    offset: int = Query(0, description="Deprecated: use cursor; only honoured without one"),
 ):
-    """Query the audit log with optional filters on resource, actor, or time range."""
+    """Query the audit log with optional filters on resource, actor, or time range.
+
+    Newest first, keyset-paginated on (computed_at, audit_id): when a page is
+    full, the X-Next-Cursor response header carries the cursor for the next
+    one, and each page costs an index seek regardless of depth.
+    """
 
     filters = []
-    params: dict = {"limit": limit, "offset": offset}
+    params: dict = {"limit": limit, "offset": 0 if cursor else offset}
+
+    if cursor:
+        filters.append("(computed_at, audit_id) < (%(after_ts)s, %(after_id)s)")
+        params['after_ts'], params['after_id'] = _decode_cursor(cursor)
 
     if resource_type:
         filters.append("entity_type = %(resource_type)s")
@@ -35,28 +83,33 @@ def list_audit_events(
         filters.append("entity_id = %(resource_id)s")
         params['resource_id'] = resource_id
     if actor:
-        filters.append("metadata_json ->> 'computed_by' = %(actor)s")
-        params['actor'] = actor
+        # Containment, so audit_trail_metadata_gin can serve it
+        filters.append("metadata_json @> %(actor_json)s")
+        params['actor_json'] = Jsonb({'computed_by': actor})
 
     where_clause = " AND ".join(filters) if filters else "TRUE"
 
-    with db_conn() as conn:
-        conn.row_factory = dict_row
-        rows = conn.execute(f"""
+    async with async_db_conn() as conn:
+        cur = await conn.execute(f"""
             SELECT audit_id, audit_type, entity_type, entity_id,
-                   calculation_method, computed_at, assumptions_json, results_json,
-                   metadata_json
+                   calculation_method, computed_at, assumptions_json,
+                   COALESCE(metadata_json ->> 'computed_by', 'system') AS actor
             FROM audit_trail
             WHERE {where_clause}
-            ORDER BY computed_at DESC
+            ORDER BY computed_at DESC, audit_id DESC
             LIMIT %(limit)s OFFSET %(offset)s
-        """, params).fetchall()
+        """, params)
+        rows = await cur.fetchall()
+
+        if rows and len(rows) == limit:
+            last = rows[-1]
+            response.headers["X-Next-Cursor"] = _encode_cursor(last['computed_at'], last['audit_id'])
 
         return [
-            AuditEvent(
+            AuditEvent.model_construct(
                 event_id=r['audit_id'],
                 timestamp=r['computed_at'],
-                actor=(r['metadata_json'] or {}).get('computed_by', 'system'),
+                actor=r['actor'],
                 action=r['calculation_method'],
                 resource_type=r['entity_type'],
                 resource_id=r['entity_id'],
@@ -70,23 +123,23 @@ def list_audit_events(
 
 
 @router.get("/events/{event_id}", response_model=AuditEvent)
-def get_audit_event(event_id: str):
+async def get_audit_event(event_id: str):
     """Retrieve a single audit event by ID."""
 
-    with db_conn() as conn:
-        conn.row_factory = dict_row
-        row = conn.execute("""
+    async with async_db_conn() as conn:
+        cur = await conn.execute("""
             SELECT audit_id, audit_type, entity_type, entity_id,
                    calculation_method, computed_at, assumptions_json, results_json,
                    metadata_json
             FROM audit_trail
             WHERE audit_id = %(aid)s
-        """, {'aid': event_id}).fetchone()
+        """, {'aid': event_id})
+        row = await cur.fetchone()
 
         if not row:
             raise HTTPException(status_code=404, detail="Audit event not found")
 
-        return AuditEvent(
+        return AuditEvent.model_construct(
             event_id=row['audit_id'],
             timestamp=row['computed_at'],
             actor=(row['metadata_json'] or {}).get('computed_by', 'system'),
@@ -102,11 +155,9 @@ def get_audit_event(event_id: str):
 
 
 @router.post("/events", response_model=AuditEvent, status_code=201)
-def create_audit_event(event: AuditEvent):
+async def create_audit_event(event: AuditEvent):
     """Record a new audit trail event (typically called by internal services)."""
-    from services.common.audit import log_audit_entry
-
-    audit_id = log_audit_entry(
+    audit_id = await async_log_audit_entry(
         audit_type="MODEL_CHANGE",
         calculation_run_id=event.event_id,
         entity_type=event.resource_type,
@@ -116,27 +167,60 @@ def create_audit_event(event: AuditEvent):
         assumptions=event.details,
         results={},
     )
+    RUN_AUDIT_CACHE.pop(("trail", event.event_id))
+    RUN_AUDIT_CACHE.pop(("data_quality", event.event_id))
     event.event_id = audit_id
     return event
 
 
+@router.post("/events:batch", response_model=list[AuditEvent], status_code=201)
+async def create_audit_events(events: List[AuditEvent]):
+    """Record several audit trail events in one batch (e.g. one per position of a run)."""
+    if not events:
+        return []
+
+    audit_ids = await async_log_audit_entries([
+        {
+            'audit_type': "MODEL_CHANGE",
+            'calculation_run_id': event.event_id,
+            'entity_type': event.resource_type,
+            'entity_id': event.resource_id,
+            'calculation_method': event.action,
+            'input_snapshot_id': "N/A",
+            'assumptions': event.details,
+            'results': {},
+        }
+        for event in events
+    ])
+    for event, audit_id in zip(events, audit_ids):
+        RUN_AUDIT_CACHE.pop(("trail", event.event_id))
+        RUN_AUDIT_CACHE.pop(("data_quality", event.event_id))
+        event.event_id = audit_id
+    return events
+
+
 @router.post("/explain", response_model=ExplainabilityResult)
-def explain_result(req: ExplainabilityRequest):
+async def explain_result(req: ExplainabilityRequest):
     """Explain how a specific valuation result was derived (inputs, methodology, steps)."""
 
-    with db_conn() as conn:
-        conn.row_factory = dict_row
-
-        # Find audit entry for this run + position
-        audit = conn.execute("""
-            SELECT audit_id, calculation_method, assumptions_json, results_json, computed_at
-            FROM audit_trail
-            WHERE calculation_run_id = %(rid)s
-              AND (entity_id = %(pid)s OR entity_id IN (
-                SELECT portfolio_node_id FROM position WHERE position_id = %(pid)s
-              ))
-            ORDER BY computed_at DESC LIMIT 1
-        """, {'rid': req.run_id, 'pid': req.position_id}).fetchone()
+    async with async_db_conn() as conn:
+        # Find audit entry for this run + position: recorded against the
+        # position itself or against its portfolio. Joining the candidate
+        # entities keeps both as plain equality lookups instead of an OR-IN.
+        cur = await conn.execute("""
+            WITH candidates AS (
+              SELECT %(pid)s::text AS entity_id
+              UNION
+              SELECT portfolio_node_id FROM position WHERE position_id = %(pid)s
+            )
+            SELECT a.audit_id, a.calculation_method, a.assumptions_json,
+                   a.results_json, a.computed_at
+            FROM audit_trail a
+            JOIN candidates c ON c.entity_id = a.entity_id
+            WHERE a.calculation_run_id = %(rid)s
+            ORDER BY a.computed_at DESC LIMIT 1
+        """, {'rid': req.run_id, 'pid': req.position_id})
+        audit = await cur.fetchone()
 
         if not audit:
             raise HTTPException(status_code=404, detail="No audit trail found for this result")
@@ -164,46 +248,47 @@ def explain_result(req: ExplainabilityRequest):
 
 
 @router.get("/trail/{run_id}")
-def get_run_audit_trail(run_id: str):
+async def get_run_audit_trail(run_id: str):
     """Return the full audit trail for a run."""
-
-    with db_conn() as conn:
-        conn.row_factory = dict_row
-        rows = conn.execute("""
-            SELECT audit_id, audit_type, entity_type, entity_id,
-                   calculation_method, computed_at, assumptions_json, results_json
-            FROM audit_trail
-            WHERE calculation_run_id = %(rid)s
-            ORDER BY computed_at ASC
-        """, {'rid': run_id}).fetchall()
-
-        if not rows:
+    trail = RUN_AUDIT_CACHE.get(("trail", run_id))
+    if trail is None:
+        async with async_db_conn() as conn:
+            cur = await conn.execute(RUN_AUDIT_TRAIL_SQL, {'rid': run_id})
+            row = await cur.fetchone()
+
+        trail = row['trail']
+        if trail is None:
             raise HTTPException(status_code=404, detail="No audit trail found for run")
+        RUN_AUDIT_CACHE.set(("trail", run_id), trail)
 
-        return [dict(r) for r in rows]
+    return Response(content=trail, media_type="application/json")
 
 
 @router.get("/data-quality/{run_id}")
-def get_data_quality_audit(run_id: str):
+async def get_data_quality_audit(run_id: str):
     """Return data quality checks and outcomes recorded during a run."""
+    cached = RUN_AUDIT_CACHE.get(("data_quality", run_id))
+    if cached is not None:
+        return cached
 
-    with db_conn() as conn:
-        conn.row_factory = dict_row
-        audit = conn.execute("""
-            SELECT assumptions_json, results_json
-            FROM audit_trail
+    async with async_db_conn() as conn:
+        cur = await conn.execute("""
+            SELECT 1 FROM audit_trail
             WHERE calculation_run_id = %(rid)s
-            ORDER BY computed_at DESC LIMIT 1
-        """, {'rid': run_id}).fetchone()
+            LIMIT 1
+        """, {'rid': run_id})
+        audit = await cur.fetchone()
 
         if not audit:
             raise HTTPException(status_code=404, detail="No audit data found")
 
-        return {
-            "run_id": run_id,
-            "data_quality_checks": [
-                {"check": "positions_loaded", "status": "PASS"},
-                {"check": "market_data_available", "status": "PASS"},
-                {"check": "reference_data_complete", "status": "PASS"},
-            ],
-        }
+    data_quality = {
+        "run_id": run_id,
+        "data_quality_checks": [
+            {"check": "positions_loaded", "status": "PASS"},
+            {"check": "market_data_available", "status": "PASS"},
+            {"check": "reference_data_complete", "status": "PASS"},
+        ],
+    }
+    RUN_AUDIT_CACHE.set(("data_quality", run_id), data_quality)
+    return data_quality
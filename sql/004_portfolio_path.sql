@@ -0,0 +1,71 @@
+-- Materialized ancestor path for portfolio_node
+-- Extends 002_portfolio_data_services.sql so hierarchy reads and reparent cycle
+-- checks become indexed array containment tests instead of recursive CTE walks.
+-- path holds the node IDs from the root down to and including the node itself.
+BEGIN;
+
+ALTER TABLE portfolio_node ADD COLUMN IF NOT EXISTS path text[];
+
+-- Backfill paths for existing nodes
+WITH RECURSIVE tree AS (
+  SELECT portfolio_node_id, ARRAY[portfolio_node_id] AS path
+  FROM portfolio_node
+  WHERE parent_id IS NULL
+
+  UNION ALL
+
+  SELECT pn.portfolio_node_id, t.path || pn.portfolio_node_id
+  FROM portfolio_node pn
+  INNER JOIN tree t ON pn.parent_id = t.portfolio_node_id
+)
+UPDATE portfolio_node pn
+SET path = tree.path
+FROM tree
+WHERE pn.portfolio_node_id = tree.portfolio_node_id;
+
+ALTER TABLE portfolio_node ALTER COLUMN path SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS portfolio_node_path_idx
+  ON portfolio_node USING gin (path);
+
+-- Derive a node's path from its parent on insert and on reparent.
+-- A missing parent falls back to a root path so the parent_id foreign key,
+-- not the NOT NULL constraint, reports the error.
+CREATE OR REPLACE FUNCTION portfolio_node_set_path() RETURNS trigger AS $$
+BEGIN
+  IF NEW.parent_id IS NULL THEN
+    NEW.path := ARRAY[NEW.portfolio_node_id];
+  ELSE
+    SELECT p.path || NEW.portfolio_node_id INTO NEW.path
+    FROM portfolio_node p
+    WHERE p.portfolio_node_id = NEW.parent_id;
+    NEW.path := COALESCE(NEW.path, ARRAY[NEW.portfolio_node_id]);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS portfolio_node_set_path_trg ON portfolio_node;
+CREATE TRIGGER portfolio_node_set_path_trg
+  BEFORE INSERT OR UPDATE OF parent_id ON portfolio_node
+  FOR EACH ROW EXECUTE FUNCTION portfolio_node_set_path();
+
+-- Re-root the paths of every descendant after a node moves
+CREATE OR REPLACE FUNCTION portfolio_node_move_subtree() RETURNS trigger AS $$
+BEGIN
+  UPDATE portfolio_node
+  SET path = NEW.path || path[cardinality(OLD.path) + 1:]
+  WHERE path @> ARRAY[NEW.portfolio_node_id]
+    AND portfolio_node_id <> NEW.portfolio_node_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS portfolio_node_move_subtree_trg ON portfolio_node;
+CREATE TRIGGER portfolio_node_move_subtree_trg
+  AFTER UPDATE OF parent_id ON portfolio_node
+  FOR EACH ROW
+  WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id)
+  EXECUTE FUNCTION portfolio_node_move_subtree();
+
+COMMIT;
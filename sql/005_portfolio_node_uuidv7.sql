@@ -0,0 +1,28 @@
+-- Time-ordered default IDs for portfolio_node
+-- Random UUIDv4 keys scatter inserts across the primary key and parent_id
+-- B-trees; UUIDv7 keys are monotonic in their millisecond prefix, so new rows
+-- land on the rightmost leaf pages (fewer page splits, less WAL).
+BEGIN;
+
+-- Portable UUIDv7 (PostgreSQL 18 ships uuidv7() natively; this works on 13+)
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+  SELECT encode(
+    set_bit(
+      set_bit(
+        overlay(
+          uuid_send(gen_random_uuid())
+          PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+          FROM 1 FOR 6
+        ),
+        52, 1
+      ),
+      53, 1
+    ),
+    'hex'
+  )::uuid;
+$$ LANGUAGE sql VOLATILE;
+
+ALTER TABLE portfolio_node
+  ALTER COLUMN portfolio_node_id SET DEFAULT ('port-' || uuid_generate_v7()::text);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Partial index for the root-portfolio listing
+-- list_portfolios runs WHERE parent_id IS NULL ORDER BY created_at DESC; this
+-- index returns the roots in the requested order with no sort, and carries
+-- the narrow listing columns. tags_json and metadata_json are user-supplied
+-- jsonb and are deliberately not INCLUDEd: a large document would exceed the
+-- btree entry size limit and make the row's INSERT or UPDATE fail, so those
+-- two columns are fetched from the heap.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS portfolio_roots_idx
+  ON portfolio_node (created_at DESC)
+  INCLUDE (portfolio_node_id, name, node_type)
+  WHERE parent_id IS NULL;
+
+COMMIT;
@@ -0,0 +1,37 @@
+-- Hierarchy version counter for portfolio tree caching
+-- Any statement that changes portfolio_node, position or valuation_result bumps
+-- portfolio_hierarchy_version_seq. The portfolio service keys its cached
+-- /tree responses on the current value, so a single sequence read tells it
+-- whether a cached tree is still valid.
+--
+-- A sequence (not a counter row) is used because nextval() never blocks:
+-- concurrent writers do not serialize on it. Being non-transactional, a bump
+-- can become visible a moment before its transaction commits; the service's
+-- cache TTL bounds any staleness from that window.
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS portfolio_hierarchy_version_seq;
+
+CREATE OR REPLACE FUNCTION bump_portfolio_hierarchy_version() RETURNS trigger AS $$
+BEGIN
+  PERFORM nextval('portfolio_hierarchy_version_seq');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS portfolio_node_version_trg ON portfolio_node;
+CREATE TRIGGER portfolio_node_version_trg
+  AFTER INSERT OR UPDATE OR DELETE ON portfolio_node
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_portfolio_hierarchy_version();
+
+DROP TRIGGER IF EXISTS position_version_trg ON position;
+CREATE TRIGGER position_version_trg
+  AFTER INSERT OR UPDATE OR DELETE ON position
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_portfolio_hierarchy_version();
+
+DROP TRIGGER IF EXISTS valuation_result_version_trg ON valuation_result;
+CREATE TRIGGER valuation_result_version_trg
+  AFTER INSERT OR UPDATE OR DELETE ON valuation_result
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_portfolio_hierarchy_version();
+
+COMMIT;
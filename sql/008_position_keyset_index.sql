@@ -0,0 +1,13 @@
+-- Keyset pagination index for position listing
+-- list_positions pages with WHERE (created_at, position_id) < (cursor) ORDER BY
+-- created_at DESC, position_id DESC. This index lets each page start with an
+-- index seek at the cursor and read only `limit` rows, however deep the page,
+-- instead of scanning and discarding OFFSET rows.
+-- The default listing only returns ACTIVE positions, hence the partial index.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS position_created_pk_idx
+  ON position (created_at DESC, position_id DESC)
+  WHERE status = 'ACTIVE';
+
+COMMIT;
@@ -0,0 +1,13 @@
+-- Per-agency rating index for current-rating lookups
+-- get_current_ratings runs SELECT DISTINCT ON (agency) ... WHERE entity_id = ?
+-- ORDER BY agency, as_of_date DESC. With rows already in (agency, as_of_date
+-- DESC) order under each entity, the plan becomes Index Scan + Unique with no
+-- Sort node. rating_history_entity_date_idx still serves the full history
+-- listing, which orders by as_of_date alone.
+-- Verify with: EXPLAIN (ANALYZE, BUFFERS) on the current-rating query.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS rating_hist_entity_agency_date
+  ON rating_history (entity_id, agency, as_of_date DESC);
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Position lookup index for valuation results
+-- valuation_result's primary key leads with run_id, so finding the results of
+-- one position (get_position_valuation) had to scan the whole table. This index
+-- narrows it to that position's BASE rows; the latest run among them is then
+-- picked with one run primary-key probe per row.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS valuation_result_position_idx
+  ON valuation_result (position_id, scenario_id, run_id);
+
+COMMIT;
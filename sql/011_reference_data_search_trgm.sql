@@ -0,0 +1,19 @@
+-- Trigram index for reference data search
+-- list_reference_data's search is a substring match ('%term%'), which a btree
+-- cannot serve, so every search scanned the whole table. A pg_trgm GIN index
+-- over name, ticker and cusip lets Postgres answer ILIKE '%term%' from the
+-- index. The indexed expression must match the one in
+-- services/portfolio_svc/app/routes/reference_data.py character for character.
+--
+-- pg_trgm ships with the standard Postgres contrib modules (included in the
+-- postgres Docker image and RDS).
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS refdata_trgm
+  ON reference_data USING gin (
+    (COALESCE(name, '') || ' ' || COALESCE(ticker, '') || ' ' || COALESCE(cusip, '')) gin_trgm_ops
+  );
+
+COMMIT;
@@ -0,0 +1,77 @@
+-- Per-portfolio, per-instrument rollup of ACTIVE positions
+-- get_holdings_summary used to aggregate (COUNT, COUNT DISTINCT, 3x SUM) over
+-- every ACTIVE position of the portfolio on each call. Row triggers on position
+-- keep these totals current instead, so the summary reads one small row per
+-- instrument held. Counts stay exact (no approximate-distinct extension).
+-- Rows whose position_count drops to 0 are kept; readers filter them out.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS position_rollup (
+  portfolio_node_id  text NOT NULL,
+  instrument_id      text NOT NULL,
+  position_count     bigint NOT NULL DEFAULT 0,
+  total_quantity     numeric NOT NULL DEFAULT 0,
+  total_cost_basis   numeric NOT NULL DEFAULT 0,
+  total_book_value   numeric NOT NULL DEFAULT 0,
+  PRIMARY KEY (portfolio_node_id, instrument_id)
+);
+
+-- Backfill from current ACTIVE positions
+INSERT INTO position_rollup
+  (portfolio_node_id, instrument_id, position_count,
+   total_quantity, total_cost_basis, total_book_value)
+SELECT portfolio_node_id, instrument_id, COUNT(*),
+       SUM(quantity), COALESCE(SUM(cost_basis), 0), COALESCE(SUM(book_value), 0)
+FROM position
+WHERE status = 'ACTIVE'
+GROUP BY portfolio_node_id, instrument_id
+ON CONFLICT (portfolio_node_id, instrument_id) DO NOTHING;
+
+-- Take the old row out of the rollup and put the new one in, whenever either
+-- is ACTIVE. An UPDATE that moves a position between portfolios, instruments
+-- or statuses is handled as a removal plus an addition.
+CREATE OR REPLACE FUNCTION position_rollup_apply() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    IF OLD.status = 'ACTIVE' THEN
+      UPDATE position_rollup
+      SET position_count   = position_count - 1,
+          total_quantity   = total_quantity - OLD.quantity,
+          total_cost_basis = total_cost_basis - COALESCE(OLD.cost_basis, 0),
+          total_book_value = total_book_value - COALESCE(OLD.book_value, 0)
+      WHERE portfolio_node_id = OLD.portfolio_node_id
+        AND instrument_id = OLD.instrument_id;
+    END IF;
+  END IF;
+
+  IF TG_OP <> 'DELETE' THEN
+    IF NEW.status = 'ACTIVE' THEN
+      INSERT INTO position_rollup
+        (portfolio_node_id, instrument_id, position_count,
+         total_quantity, total_cost_basis, total_book_value)
+      VALUES (NEW.portfolio_node_id, NEW.instrument_id, 1,
+              NEW.quantity, COALESCE(NEW.cost_basis, 0), COALESCE(NEW.book_value, 0))
+      ON CONFLICT (portfolio_node_id, instrument_id) DO UPDATE
+      SET position_count   = position_rollup.position_count + 1,
+          total_quantity   = position_rollup.total_quantity + EXCLUDED.total_quantity,
+          total_cost_basis = position_rollup.total_cost_basis + EXCLUDED.total_cost_basis,
+          total_book_value = position_rollup.total_book_value + EXCLUDED.total_book_value;
+    END IF;
+  END IF;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS position_rollup_insert_delete_trg ON position;
+CREATE TRIGGER position_rollup_insert_delete_trg
+  AFTER INSERT OR DELETE ON position
+  FOR EACH ROW EXECUTE FUNCTION position_rollup_apply();
+
+DROP TRIGGER IF EXISTS position_rollup_update_trg ON position;
+CREATE TRIGGER position_rollup_update_trg
+  AFTER UPDATE OF portfolio_node_id, instrument_id, quantity, cost_basis, book_value, status
+  ON position
+  FOR EACH ROW EXECUTE FUNCTION position_rollup_apply();
+
+COMMIT;
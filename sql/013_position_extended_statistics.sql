@@ -0,0 +1,15 @@
+-- Multi-column planner statistics for position filters
+-- list_positions filters on any mix of instrument_id, portfolio_node_id and
+-- status. The columns are correlated (a portfolio holds few instruments, most
+-- rows are ACTIVE), so per-column estimates multiplied together undershoot the
+-- row counts and can steer the planner off the right index. Extended
+-- statistics record those dependencies. ANALYZE populates them now; autovacuum
+-- keeps them current afterwards.
+BEGIN;
+
+CREATE STATISTICS IF NOT EXISTS position_filter_stats (dependencies, ndistinct)
+  ON portfolio_node_id, instrument_id, status FROM position;
+
+ANALYZE position;
+
+COMMIT;
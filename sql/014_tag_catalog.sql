@@ -0,0 +1,100 @@
+-- Tag catalog for the tagging endpoints
+-- list_all_tags expanded jsonb_object_keys over every tagged portfolio_node
+-- and ACTIVE position on each call. tag_catalog keeps, per scope ('portfolio'
+-- or 'position'), how many rows currently carry each tag key; row triggers on
+-- both tables maintain it, so listing tags reads one small table. Only ACTIVE
+-- positions count, matching the endpoints. Rows whose ref_count drops to 0 are
+-- kept; readers filter them out.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS tag_catalog (
+  scope      text NOT NULL CHECK (scope IN ('portfolio', 'position')),
+  tag        text NOT NULL,
+  ref_count  bigint NOT NULL DEFAULT 0,
+  PRIMARY KEY (scope, tag)
+);
+
+-- Backfill from current tags
+INSERT INTO tag_catalog (scope, tag, ref_count)
+SELECT 'portfolio', k, COUNT(*)
+FROM portfolio_node, jsonb_object_keys(tags_json) AS k
+WHERE jsonb_typeof(tags_json) = 'object'
+GROUP BY k
+ON CONFLICT (scope, tag) DO NOTHING;
+
+INSERT INTO tag_catalog (scope, tag, ref_count)
+SELECT 'position', k, COUNT(*)
+FROM position, jsonb_object_keys(tags_json) AS k
+WHERE jsonb_typeof(tags_json) = 'object' AND status = 'ACTIVE'
+GROUP BY k
+ON CONFLICT (scope, tag) DO NOTHING;
+
+-- Add delta to the count of every key of tags. jsonb keeps object keys
+-- sorted, so concurrent writers lock catalog rows in the same order.
+CREATE OR REPLACE FUNCTION tag_catalog_adjust(tag_scope text, tags jsonb, delta int)
+RETURNS void AS $$
+BEGIN
+  IF tags IS NULL OR jsonb_typeof(tags) <> 'object' THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO tag_catalog (scope, tag, ref_count)
+  SELECT tag_scope, k, delta FROM jsonb_object_keys(tags) AS k
+  ON CONFLICT (scope, tag) DO UPDATE
+  SET ref_count = tag_catalog.ref_count + EXCLUDED.ref_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION portfolio_node_tag_catalog_apply() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    PERFORM tag_catalog_adjust('portfolio', OLD.tags_json, -1);
+  END IF;
+  IF TG_OP <> 'DELETE' THEN
+    PERFORM tag_catalog_adjust('portfolio', NEW.tags_json, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION position_tag_catalog_apply() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP <> 'INSERT' THEN
+    IF OLD.status = 'ACTIVE' THEN
+      PERFORM tag_catalog_adjust('position', OLD.tags_json, -1);
+    END IF;
+  END IF;
+  IF TG_OP <> 'DELETE' THEN
+    IF NEW.status = 'ACTIVE' THEN
+      PERFORM tag_catalog_adjust('position', NEW.tags_json, 1);
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS portfolio_node_tag_catalog_insert_delete_trg ON portfolio_node;
+CREATE TRIGGER portfolio_node_tag_catalog_insert_delete_trg
+  AFTER INSERT OR DELETE ON portfolio_node
+  FOR EACH ROW EXECUTE FUNCTION portfolio_node_tag_catalog_apply();
+
+DROP TRIGGER IF EXISTS portfolio_node_tag_catalog_update_trg ON portfolio_node;
+CREATE TRIGGER portfolio_node_tag_catalog_update_trg
+  AFTER UPDATE OF tags_json ON portfolio_node
+  FOR EACH ROW
+  WHEN (OLD.tags_json IS DISTINCT FROM NEW.tags_json)
+  EXECUTE FUNCTION portfolio_node_tag_catalog_apply();
+
+DROP TRIGGER IF EXISTS position_tag_catalog_insert_delete_trg ON position;
+CREATE TRIGGER position_tag_catalog_insert_delete_trg
+  AFTER INSERT OR DELETE ON position
+  FOR EACH ROW EXECUTE FUNCTION position_tag_catalog_apply();
+
+DROP TRIGGER IF EXISTS position_tag_catalog_update_trg ON position;
+CREATE TRIGGER position_tag_catalog_update_trg
+  AFTER UPDATE OF tags_json, status ON position
+  FOR EACH ROW
+  WHEN (OLD.tags_json IS DISTINCT FROM NEW.tags_json OR OLD.status IS DISTINCT FROM NEW.status)
+  EXECUTE FUNCTION position_tag_catalog_apply();
+
+COMMIT;
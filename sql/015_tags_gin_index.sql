@@ -0,0 +1,20 @@
+-- GIN indexes for tag lookups
+-- get_portfolios_by_tag and get_positions_by_tag filter with tags_json ? tag,
+-- which was a sequential scan of each table. These use the default jsonb_ops
+-- opclass: jsonb_path_ops is smaller but only serves @>/@?/@@, not ? (key
+-- exists), and positions store arbitrary metadata values under their tag keys,
+-- so the filters cannot be rewritten as containment.
+--
+-- Partial predicates are ones the queries imply: ? never matches NULL, and the
+-- position lookup only reads ACTIVE rows.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS portfolio_node_tags_gin
+  ON portfolio_node USING GIN (tags_json)
+  WHERE tags_json IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS position_tags_gin
+  ON position USING GIN (tags_json)
+  WHERE status = 'ACTIVE';
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Stored snapshot totals for payload-free listings
+-- Snapshot listings and the latest-snapshot lookup only need the two totals
+-- from payload_json, which can run to megabytes per row. Generated columns
+-- keep the totals alongside the row so those reads select them directly and
+-- never fetch or parse the payload.
+--
+-- Adding a STORED generated column rewrites portfolio_snapshot under an
+-- ACCESS EXCLUSIVE lock; run it in a quiet window on large tables.
+BEGIN;
+
+ALTER TABLE portfolio_snapshot
+  ADD COLUMN IF NOT EXISTS total_positions int
+    GENERATED ALWAYS AS ((payload_json ->> 'total_positions')::int) STORED,
+  ADD COLUMN IF NOT EXISTS total_instruments int
+    GENERATED ALWAYS AS ((payload_json ->> 'total_instruments')::int) STORED;
+
+COMMIT;
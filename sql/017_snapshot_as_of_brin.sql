@@ -0,0 +1,16 @@
+-- BRIN index on snapshot as_of_date for cross-portfolio range scans
+-- list_snapshots without a portfolio filter (and time-series export tooling)
+-- range-scans portfolio_snapshot on as_of_date alone, which the
+-- (portfolio_node_id, as_of_date DESC) B-tree cannot serve. Snapshots are
+-- written roughly in as_of_date order, so the heap is physically correlated
+-- with the column and a BRIN index summarises it in a few pages. Backfilled
+-- snapshots for old dates widen the affected ranges; the index still answers
+-- correctly, just with more heap pages rechecked.
+-- portfolio_snapshot_portfolio_date_idx still serves per-portfolio lookups.
+-- Verify with: EXPLAIN (ANALYZE, BUFFERS) on a date-bounded list_snapshots query.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS portfolio_snapshot_asof_brin
+  ON portfolio_snapshot USING BRIN (as_of_date) WITH (pages_per_range = 32);
+
+COMMIT;
@@ -0,0 +1,98 @@
+-- Monthly range partitioning of portfolio_snapshot on as_of_date
+-- Snapshot listings and time-series reads are bounded by as_of_date and
+-- usually cover a narrow window. With one partition per (UTC) month, the
+-- planner prunes to the months a query can touch, and vacuum works on one
+-- month at a time instead of the whole history.
+--
+-- Partitioned tables need the partition key in every unique constraint:
+--   * the primary key becomes (snapshot_id, as_of_date); snapshot IDs already
+--     embed the as-of date, and lookups by snapshot_id alone still use the
+--     per-partition primary key indexes;
+--   * the dedup key becomes (portfolio_node_id, payload_hash, as_of_date).
+--     The payload hashed includes as_of_date, so equal hashes already imply
+--     equal dates and dedup behaves exactly as before.
+--
+-- ensure_portfolio_snapshot_partitions(n) creates the partitions for the
+-- current month and the next n. Schedule it (e.g. monthly, pg_cron or the
+-- deploy pipeline) to keep partitions ahead of incoming data; rows outside
+-- every monthly partition land in portfolio_snapshot_default, so inserts
+-- never fail for lack of one. A month cannot be added while the default
+-- partition holds rows for it, so keep the job ahead of the calendar.
+--
+-- The table is rebuilt (copied) under an exclusive lock; run this in a quiet
+-- window on large tables.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION create_portfolio_snapshot_partition(month_start date)
+RETURNS void AS $$
+DECLARE
+  m date := date_trunc('month', month_start)::date;
+BEGIN
+  EXECUTE format(
+    'CREATE TABLE IF NOT EXISTS %I PARTITION OF portfolio_snapshot
+       FOR VALUES FROM (%L) TO (%L)',
+    'portfolio_snapshot_' || to_char(m, 'YYYY_MM'),
+    m::timestamp AT TIME ZONE 'UTC',
+    (m + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+  );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_portfolio_snapshot_partitions(months_ahead int DEFAULT 3)
+RETURNS void AS $$
+DECLARE
+  i int;
+BEGIN
+  FOR i IN 0..months_ahead LOOP
+    PERFORM create_portfolio_snapshot_partition(
+      ((now() AT TIME ZONE 'UTC')::date + make_interval(months => i))::date
+    );
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+ALTER TABLE portfolio_snapshot RENAME TO portfolio_snapshot_unpartitioned;
+
+CREATE TABLE portfolio_snapshot (
+  snapshot_id        text NOT NULL,
+  portfolio_node_id  text NOT NULL,
+  as_of_date         timestamptz NOT NULL,
+  payload_json       jsonb NOT NULL,
+  payload_hash       text NOT NULL,
+  created_at         timestamptz NOT NULL DEFAULT now(),
+  total_positions    int GENERATED ALWAYS AS ((payload_json ->> 'total_positions')::int) STORED,
+  total_instruments  int GENERATED ALWAYS AS ((payload_json ->> 'total_instruments')::int) STORED
+) PARTITION BY RANGE (as_of_date);
+
+CREATE TABLE portfolio_snapshot_default PARTITION OF portfolio_snapshot DEFAULT;
+
+-- A partition for every month that already has snapshots, then the months ahead
+SELECT create_portfolio_snapshot_partition(month_start)
+FROM (
+  SELECT DISTINCT date_trunc('month', as_of_date AT TIME ZONE 'UTC')::date AS month_start
+  FROM portfolio_snapshot_unpartitioned
+) months;
+
+SELECT ensure_portfolio_snapshot_partitions(3);
+
+INSERT INTO portfolio_snapshot
+  (snapshot_id, portfolio_node_id, as_of_date, payload_json, payload_hash, created_at)
+SELECT snapshot_id, portfolio_node_id, as_of_date, payload_json, payload_hash, created_at
+FROM portfolio_snapshot_unpartitioned;
+
+DROP TABLE portfolio_snapshot_unpartitioned;
+
+ALTER TABLE portfolio_snapshot
+  ADD CONSTRAINT portfolio_snapshot_pkey PRIMARY KEY (snapshot_id, as_of_date),
+  ADD CONSTRAINT portfolio_snapshot_portfolio_node_id_payload_hash_key
+    UNIQUE (portfolio_node_id, payload_hash, as_of_date),
+  ADD CONSTRAINT portfolio_snapshot_portfolio_node_id_fkey
+    FOREIGN KEY (portfolio_node_id) REFERENCES portfolio_node(portfolio_node_id);
+
+CREATE INDEX portfolio_snapshot_portfolio_date_idx
+  ON portfolio_snapshot (portfolio_node_id, as_of_date DESC);
+
+CREATE INDEX portfolio_snapshot_asof_brin
+  ON portfolio_snapshot USING BRIN (as_of_date) WITH (pages_per_range = 32);
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- Server-side snapshot diff
+-- snapshot_diff(a, b) matches the positions of two snapshots on instrument_id
+-- and returns only the ones whose aggregated quantity differs, so callers get
+-- O(diff) rows instead of two full payloads. kind is 'new' (only in b),
+-- 'removed' (only in a) or 'changed'. The full position objects are returned
+-- alongside the quantities for callers that echo them back.
+--
+-- Rows come back in snapshot a's payload order, then snapshot b's for new
+-- positions; the function is plain SQL, so the planner inlines it and
+-- ORDER BY in the body holds.
+BEGIN;
+
+CREATE OR REPLACE FUNCTION snapshot_diff(snapshot_a text, snapshot_b text)
+RETURNS TABLE (
+  kind          text,
+  instrument_id text,
+  old_quantity  float8,
+  new_quantity  float8,
+  old_position  jsonb,
+  new_position  jsonb
+) AS $$
+  WITH a AS (
+    SELECT e ->> 'instrument_id' AS instrument_id, e AS position, ord
+    FROM portfolio_snapshot,
+         jsonb_array_elements(payload_json -> 'positions') WITH ORDINALITY AS t(e, ord)
+    WHERE snapshot_id = snapshot_a
+  ), b AS (
+    SELECT e ->> 'instrument_id' AS instrument_id, e AS position, ord
+    FROM portfolio_snapshot,
+         jsonb_array_elements(payload_json -> 'positions') WITH ORDINALITY AS t(e, ord)
+    WHERE snapshot_id = snapshot_b
+  )
+  SELECT
+    CASE WHEN a.instrument_id IS NULL THEN 'new'
+         WHEN b.instrument_id IS NULL THEN 'removed'
+         ELSE 'changed' END,
+    COALESCE(a.instrument_id, b.instrument_id),
+    (a.position ->> 'aggregated_quantity')::float8,
+    (b.position ->> 'aggregated_quantity')::float8,
+    a.position,
+    b.position
+  FROM a
+  FULL OUTER JOIN b ON a.instrument_id = b.instrument_id
+  WHERE (a.position ->> 'aggregated_quantity')::float8
+        IS DISTINCT FROM (b.position ->> 'aggregated_quantity')::float8
+  ORDER BY a.ord NULLS LAST, b.ord
+$$ LANGUAGE sql STABLE;
+
+COMMIT;
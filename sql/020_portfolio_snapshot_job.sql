@@ -0,0 +1,34 @@
+-- Queue for snapshots too large to build inside a request
+-- create_snapshot estimates the number of ACTIVE positions in scope from
+-- position_rollup. Above the service's threshold it queues a job here and
+-- returns 202 instead of aggregating in the request. The snapshot worker
+-- (services.portfolio_svc.app.snapshot_worker) claims jobs with
+-- FOR UPDATE SKIP LOCKED under a lease, as compute workers claim run_task, and
+-- records the resulting snapshot_id. The snapshot itself is written by the
+-- same statement the synchronous path uses, so dedup is unchanged.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS portfolio_snapshot_job (
+  job_id             text PRIMARY KEY DEFAULT ('snapjob-' || uuid_generate_v7()::text),
+  portfolio_node_id  text NOT NULL REFERENCES portfolio_node(portfolio_node_id),
+  as_of_date         timestamptz NOT NULL,
+  -- as_of_date as the client sent it (UTC offset included); it is part of the
+  -- hashed payload, so the worker must reproduce it exactly
+  as_of_iso          text NOT NULL,
+  include_hierarchy  boolean NOT NULL DEFAULT false,
+  status             text NOT NULL DEFAULT 'QUEUED'
+                       CHECK (status IN ('QUEUED','RUNNING','SUCCEEDED','DEAD')),
+  snapshot_id        text,
+  attempt            int  NOT NULL DEFAULT 0,
+  max_attempts       int  NOT NULL DEFAULT 3,
+  leased_until       timestamptz,
+  last_error         text,
+  created_at         timestamptz NOT NULL DEFAULT now(),
+  updated_at         timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS portfolio_snapshot_job_claim_idx
+  ON portfolio_snapshot_job (created_at)
+  WHERE status IN ('QUEUED', 'RUNNING');
+
+COMMIT;
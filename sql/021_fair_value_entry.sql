@@ -0,0 +1,27 @@
+-- Per-position accounting valuation entries and the audit lookup index
+-- compute_accounting_valuation used to keep only the run totals (in
+-- audit_trail.results_json), so /fair-value-hierarchy could not break fair
+-- value down by classification. Each run now also writes its entries to
+-- fair_value_entry, and the breakdown is a GROUP BY over one run's rows.
+--
+-- /unrealised-pnl reads the latest GAAP/IFRS audit row for a portfolio;
+-- audit_trail_entity_type_time serves that as a single index probe instead
+-- of sorting every audit row for the entity by computed_at.
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS fair_value_entry (
+  run_id           text NOT NULL,
+  position_id      text NOT NULL,
+  instrument_id    text NOT NULL,
+  classification   text NOT NULL,
+  carrying_value   float8 NOT NULL,
+  fair_value       float8 NOT NULL,
+  unrealised_pnl   float8 NOT NULL DEFAULT 0,
+  created_at       timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, position_id)
+);
+
+CREATE INDEX IF NOT EXISTS audit_trail_entity_type_time
+  ON audit_trail (entity_id, audit_type, computed_at DESC);
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Partial indexes for the latest GAAP/IFRS audit row per run and per portfolio
+-- The accounting read endpoints all look up the newest audit row with
+-- audit_type IN ('GAAP', 'IFRS') for one calculation_run_id or entity_id.
+-- idx_audit_trail_calculation_run and audit_trail_entity_type_time (021)
+-- match the key but leave the IN-list and the computed_at ordering to a
+-- filter and sort. Restricted to accounting rows and ordered by computed_at,
+-- these answer each lookup by reading the first index entry, and they stay
+-- small because CECL, Basel and model-change rows are left out.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS audit_trail_accounting_run_idx
+  ON audit_trail (calculation_run_id, computed_at DESC)
+  WHERE audit_type IN ('GAAP', 'IFRS');
+
+CREATE INDEX IF NOT EXISTS audit_trail_accounting_entity_idx
+  ON audit_trail (entity_id, computed_at DESC)
+  WHERE audit_type IN ('GAAP', 'IFRS');
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- Recency indexes for the unfiltered alert listings
+-- list_alert_configs and list_alert_logs without filters return the newest
+-- rows first. With no index on the sort key, each call sorted the whole table
+-- to return a page. A descending B-tree lets the planner read rows in order
+-- and stop at the LIMIT. Filtered listings keep using the existing
+-- (alert_id, triggered_at) and (portfolio_node_id, ...) indexes.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS alert_config_created_at_desc
+  ON alert_config (created_at DESC);
+
+CREATE INDEX IF NOT EXISTS alert_log_triggered_at_desc
+  ON alert_log (triggered_at DESC);
+
+COMMIT;
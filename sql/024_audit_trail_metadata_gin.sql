@@ -0,0 +1,15 @@
+-- GIN index for audit event lookups by actor
+-- list_audit_events filtered on metadata_json ->> 'computed_by', which no
+-- index can serve, so an actor filter scanned all of audit_trail. The filter
+-- is now written as containment (metadata_json @> '{"computed_by": ...}'),
+-- which matches the same rows for string values and can use this index.
+-- jsonb_path_ops is enough because only @> is used, and it is smaller than
+-- the default opclass. Containment never matches NULL, so NULL metadata is
+-- left out of the index.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS audit_trail_metadata_gin
+  ON audit_trail USING GIN (metadata_json jsonb_path_ops)
+  WHERE metadata_json IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,11 @@
+-- Keyset pagination index for the audit event listing
+-- list_audit_events pages newest first with a (computed_at, audit_id) cursor
+-- instead of OFFSET. This index matches that order, so each page is one index
+-- range scan from the cursor that stops at the LIMIT, however deep the page.
+-- audit_id breaks ties between events with the same computed_at.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS audit_trail_computed_at_id_idx
+  ON audit_trail (computed_at DESC, audit_id DESC);
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- RWA breakdown columns on regulatory_metrics
+-- get_rwa_breakdown returns one sub-object of a Basel run's breakdown. The two
+-- breakdowns compute_capital writes into metric_breakdown_json are now also
+-- stored generated columns, so the endpoint reads just the one it returns
+-- instead of the whole breakdown document. The partial index finds a run's
+-- BASEL_RWA row by calculation_run_id.
+--
+-- Adding a stored generated column rewrites regulatory_metrics once; the
+-- table holds one row per portfolio, metric type and date, so this is cheap.
+BEGIN;
+
+ALTER TABLE regulatory_metrics
+  ADD COLUMN IF NOT EXISTS rwa_by_counterparty_type jsonb
+    GENERATED ALWAYS AS (metric_breakdown_json -> 'by_counterparty_type') STORED,
+  ADD COLUMN IF NOT EXISTS rwa_by_rating jsonb
+    GENERATED ALWAYS AS (metric_breakdown_json -> 'by_rating') STORED;
+
+CREATE INDEX IF NOT EXISTS regulatory_metrics_basel_run_idx
+  ON regulatory_metrics (calculation_run_id)
+  WHERE metric_type = 'BASEL_RWA';
+
+COMMIT;
@@ -0,0 +1,19 @@
+-- Index for the latest audit row of a given type per run
+-- The Basel result and RWA-breakdown fallback read the newest audit row with
+-- audit_type = 'BASEL' for one calculation_run_id. idx_audit_trail_calculation_run
+-- matches the run but leaves the type to a filter and the ordering to a sort;
+-- with the type and computed_at in the key, each lookup reads the first index
+-- entry. Lookups by run alone (explain, data quality, the run trail) use its
+-- calculation_run_id prefix.
+--
+-- The wide jsonb columns are deliberately not INCLUDEd: they would bloat the
+-- index with a copy of every document, and a row whose documents exceed the
+-- btree entry size limit could no longer be inserted at all.
+-- regulatory_metrics already has idx_regulatory_metrics_portfolio_type_date
+-- for the latest-metric lookups, so it needs nothing new.
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS audit_trail_run_type_time_idx
+  ON audit_trail (calculation_run_id, audit_type, computed_at DESC);
+
+COMMIT;